@@ -1,7 +1,15 @@
-"""Top-level package for Adaptive Comfort."""
-
-from . import _version
-
-__author__ = """Oliver James Hensby"""
+"""Top-level package for Adaptive Comfort."""
+
+__author__ = """Oliver James Hensby"""
 __email__ = "o.hensby@maxfordham.com"
-__version__ = _version.get_versions()['version']
+
+
+def __getattr__(name):
+    """Looks up __version__ when first used rather than on import, as versioneer may run git to find it."""
+    if name == "__version__":
+        from . import _version
+
+        version = _version.get_versions()['version']
+        globals()["__version__"] = version
+        return version
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
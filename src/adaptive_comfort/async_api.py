@@ -0,0 +1,102 @@
+"""Coroutine entry points for running assessments from an asyncio application, e.g. a web server.
+
+Loading the input data, the calculation stages and writing the excel spreadsheet all block, so they are run in an
+executor (by default the event loop's thread pool) while the event loop carries on handling other requests. The
+stage the wizard has reached is passed back to the event loop as each stage starts. Cancelling the task awaiting
+the assessment stops the calculation at the start of its next stage.
+
+Example::
+
+    calc = await assess(Tm59CalcWizard, fdir, on_stage=lambda stage: print(stage))
+
+    async for stage, calc in iter_assessment(Tm52CalcWizard, fdir):
+        await websocket.send(stage)
+"""
+import asyncio
+
+from adaptive_comfort.progress import STAGE_COMPLETE, CancellationToken
+
+STAGE_LOAD = "load_inputs"  # Reported before the input data is loaded, see from_files
+
+
+async def iter_assessment(wizard, fdir, fdir_results=None, on_linux=True, executor=None, **kwargs):
+    """Runs an assessment in an executor, yielding each stage as the wizard starts it.
+
+    If the task iterating is cancelled, or stops iterating early, the calculation is stopped at the start of its
+    next stage. The stage being run when cancelled is completed in the executor but its results are discarded.
+
+    Args:
+        wizard (type): The calculation wizard, e.g. Tm52CalcWizard.
+        fdir (Union[pathlib.Path, str]): File directory containing numpy data.
+        fdir_results (Union[pathlib.Path, str], optional): Used to override project path to save elsewhere.
+        on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
+        executor (concurrent.futures.ThreadPoolExecutor, optional): Executor the assessment is run in. Defaults
+            to the event loop's default executor.
+        **kwargs: Passed on to wizard.from_files, e.g. skip_unchanged or block_size.
+
+    Yields:
+        tuple: Name of the stage and None, then STAGE_COMPLETE and the calculated wizard.
+    """
+    loop = asyncio.get_event_loop()
+    queue = asyncio.Queue()
+    cancel_token = CancellationToken()
+
+    def on_stage(name):  # Called from the executor
+        loop.call_soon_threadsafe(queue.put_nowait, name)
+
+    def run():
+        cancel_token.check(STAGE_LOAD)
+        on_stage(STAGE_LOAD)
+        return wizard.from_files(
+            fdir, fdir_results, on_linux, on_stage=on_stage, cancel_token=cancel_token, **kwargs
+        )
+
+    future = loop.run_in_executor(executor, run)
+    try:
+        while not future.done():
+            get = asyncio.ensure_future(queue.get())
+            done, pending = await asyncio.wait(
+                [get, future], return_when=asyncio.FIRST_COMPLETED
+            )
+            if get in done:
+                yield get.result(), None
+            else:
+                get.cancel()
+        while not queue.empty():  # Stages reported just before the assessment finished
+            yield queue.get_nowait(), None
+        yield STAGE_COMPLETE, future.result()
+    finally:
+        cancel_token.cancel()
+        if not future.done():
+            future.add_done_callback(_retrieve_exception)
+
+
+def _retrieve_exception(future):
+    """Marks the exception of a cancelled assessment as retrieved, as nothing is awaiting it."""
+    if not future.cancelled():
+        future.exception()
+
+
+async def assess(wizard, fdir, fdir_results=None, on_linux=True, executor=None, on_stage=None, **kwargs):
+    """Runs an assessment in an executor without blocking the event loop, see iter_assessment.
+
+    Args:
+        wizard (type): The calculation wizard, e.g. Tm52CalcWizard.
+        fdir (Union[pathlib.Path, str]): File directory containing numpy data.
+        fdir_results (Union[pathlib.Path, str], optional): Used to override project path to save elsewhere.
+        on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
+        executor (concurrent.futures.ThreadPoolExecutor, optional): Executor the assessment is run in. Defaults
+            to the event loop's default executor.
+        on_stage (callable, optional): Called within the event loop with the name of each stage as it starts.
+            Defaults to None.
+        **kwargs: Passed on to wizard.from_files, e.g. skip_unchanged.
+
+    Returns:
+        object: The calculated wizard.
+    """
+    async for stage, calc in iter_assessment(
+        wizard, fdir, fdir_results, on_linux, executor, **kwargs
+    ):
+        if on_stage is not None:
+            on_stage(stage)
+    return calc
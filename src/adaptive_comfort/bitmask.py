@@ -0,0 +1,142 @@
+"""Boolean masks packed 8 readings to a byte.
+
+The criteria count how many readings exceed a threshold (delta T >= 1K, operative temperature > 26 Deg. C),
+which as numpy boolean arrays take a byte per reading. A PackedMask holds the same mask in a bit per reading
+(see numpy.packbits), built a chunk of time-steps at a time so the full-size boolean array is never created, and
+counts the set bits using a table of the number of bits set in each byte value (popcount).
+"""
+import numpy as np
+
+CHUNK_SIZE = 2 ** 16  # Number of readings compared at a time when building a packed mask, a multiple of 8
+ARR_POPCOUNT = np.array(
+    [bin(i).count("1") for i in range(256)], dtype=np.uint8
+)  # Number of bits set in each byte value
+ARR_LEADING_BITS = np.array(
+    [(0xFF << (8 - i)) & 0xFF for i in range(8)], dtype=np.uint8
+)  # Byte with the first i bits set, numpy.packbits puts the first reading in the most significant bit
+
+
+class PackedMask(object):
+    def __init__(self, arr_bits, n):
+        """A boolean mask packed along its last axis.
+
+        Args:
+            arr_bits (numpy.ndarray): Packed bits with the shape (..., ceil(n / 8)), see numpy.packbits.
+            n (int): Length of the last axis of the unpacked mask.
+        """
+        self.arr_bits = arr_bits
+        self.n = n
+
+    @property
+    def shape(self):
+        """tuple: Shape of the unpacked mask."""
+        return self.arr_bits.shape[:-1] + (self.n,)
+
+    def unpack(self):
+        """Unpacks the mask.
+
+        Returns:
+            numpy.ndarray: Boolean mask.
+        """
+        return np.unpackbits(self.arr_bits, axis=-1, count=self.n).astype(bool)
+
+    def count(self):
+        """Counts the readings set along the last axis.
+
+        Returns:
+            numpy.ndarray: Count with the shape of the mask without its last axis.
+        """
+        return ARR_POPCOUNT[self.arr_bits].sum(axis=-1, dtype=np.intp)
+
+    def count_segments(self, arr_indptr):
+        """Counts the readings set within consecutive segments of the last axis, e.g. the occupied readings of
+        each room, see occupancy.OccupiedIndex.
+
+        Args:
+            arr_indptr (numpy.ndarray): Start of each segment followed by the end of the last, non-decreasing.
+
+        Returns:
+            numpy.ndarray: Count for each segment with the shape (..., segments).
+        """
+        arr_byte, arr_bit = np.divmod(arr_indptr, 8)
+        arr_byte_count = ARR_POPCOUNT[self.arr_bits]
+        arr_byte_count = np.concatenate(
+            [arr_byte_count, np.zeros(arr_byte_count.shape[:-1] + (1,), dtype=np.uint8)], axis=-1
+        )  # So a segment can end after the last byte
+        arr_count = np.add.reduceat(arr_byte_count, arr_byte, axis=-1, dtype=np.intp)[..., :-1]
+        arr_count[..., arr_byte[:-1] == arr_byte[1:]] = 0  # Segments within a single byte
+        arr_partial = self._leading_count(arr_byte, arr_bit)  # Readings set before each position within its byte
+        return arr_count + arr_partial[..., 1:] - arr_partial[..., :-1]
+
+    def _leading_count(self, arr_byte, arr_bit):
+        """Counts the readings set within the byte of each position before the position."""
+        arr_leading = np.zeros(self.arr_bits.shape[:-1] + arr_byte.shape, dtype=np.intp)
+        arr_within = arr_bit > 0
+        arr_leading[..., arr_within] = ARR_POPCOUNT[
+            self.arr_bits[..., arr_byte[arr_within]] & ARR_LEADING_BITS[arr_bit[arr_within]]
+        ]
+        return arr_leading
+
+
+def pack_mask(arr_bool):
+    """Packs a boolean mask along its last axis.
+
+    Args:
+        arr_bool (numpy.ndarray): Boolean mask.
+
+    Returns:
+        PackedMask: The packed mask.
+    """
+    return PackedMask(np.packbits(arr_bool, axis=-1), arr_bool.shape[-1])
+
+
+def pack_chunks(iter_bool, n, shape):
+    """Packs a boolean mask given a chunk of its last axis at a time, so the full-size mask is never created.
+
+    Args:
+        iter_bool (iterable): Boolean chunks of the last axis in order, of any length.
+        n (int): Length of the last axis of the mask.
+        shape (tuple): Shape of the mask without its last axis.
+
+    Returns:
+        PackedMask: The packed mask.
+    """
+    arr_bits = np.empty(shape + (-(-n // 8),), dtype=np.uint8)
+    arr_carry = np.zeros(shape + (0,), dtype=bool)  # Readings of the previous chunk which don't fill a byte
+    start = 0
+    for arr_bool in iter_bool:
+        if arr_carry.shape[-1]:
+            arr_bool = np.concatenate([arr_carry, arr_bool], axis=-1)
+        n_packed = arr_bool.shape[-1] if start + arr_bool.shape[-1] == n else arr_bool.shape[-1] // 8 * 8
+        arr_bits[..., start // 8 : start // 8 + -(-n_packed // 8)] = np.packbits(
+            arr_bool[..., :n_packed], axis=-1
+        )
+        arr_carry = arr_bool[..., n_packed:]
+        start += n_packed
+    return PackedMask(arr_bits, n)
+
+
+def pack_comparison(arr, comparison, value, chunk_size=CHUNK_SIZE, arr_index=None):
+    """Compares an array against a value and packs the result, a chunk of the last axis at a time.
+
+    Args:
+        arr (numpy.ndarray): Values to compare, e.g. delta T.
+        comparison (numpy.ufunc): Comparison, e.g. numpy.greater.
+        value (float): Value compared against, e.g. the threshold of a criterion.
+        chunk_size (int, optional): Number of readings compared at a time, a multiple of 8.
+            Defaults to CHUNK_SIZE.
+        arr_index (numpy.ndarray, optional): Positions of the last axis to compare, e.g. the night time-steps,
+            taken a chunk at a time. Defaults to all.
+
+    Returns:
+        PackedMask: The packed result of the comparison.
+    """
+    if arr_index is None:
+        n = arr.shape[-1]
+        iter_bool = (comparison(arr[..., start : start + chunk_size], value) for start in range(0, n, chunk_size))
+    else:
+        n = len(arr_index)
+        iter_bool = (
+            comparison(arr[..., arr_index[start : start + chunk_size]], value) for start in range(0, n, chunk_size)
+        )
+    return pack_chunks(iter_bool, n, arr.shape[:-1])
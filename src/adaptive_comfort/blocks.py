@@ -0,0 +1,290 @@
+"""Assess models larger than memory in blocks of rooms.
+
+The air speed x room x time-step arrays (operative temperature, max acceptable temperature, delta T) are by far
+the largest arrays of an assessment. When assessed in blocks of rooms, these arrays only ever exist for one block
+at a time: each block is read from the (memory-mapped) inputs, calculated, and only its per-room results are kept
+(see LI_ROOM_RESULTS of each wizard). The per-room results of every block are then combined into a single
+wizard, so the results are reported as if the rooms had been calculated together. Peak memory is bounded by the
+block size rather than the size of the model.
+
+The blocks can also be spread across worker processes (n_workers). The time-series inputs are shared with the
+workers rather than pickled: memory-mapped inputs are re-opened by each worker from the same file and inputs held
+in memory are copied once into shared memory, so every worker reads its blocks from the same buffer.
+
+Example::
+
+    inputs = fromfile(create_paths(fdir), allow_pickle=True, mmap_mode="r")
+    calc = assess_in_blocks(Tm59CalcWizard, inputs, block_size=50, n_workers=4)
+"""
+import copy
+import json
+import mmap
+import multiprocessing
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8, arrays which aren't memory-mapped are pickled to the workers instead
+    shared_memory = None
+
+from adaptive_comfort.histograms import concatenate_summaries
+from adaptive_comfort.occupancy import OccupiedIndex
+from adaptive_comfort.progress import ProgressReporter
+from adaptive_comfort.utils import (
+    LI_MMAP_INPUTS,
+    iter_input_blocks,
+    subset_inputs,
+)
+
+_WORKER = {}  # Input data and shared memory blocks attached to by each worker process, see _init_worker
+
+
+def room_results(calc):
+    """Creates a copy of a wizard keeping only the per-room results, so the large arrays of a block can be freed.
+
+    Args:
+        calc (object): A calculated wizard, e.g. Tm52CalcWizard.
+
+    Returns:
+        object: Shallow copy of the wizard without the air speed x room x time-step arrays (or the index of the
+            occupied time-steps).
+    """
+    calc_results = copy.copy(calc)
+    li_keep = calc.LI_ROOM_RESULTS + calc.LI_ROOM_INDEX_RESULTS
+    for k, v in vars(calc).items():
+        if isinstance(v, (np.ndarray, OccupiedIndex)) and k not in li_keep:
+            setattr(calc_results, k, None)
+    return calc_results
+
+
+def combine_room_results(li_blocks):
+    """Combines the per-room results of each block of rooms into the results for all of the rooms.
+
+    Args:
+        li_blocks (list): (index of the block's first room, wizard with the block's results, see room_results)
+            for each block, in room order.
+
+    Returns:
+        object: Copy of the first block's wizard with the per-room results of every block.
+    """
+    calc = copy.copy(li_blocks[0][1])
+    li_calcs = [calc_block for start, calc_block in li_blocks]
+    for name in calc.LI_ROOM_RESULTS:
+        setattr(calc, name, np.concatenate([getattr(c, name) for c in li_calcs], axis=-1))
+    for name in calc.LI_ROOM_INDEX_RESULTS:
+        setattr(
+            calc,
+            name,
+            np.concatenate([getattr(c, name) + start for start, c in li_blocks]),
+        )
+    calc.di_criteria = {
+        criterion: {
+            k: np.concatenate([c.di_criteria[criterion][k] for c in li_calcs], axis=-1)
+            for k in di_criterion
+        }
+        for criterion, di_criterion in calc.di_criteria.items()
+    }
+    if getattr(calc, "exceedance_summary", None) is not None:
+        calc.exceedance_summary = concatenate_summaries(
+            [c.exceedance_summary for c in li_calcs]
+        )
+    if hasattr(calc, "li_categories"):
+        calc.li_categories = None  # Categories in use differ between blocks, the category arrays aren't kept
+    return calc
+
+
+def share_array(arr, li_shared_memory):
+    """Describes how a worker process can attach to an array without it being copied.
+
+    Args:
+        arr (numpy.ndarray): Array to share.
+        li_shared_memory (list): Shared memory blocks created are appended, so they can be released afterwards.
+
+    Returns:
+        tuple: ("memmap", file name, offset, shape, dtype, order) if the array is memory-mapped from a file,
+            ("shm", shared memory name, shape, dtype) if copied into shared memory, or ("array", arr).
+    """
+    if isinstance(arr, np.memmap) and isinstance(arr.base, mmap.mmap):  # Mapped from a file, not a view
+        return (
+            "memmap",
+            arr.filename,
+            arr.offset,
+            arr.shape,
+            arr.dtype.str,
+            "F" if np.isfortran(arr) else "C",
+        )
+    if shared_memory is None or arr.nbytes == 0:
+        return ("array", arr)
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    li_shared_memory.append(shm)
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return ("shm", shm.name, arr.shape, arr.dtype.str)
+
+
+def attach_array(spec):
+    """Attaches to an array shared by share_array.
+
+    Args:
+        spec (tuple): See share_array.
+
+    Returns:
+        numpy.ndarray: The shared array, read only.
+    """
+    kind = spec[0]
+    if kind == "memmap":
+        filename, offset, shape, dtype, order = spec[1:]
+        return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape, order=order)
+    if kind == "shm":
+        name, shape, dtype = spec[1:]
+        shm = shared_memory.SharedMemory(name=name)
+        _WORKER.setdefault("li_shared_memory", []).append(shm)  # Keep the buffer alive with the worker
+        arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        arr.setflags(write=False)
+        return arr
+    return spec[1]
+
+
+def _init_worker(inputs_base, di_specs):
+    """Initialises a worker process with the input data, attaching to the shared time-series."""
+    inputs = copy.copy(inputs_base)
+    for name, spec in di_specs.items():
+        setattr(inputs, name, attach_array(spec))
+    _WORKER["inputs"] = inputs
+
+
+def _assess_block(args):
+    """Runs a wizard for a block of rooms within a worker process, returning only the per-room results."""
+    wizard, start, stop, kwargs = args
+    block_inputs = subset_inputs(_WORKER["inputs"], slice(start, stop))
+    return room_results(wizard(block_inputs, write_results=False, **kwargs))
+
+
+def iter_block_results(wizard, inputs, block_size, n_workers=None, **kwargs):
+    """Runs a wizard for each block of rooms, in room order.
+
+    Args:
+        wizard (type): The calculation wizard, e.g. Tm52CalcWizard.
+        inputs (Tm52InputData): Class instance containing the required inputs.
+        block_size (int): Maximum number of rooms calculated at a time.
+        n_workers (int, optional): Number of worker processes the blocks are spread across. If None or 1, the
+            blocks are calculated in this process. Defaults to None.
+        **kwargs: Passed on to the wizard.
+
+    Yields:
+        tuple: Index of the block's first room, input data for the block, wizard with the block's per-room
+            results (see room_results).
+    """
+    n_rooms = len(inputs.arr_room_ids_sorted)
+    li_starts = list(range(0, n_rooms, block_size))
+    if not n_workers or n_workers == 1:
+        for start, block_inputs in zip(li_starts, iter_input_blocks(inputs, block_size)):
+            yield start, block_inputs, room_results(
+                wizard(block_inputs, write_results=False, **kwargs)
+            )
+        return
+
+    li_shared_memory = []
+    try:
+        di_specs = {
+            name: share_array(getattr(inputs, name), li_shared_memory)
+            for name in LI_MMAP_INPUTS
+        }
+        inputs_base = copy.copy(inputs)
+        for name in di_specs:
+            setattr(inputs_base, name, None)  # Attached to by the workers rather than pickled
+        with multiprocessing.Pool(
+            min(n_workers, len(li_starts)),
+            initializer=_init_worker,
+            initargs=(inputs_base, di_specs),
+        ) as pool:
+            li_args = [(wizard, start, start + block_size, kwargs) for start in li_starts]
+            for start, calc_block in zip(li_starts, pool.imap(_assess_block, li_args)):
+                yield start, subset_inputs(inputs, slice(start, start + block_size)), calc_block
+    finally:
+        for shm in li_shared_memory:
+            shm.close()
+            shm.unlink()
+
+
+def assess_in_blocks(
+    wizard,
+    inputs,
+    block_size,
+    fdir_results=None,
+    on_linux=True,
+    write_results=True,
+    input_digest=None,
+    stream=None,
+    n_workers=None,
+    on_stage=None,
+    progress=None,
+    cancel_token=None,
+    results_db=None,
+    **kwargs
+):
+    """Runs an assessment in blocks of rooms, keeping only the per-room results of each block.
+
+    Args:
+        wizard (type): The calculation wizard, e.g. Tm52CalcWizard.
+        inputs (Tm52InputData): Class instance containing the required inputs, ideally loaded with
+            fromfile(..., mmap_mode="r") so only one block of the time-series is read into memory at a time.
+        block_size (int): Maximum number of rooms calculated at a time.
+        fdir_results (Union[pathlib.Path, str], optional): Used to override project path to save elsewhere.
+        on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
+        write_results (bool, optional): Merge the results of all the rooms into data frames and output them to
+            excel. Defaults to True.
+        input_digest (str, optional): Digest of the input data and calculation settings, see
+            utils.input_digest. If None, it is calculated from all of the input data when first needed, i.e. when
+            the results are stored. Defaults to None.
+        stream (file, optional): If given, the results for each room are written as JSON lines as soon as each
+            block is calculated. Defaults to None.
+        n_workers (int, optional): Number of worker processes the blocks are spread across, see
+            iter_block_results. Defaults to None.
+        on_stage (callable, optional): Called with the name of each stage before it is run. Only called for the
+            stages within each block when the blocks are calculated in this process. Defaults to None.
+        progress (callable, optional): Called with a progress.ProgressUpdate as each stage starts and each block
+            of rooms is completed. Defaults to None.
+        cancel_token (progress.CancellationToken, optional): Checked between blocks of rooms (and the stages
+            within each block when calculated in this process). Defaults to None.
+        results_db (Union[pathlib.Path, str], optional): Upsert the results of all of the rooms into this SQLite
+            database once complete, see results_db.py. Defaults to None.
+        **kwargs: Passed on to the wizard, e.g. room_categories.
+
+    Returns:
+        object: The wizard with the per-room results of all of the rooms (criteria arrays, di_criteria,
+            room_records, df_results if written). The air speed x room x time-step arrays are not kept.
+    """
+    progress_reporter = ProgressReporter(
+        len(inputs.arr_room_ids_sorted), progress, cancel_token, on_stage
+    )
+    in_process = not n_workers or n_workers == 1
+    if in_process:
+        kwargs["on_stage"] = progress_reporter  # Reports and checks the stages within each block
+    li_blocks = []
+    for start, block_inputs, calc_block in iter_block_results(
+        wizard, inputs, block_size, n_workers, input_digest=input_digest, **kwargs
+    ):
+        if stream is not None:
+            for record in calc_block.room_records(block_inputs):
+                stream.write(json.dumps(record) + "\n")
+            stream.flush()
+        li_blocks.append((start, calc_block))
+        if not in_process:  # The stages within the block weren't reported to this process
+            progress_reporter.add_stage_times(calc_block.di_stage_time)
+        progress_reporter.add_rooms(len(block_inputs.arr_room_ids_sorted))
+
+    calc = combine_room_results(li_blocks)
+    if write_results:
+        progress_reporter("merge_dfs")
+        calc.merge_dfs(inputs)
+        progress_reporter("to_excel")
+        calc.to_excel(inputs, fdir_results, on_linux)
+    progress_reporter.complete()
+    calc.di_stage_time = progress_reporter.di_stage_time  # Summed over the blocks, including in worker processes
+    calc.elapsed = progress_reporter.elapsed
+    if results_db is not None:
+        from adaptive_comfort.results_db import write_results as write_results_db
+
+        write_results_db(results_db, calc, inputs)
+    return calc
@@ -0,0 +1,116 @@
+"""Calendar aware indexing of the time-step axis.
+
+The results from IES are a year of readings at a fixed reporting interval (e.g. hourly, 30, 15, 10 or 6 minutes)
+and may include the 29th of February for leap years. The CalendarIndex holds the indices the criteria need
+(day boundaries, the May to September period, the night time window for bedrooms) so they don't have to assume
+a 365 day year of hourly multiples.
+"""
+import calendar
+import datetime
+import functools
+
+import numpy as np
+
+SUMMER_START_MONTH = 5  # May
+SUMMER_END_MONTH = 9  # September (inclusive)
+NIGHT_START_HOUR = 22  # 10pm
+NIGHT_END_HOUR = 7  # 7am
+
+
+class CalendarIndex(object):
+    def __init__(self, year, n_timesteps, feb29=None):
+        """Indices along the time-step axis for a year of results.
+
+        Args:
+            year (int): Year of the weather file.
+            n_timesteps (int): Number of time-steps in the year of results.
+            feb29 (bool, optional): Whether the results include the 29th of February. If None, the results are
+                assumed to include it if the year is a leap year and the number of time-steps allows.
+                Defaults to None.
+
+        Raises:
+            ValueError: If the number of time-steps isn't a whole number of time-steps per day.
+        """
+        if feb29 is None:
+            feb29 = calendar.isleap(year) and n_timesteps % 366 == 0
+        self.year = year
+        self.n_timesteps = n_timesteps
+        self.n_days = 366 if feb29 else 365
+        if n_timesteps % self.n_days != 0:
+            raise ValueError(
+                "{0} time-steps is not a whole number of time-steps per day for a {1} day year.".format(
+                    n_timesteps, self.n_days
+                )
+            )
+        self.steps_per_day = n_timesteps // self.n_days
+        self.steps_per_hour = self.steps_per_day / 24
+        if self.steps_per_hour == int(self.steps_per_hour):
+            self.steps_per_hour = int(self.steps_per_hour)
+        self.timestep_hours = 24 / self.steps_per_day  # e.g. 0.5 for half hourly results
+        self.timestep_minutes = 60 * self.timestep_hours
+
+        # Start index of each day, with the end of the year appended
+        self.arr_day_boundaries = np.arange(self.n_days + 1) * self.steps_per_day
+        self.arr_day_boundaries.setflags(write=False)
+
+        # May to the end of September
+        year_days = (2012 if feb29 else 2010) if calendar.isleap(year) != feb29 else year
+        day_may_start = (
+            datetime.date(year_days, SUMMER_START_MONTH, 1) - datetime.date(year_days, 1, 1)
+        ).days
+        day_sept_end = (
+            datetime.date(year_days, SUMMER_END_MONTH + 1, 1) - datetime.date(year_days, 1, 1)
+        ).days
+        self.summer = slice(
+            int(self.arr_day_boundaries[day_may_start]),
+            int(self.arr_day_boundaries[day_sept_end]),
+        )
+
+        # Night time (10pm to 7am) based on the hour of the day at the start of each time-step
+        arr_hour_of_day = (np.arange(self.steps_per_day) * self.timestep_hours) % 24
+        arr_night_of_day = (arr_hour_of_day >= NIGHT_START_HOUR) | (
+            arr_hour_of_day < NIGHT_END_HOUR
+        )
+        self.arr_night_mask = np.tile(arr_night_of_day, self.n_days)
+        self.arr_night_mask.setflags(write=False)
+        self.arr_night_index = np.flatnonzero(self.arr_night_mask)
+        self.arr_night_index.setflags(write=False)
+        self.n_night_steps = len(self.arr_night_index)
+        self.night_hours = self.n_night_steps * self.timestep_hours
+
+    def __repr__(self):
+        return "CalendarIndex(year={0}, n_timesteps={1}, n_days={2}, timestep_minutes={3})".format(
+            self.year, self.n_timesteps, self.n_days, self.timestep_minutes
+        )
+
+
+@functools.lru_cache(maxsize=32)
+def get_calendar_index(year, n_timesteps, feb29=None):
+    """Returns a cached CalendarIndex, see CalendarIndex.
+
+    Args:
+        year (int): Year of the weather file.
+        n_timesteps (int): Number of time-steps in the year of results.
+        feb29 (bool, optional): Whether the results include the 29th of February. Defaults to None.
+
+    Returns:
+        CalendarIndex: The calendar index.
+    """
+    return CalendarIndex(year, n_timesteps, feb29)
+
+
+def calendar_index_from_inputs(inputs):
+    """Returns the calendar index for the input data using the weather file year and the number of time-steps.
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+
+    Returns:
+        CalendarIndex: The calendar index.
+    """
+    di_weather_file_info = inputs.di_weather_file_info or {}
+    year = int(di_weather_file_info.get("year", 2010))
+    feb29 = None
+    if di_weather_file_info.get("feb29"):
+        feb29 = inputs.arr_air_temp.shape[-1] % 366 == 0
+    return get_calendar_index(year, int(inputs.arr_air_temp.shape[-1]), feb29)
@@ -0,0 +1,178 @@
+"""Command line interface for running the TM52, TM59 and TM59 mechanically ventilated assessments.
+
+The results for each room are written to stdout as JSON lines as soon as each block of rooms has been
+calculated, so the results can be consumed without waiting for the whole assessment to complete.
+
+Example::
+
+    adaptive-comfort tm52 path/to/mf_results/tm52/data --block-size 50 > results.jsonl
+
+The serve command starts a long running local service instead, see adaptive_comfort.service::
+
+    adaptive-comfort serve --port 8052
+"""
+import argparse
+import logging
+import sys
+
+from adaptive_comfort.blocks import assess_in_blocks
+from adaptive_comfort.utils import create_paths, fromfile
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.tm59_calc import Tm59CalcWizard
+from adaptive_comfort.tm59mechvent_calc import Tm59MechVentCalcWizard
+
+DI_WIZARDS = {
+    "tm52": Tm52CalcWizard,
+    "tm59": Tm59CalcWizard,
+    "tm59mechvent": Tm59MechVentCalcWizard,
+}
+
+DEFAULT_BLOCK_SIZE = 50
+
+
+def stream_results(
+    wizard, fdir, block_size=DEFAULT_BLOCK_SIZE, stream=None, n_workers=None, pass_fail_only=False
+):
+    """Runs an assessment for blocks of rooms and writes the results for each room as JSON lines.
+
+    Args:
+        wizard (type): The calculation wizard, e.g. Tm52CalcWizard.
+        fdir (Union[pathlib.Path, str]): File directory containing numpy data.
+        block_size (int, optional): Number of rooms calculated at a time. Defaults to DEFAULT_BLOCK_SIZE.
+        stream (file, optional): Where to write the JSON lines. Defaults to sys.stdout.
+        n_workers (int, optional): Number of worker processes the blocks are spread across. Defaults to None.
+        pass_fail_only (bool, optional): Only determine whether each room passes, the percentages and maxima are
+            written as null. Defaults to False.
+
+    Returns:
+        int: Number of rooms written.
+    """
+    stream = sys.stdout if stream is None else stream
+    inputs = fromfile(create_paths(fdir), allow_pickle=True, mmap_mode="r")
+    assess_in_blocks(
+        wizard,
+        inputs,
+        block_size,
+        write_results=False,
+        stream=stream,
+        n_workers=n_workers,
+        pass_fail_only=pass_fail_only,
+    )
+    return len(inputs.arr_room_ids_sorted)
+
+
+def create_parser():
+    """Creates the argument parser for the command line interface.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="adaptive-comfort",
+        description="Assess the thermal comfort of rooms against CIBSE TM52 and TM59. "
+        "Results for each room are written to stdout as JSON lines.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    for name in DI_WIZARDS:
+        subparser = subparsers.add_parser(
+            name, help="Run the {0} assessment.".format(name.upper())
+        )
+        subparser.add_argument(
+            "fdir", help="File directory containing the numpy data dumped from IES."
+        )
+        subparser.add_argument(
+            "--block-size",
+            type=int,
+            default=DEFAULT_BLOCK_SIZE,
+            help="Number of rooms calculated at a time (default: {0}).".format(
+                DEFAULT_BLOCK_SIZE
+            ),
+        )
+        subparser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes the blocks of rooms are spread across (default: 1).",
+        )
+        subparser.add_argument(
+            "--pass-fail-only",
+            action="store_true",
+            help="Only determine whether each room passes, stopping for each room once it has failed.",
+        )
+
+    subparser = subparsers.add_parser(
+        "serve",
+        help="Run a local service which keeps recently used projects in memory.",
+    )
+    subparser.add_argument("--host", default="127.0.0.1", help="Host to listen on.")
+    subparser.add_argument("--port", type=int, default=8052, help="Port to listen on.")
+    subparser.add_argument(
+        "--socket", help="Listen on this Unix socket instead of a host and port."
+    )
+    subparser.add_argument(
+        "--max-projects",
+        type=int,
+        default=16,
+        help="Maximum number of projects kept in memory (default: 16).",
+    )
+    subparser.add_argument(
+        "--quiet", action="store_true", help="Don't log each request."
+    )
+    subparser.add_argument(
+        "--root",
+        help="Only assess projects within this directory (default: the current directory). "
+        "Required if the host isn't localhost.",
+    )
+    return parser
+
+
+def main(argv=None):
+    """Entry point for the adaptive-comfort command.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code. 0 if the assessment completed, 1 otherwise.
+    """
+    args = create_parser().parse_args(argv)
+    if args.command == "serve":
+        from adaptive_comfort.service import serve
+
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        try:
+            serve(
+                host=args.host,
+                port=args.port,
+                fpth_socket=args.socket,
+                max_projects=args.max_projects,
+                quiet=args.quiet,
+                root=args.root,
+            )
+        except ValueError as err:
+            sys.stderr.write("error: {0}\n".format(err))
+            return 2
+        return 0
+    if args.block_size < 1:
+        sys.stderr.write("error: --block-size must be at least 1\n")
+        return 2
+    if args.workers < 1:
+        sys.stderr.write("error: --workers must be at least 1\n")
+        return 2
+    try:
+        stream_results(
+            DI_WIZARDS[args.command],
+            args.fdir,
+            args.block_size,
+            n_workers=args.workers,
+            pass_fail_only=args.pass_fail_only,
+        )
+    except Exception as err:
+        sys.stderr.write("error: {0}: {1}\n".format(type(err).__name__, err))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,164 +1,334 @@
 """Contains functions that perform all the different criteria that will be used for TM52 and TM59.
+
+Exceedance masks are packed a bit per reading and counted with popcount, see bitmask.py.
+
+With pass_fail_only, only whether each room passes is determined. The readings are scanned in time order a chunk
+of days at a time (CHUNK_DAYS) and a room is dropped from the later chunks once it has failed at every air speed,
+so the percentages and maxima are not calculated and are returned as NaN.
 """
 import numpy as np
 
-from adaptive_comfort.constants import MAY_START_HOUR, SEPT_END_HOUR
-from adaptive_comfort.utils import np_round_half_up, filter_bedroom_comfort_time
-from adaptive_comfort.equations import daily_weighted_exceedance
+from adaptive_comfort.bitmask import pack_comparison
+from adaptive_comfort.calendar_index import get_calendar_index
+from adaptive_comfort.utils import round_half_up_int, weighting_factors
+from adaptive_comfort.equations import daily_weighted_exceedance_occupied
+from adaptive_comfort.occupancy import occupied_index
+
+CHUNK_DAYS = 7  # Days scanned at a time with pass_fail_only, rooms which have failed are dropped from later chunks
+
+
+def _default_calendar_index(calendar_index, n_timesteps):
+    """Returns the calendar index, defaulting to a 365 day year if not given."""
+    if calendar_index is None:
+        return get_calendar_index(2010, n_timesteps)
+    return calendar_index
+
+
+def _nan_like(arr_bool):
+    """Placeholder for the percentages and maxima which aren't calculated with pass_fail_only."""
+    return np.full(arr_bool.shape, np.nan)
+
+
+def _sum_by_room(arr, arr_code, n_codes):
+    """Sums the values of each reading by its code (e.g. room), keeping the leading (air speed) axes."""
+    arr_flat = arr.reshape(-1, arr.shape[-1])
+    arr_sum = np.empty((len(arr_flat), n_codes))
+    for i, arr_values in enumerate(arr_flat):
+        arr_sum[i] = np.bincount(arr_code, weights=arr_values, minlength=n_codes)
+    return arr_sum.reshape(arr.shape[:-1] + (n_codes,))
+
+
+def _open_rooms(arr_bool):
+    """Whether each room is yet to fail at every air speed."""
+    return ~arr_bool.reshape(-1, arr_bool.shape[-1]).all(axis=0)
+
+
+def _occupied_exceeds_limit(arr, occupied, exceeds, arr_limit, chunk_steps):
+    """Whether the number of occupied readings which exceed the threshold is greater than the limit of each room.
+    The readings are scanned in time order, stopping for each room once the limit is exceeded at every air speed.
+
+    Args:
+        arr (numpy.ndarray): Values with the shape (air speeds, rooms, time-steps).
+        occupied (OccupiedIndex): Index of the readings to count.
+        exceeds (callable): Returns whether each of the values given exceeds the threshold.
+        arr_limit (numpy.ndarray): Maximum number of readings of each room which can exceed the threshold.
+        chunk_steps (int): Number of time-steps scanned at a time.
+
+    Returns:
+        numpy.ndarray: Boolean values with the shape (air speeds, rooms) where True means exceedance.
+    """
+    shape = arr.shape[:-2] + (occupied.n_rooms,)
+    arr_count = np.zeros(shape)
+    arr_bool = np.zeros(shape, dtype=bool)
+    for _, arr_room, arr_timestep in occupied.iter_time_chunks(chunk_steps):
+        arr_open = _open_rooms(arr_bool)
+        if not arr_open.any():
+            break  # Every room has failed
+        arr_keep = arr_open[arr_room]
+        arr_room, arr_timestep = arr_room[arr_keep], arr_timestep[arr_keep]
+        arr_count += _sum_by_room(
+            exceeds(arr[..., arr_room, arr_timestep]), arr_room, occupied.n_rooms
+        )
+        arr_bool |= arr_count > arr_limit
+    return arr_bool
+
+
+def _exceeds_limit(arr, exceeds, limit, chunk_steps, arr_timestep=None):
+    """Whether the number of readings which exceed the threshold is greater than the limit for each room.
+    The readings are scanned in time order, stopping for each room once the limit is exceeded at every air speed.
+
+    Args:
+        arr (numpy.ndarray): Values with the shape (air speeds, rooms, time-steps).
+        exceeds (callable): Returns whether each of the values given exceeds the threshold.
+        limit (float): Maximum number of readings which can exceed the threshold.
+        chunk_steps (int): Number of time-steps scanned at a time.
+        arr_timestep (numpy.ndarray, optional): Time-steps to scan, e.g. the night time-steps. Defaults to all.
+
+    Returns:
+        numpy.ndarray: Boolean values with the shape (air speeds, rooms) where True means exceedance.
+    """
+    n_steps = arr.shape[-1] if arr_timestep is None else len(arr_timestep)
+    arr_count = np.zeros(arr.shape[:-1], dtype=np.intp)
+    arr_bool = np.zeros(arr.shape[:-1], dtype=bool)
+    for start in range(0, n_steps, chunk_steps):
+        arr_rooms = np.flatnonzero(_open_rooms(arr_bool))
+        if not len(arr_rooms):
+            break  # Every room has failed
+        if arr_timestep is None:
+            arr_chunk = arr[..., arr_rooms, start : start + chunk_steps]
+        else:
+            arr_chunk = arr[..., arr_rooms[:, None], arr_timestep[None, start : start + chunk_steps]]
+        arr_count[..., arr_rooms] += exceeds(arr_chunk).sum(axis=-1)
+        arr_bool[..., arr_rooms] = arr_count[..., arr_rooms] > limit
+    return arr_bool
 
 
-def criterion_time_of_exceedance(arr_deltaT, arr_occupancy, factor):
+def criterion_time_of_exceedance(arr_deltaT, arr_occupancy, calendar_index=None, pass_fail_only=False):
     """Calculates whether a room has exceeded the threshold for time of exceedance. 
     Also calculates the percentage of occupied time exceeded out of total occupied time for each room.
     *See CIBSE TM52: 2013, Page 13, Section 6.1.2a*
     
     Args:
-        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature)
-        arr_occupancy (numpy.ndarray): Occupancy (Number of people)
+        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature), or delta T
+            already rounded, see utils.round_half_up_int.
+        arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): Occupancy (Number of people), or the occupied
+            time-steps already compiled, see occupancy.occupied_index.
+        calendar_index (CalendarIndex, optional): Time-step indices for the year. Defaults to a 365 day year.
+        pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once it
+            has failed. The percentage is returned as NaN. Defaults to False.
+
     Returns:
         tuple: First element contains boolean values where True means exceedance.
             Second element contains the percentage of exceedance.
     """
-    MAY_START = factor * MAY_START_HOUR  # Adjusting index to given time-step intervals
-    SEPT_END = factor * SEPT_END_HOUR
-
-    arr_deltaT_may_to_sept = arr_deltaT[
-        :, :, MAY_START:SEPT_END
-    ]  # Obtaining deltaT between May and end of September
-    arr_occupancy_may_to_sept = arr_occupancy[
-        :, MAY_START:SEPT_END
-    ]  # Obtaining occupancy between May and end of September
-
-    arr_deltaT_occupied_may_to_sept = np.where(
-        arr_occupancy_may_to_sept == 0, 0, arr_deltaT_may_to_sept
-    )  # Where unoccupied, set delta T to 0 to ignore in criterion test.
-    arr_deltaT_occupied_may_to_sept = np_round_half_up(
-        arr_deltaT_occupied_may_to_sept
-    ).astype(
-        int
-    )  # Round delta T as specified by CIBSE TM52 guide.
-
-    arr_deltaT_bool = (
-        arr_deltaT_occupied_may_to_sept >= 1
+    calendar_index = _default_calendar_index(calendar_index, arr_deltaT.shape[-1])
+    occupied_may_to_sept = occupied_index(arr_occupancy).time_slice(
+        calendar_index.summer
+    )  # Occupied time-steps between May and end of September. Unoccupied time-steps are ignored.
+    if pass_fail_only:
+        arr_bool = _occupied_exceeds_limit(
+            arr_deltaT,
+            occupied_may_to_sept,
+            lambda arr: round_half_up_int(arr) >= 1,
+            occupied_may_to_sept.arr_n_occupied * 0.03,
+            CHUNK_DAYS * calendar_index.steps_per_day,
+        )  # Stops for a room once its time of exceedance passes 3% of its occupied time
+        return arr_bool, _nan_like(arr_bool)
+
+    arr_deltaT_occupied_may_to_sept = round_half_up_int(
+        occupied_may_to_sept.gather(arr_deltaT)
+    )  # Round delta T as specified by CIBSE TM52 guide, if not already rounded.
+
+    arr_deltaT_bool = pack_comparison(
+        arr_deltaT_occupied_may_to_sept, np.greater_equal, 1
     )  # Find where delta T is greater than or equal to 1K.
-    arr_room_total_time_exceedance = arr_deltaT_bool.sum(
-        axis=2
-    )  # Sum along last axis (time) to get total time of exceedance per room
+    arr_room_total_time_exceedance = occupied_may_to_sept.count(
+        arr_deltaT_bool
+    )  # Total time of exceedance per room
 
-    arr_occupancy_bool = (
-        arr_occupancy_may_to_sept > 0
-    )  # True where period has occupancy greater than 0
     arr_occupancy_3_percent = (
-        arr_occupancy_bool.sum(axis=1) * 0.03
-    )  # Sum along time-step axis (time), i.e. sum time per room where occupied
+        occupied_may_to_sept.arr_n_occupied * 0.03
+    )  # Time per room where occupied
 
     arr_bool = arr_room_total_time_exceedance > arr_occupancy_3_percent
     arr_percent = (
-        arr_room_total_time_exceedance / arr_occupancy_bool.sum(axis=1)
+        arr_room_total_time_exceedance / occupied_may_to_sept.arr_n_occupied
     ) * 100  # Percentage of occupied time exceeded out of total occupied time
     return arr_bool, arr_percent
 
 
-def criterion_daily_weighted_exceedance(arr_deltaT, arr_occupancy):
+def criterion_daily_weighted_exceedance(
+    arr_deltaT, arr_occupancy, calendar_index=None, pass_fail_only=False
+):
     """Calculates whether a room has exceeded the daily weighted exceedance.
     Also calculates the percentage of days exceeding daily weight out of the total days.
 
     *See CIBSE TM52: 2013, Page 14, Section 6.1.2b*
 
     Args:
-        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature)
-        arr_occupancy (numpy.ndarray): Occupancy (Number of people)
+        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature), or delta T
+            already rounded, see utils.round_half_up_int.
+        arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): Occupancy (Number of people), or the occupied
+            time-steps already compiled, see occupancy.occupied_index.
+        calendar_index (CalendarIndex, optional): Time-step indices for the year. Defaults to a 365 day year.
+        pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once it
+            has failed. The max daily weight is returned as NaN. Defaults to False.
 
     Returns:
         tuple: First element contains boolean values where True means exceedance.
             Second element contains the percentage of how often exceedance occurred.
     """
-    arr_deltaT_occupied = np.where(
-        arr_occupancy == 0, 0, arr_deltaT
-    )  # Sets cells in arr_deltaT to 0 where arr_occupancy is 0. We only want to consider occupied intervals.
-    arr_daily_weights = daily_weighted_exceedance(arr_deltaT_occupied)
-    arr_daily_weight_bool = arr_daily_weights > 6  # See which days exceed 6
-    arr_criterion_two_bool = arr_daily_weight_bool.sum(
-        axis=2, dtype=bool
-    )  # sum the days for each room where exceedance occurs
+    calendar_index = _default_calendar_index(calendar_index, arr_deltaT.shape[-1])
+    occupied = occupied_index(
+        arr_occupancy
+    )  # We only want to consider occupied intervals, unoccupied intervals have a weight of 0.
+    if pass_fail_only:
+        steps_per_day = calendar_index.steps_per_day
+        arr_bool = np.zeros(arr_deltaT.shape[:-2] + (occupied.n_rooms,), dtype=bool)
+        for start, arr_room, arr_timestep in occupied.iter_time_chunks(CHUNK_DAYS * steps_per_day):
+            arr_open = _open_rooms(arr_bool)
+            if not arr_open.any():
+                break  # Every room has failed
+            arr_keep = arr_open[arr_room]
+            arr_room, arr_timestep = arr_room[arr_keep], arr_timestep[arr_keep]
+            arr_daily_weights = calendar_index.timestep_hours * _sum_by_room(
+                weighting_factors(arr_deltaT[..., arr_room, arr_timestep]),
+                arr_room * CHUNK_DAYS + (arr_timestep - start) // steps_per_day,
+                occupied.n_rooms * CHUNK_DAYS,
+            )  # Daily weight of each room for the days of the chunk
+            arr_bool |= (
+                arr_daily_weights.reshape(arr_bool.shape + (CHUNK_DAYS,)) > 6
+            ).any(axis=-1)  # Stops for a room at the first day its daily weight exceeds 6
+        return arr_bool, _nan_like(arr_bool)
+    arr_daily_weights = daily_weighted_exceedance_occupied(
+        occupied.gather(arr_deltaT), occupied, calendar_index
+    )
     arr_max = arr_daily_weights.max(axis=2)
+    arr_criterion_two_bool = arr_max > 6  # Exceedance occurs if any day of a room exceeds 6
     return arr_criterion_two_bool, arr_max
 
 
-def criterion_upper_limit_temperature(arr_deltaT):
+def criterion_upper_limit_temperature(arr_deltaT, calendar_index=None, pass_fail_only=False):
     """Checks whether delta T exceeds 4K at any point. K meaning kelvin.
     Also calculates the percentage of the number of readings exceeding 4K over total number of readings
 
     *See CIBSE TM52: 2013, Page 14, Section 6.1.2c*
 
     Args:
-        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature)
+        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature), or delta T
+            already rounded, see utils.round_half_up_int.
+        calendar_index (CalendarIndex, optional): Time-step indices for the year, only used with pass_fail_only.
+            Defaults to a 365 day year.
+        pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once it
+            has failed. The max delta T is returned as NaN. Defaults to False.
 
     Returns:
         tuple: First element contains boolean values where True means exceedance.
             Second element contains the percentage of exceedance.
     """
-    arr_deltaT_round = np_round_half_up(arr_deltaT).astype(int)
-    arr_bool = arr_deltaT_round > 4  # Boolean array wherever delta T value exceeds 4K
-    arr_criterion_three_bool = arr_bool.sum(
-        axis=2, dtype=bool
-    )  # Sum for each room to see if there is at least one exceedance
-    arr_max = arr_deltaT_round.max(axis=2)
+    if pass_fail_only:
+        calendar_index = _default_calendar_index(calendar_index, arr_deltaT.shape[-1])
+        arr_bool = _exceeds_limit(
+            arr_deltaT,
+            lambda arr: round_half_up_int(arr) > 4,
+            0,
+            CHUNK_DAYS * calendar_index.steps_per_day,
+        )  # Stops for a room at the first reading where delta T exceeds 4K
+        return arr_bool, _nan_like(arr_bool)
+    arr_deltaT_round = round_half_up_int(arr_deltaT)  # If not already rounded
+    arr_max = arr_deltaT_round.max(axis=2).astype(int)
+    arr_criterion_three_bool = (
+        arr_max > 4
+    )  # At least one exceedance for each room wherever delta T value exceeds 4K
     return arr_criterion_three_bool, arr_max
 
 
-def criterion_bedroom_comfort(arr_op_temp_v, factor):
+def criterion_bedroom_comfort(arr_op_temp_v, calendar_index=None, pass_fail_only=False):
     """Guarantee comfort during the sleeping hours. The operative temperature in the bedroom from 10pm to 7am must not exceed 26 degrees celsius
     for more than 1% of the annual time.
 
     Args:
         arr_op_temp_v (numpy.ndarray): Operative temperatue for each air speed at every time-step interval
+        calendar_index (CalendarIndex, optional): Time-step indices for the year. Defaults to a 365 day year.
+        pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once it
+            has failed. The percentage and hours are returned as NaN. Defaults to False.
 
     Returns:
         tuple: Returns room that failed and passed
             Percentage where 26 degrees celsius was exceeded
     """
-    arr_op_temp_v_bedroom_comfort = filter_bedroom_comfort_time(arr_op_temp_v, factor)
-    arr_bedroom_comfort_exceed_temp_bool = arr_op_temp_v_bedroom_comfort > 26
-    arr_bedroom_comfort_total_time = arr_bedroom_comfort_exceed_temp_bool.sum(axis=2)
+    calendar_index = _default_calendar_index(calendar_index, arr_op_temp_v.shape[-1])
+    max_hours = int(
+        0.01 * calendar_index.night_hours
+    )  # 1 percent of annual time between 10pm and 7am, in whole hours
+    if pass_fail_only:
+        arr_bool = _exceeds_limit(
+            arr_op_temp_v,
+            lambda arr: arr > 26,
+            max_hours / calendar_index.timestep_hours,
+            CHUNK_DAYS * calendar_index.steps_per_day,
+            arr_timestep=calendar_index.arr_night_index,
+        )  # Stops for a room once it exceeds 26 degrees celsius for more than 1 percent of the night time
+        return arr_bool, _nan_like(arr_bool), _nan_like(arr_bool)
+    arr_bedroom_comfort_exceed_temp_bool = pack_comparison(
+        arr_op_temp_v,
+        np.greater,
+        26,
+        chunk_size=CHUNK_DAYS * calendar_index.steps_per_day,
+        arr_index=calendar_index.arr_night_index,
+    )  # Only the time-steps between 10pm and 7am, a chunk at a time so the night readings aren't copied at once
+    arr_bedroom_comfort_total_time = arr_bedroom_comfort_exceed_temp_bool.count()
     arr_bool = (
-        arr_bedroom_comfort_total_time > 32 * factor
+        arr_bedroom_comfort_total_time > max_hours / calendar_index.timestep_hours
     )  # Can't exceed 1 percent of annual time between 10pm and 7am
     arr_percent = (
-        arr_bedroom_comfort_total_time / arr_op_temp_v_bedroom_comfort.shape[2]
+        arr_bedroom_comfort_total_time / calendar_index.n_night_steps
     ) * 100  # Percentage of time exceeding 26 degrees celsius over total annual time between 10pm and 7am
-    arr_hour_value = arr_bedroom_comfort_total_time / factor
+    arr_hour_value = arr_bedroom_comfort_total_time * calendar_index.timestep_hours
     return arr_bool, arr_percent, arr_hour_value
 
 
-def criterion_tm59_mechvent(arr_op_temp_v, arr_occupancy):
+def criterion_tm59_mechvent(arr_op_temp_v, arr_occupancy, calendar_index=None, pass_fail_only=False):
     """For homes with restricted window openings, we must follow this CIBSE criterion.
     All occupied rooms should not exceed an operative temperature of more than 26 degrees celsius for more than
     3 percent of the annual occupied time.
 
     Args:
         arr_op_temp_v (numpy.ndarray): Operative temperatue for each air speed
-        arr_occupancy (numpy.ndarray): Number of people in each room
+        arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): Number of people in each room, or the occupied
+            time-steps already compiled, see occupancy.occupied_index.
+        calendar_index (CalendarIndex, optional): Time-step indices for the year, only used with pass_fail_only.
+            Defaults to a 365 day year.
+        pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once it
+            has failed. The percentage is returned as NaN. Defaults to False.
 
     Returns:
         tuple: Returns which rooms failed and passed
             Also returns the percentage of time where rooms exceeded the threshold
     """
-    arr_op_temp_v_occupied = np.where(
-        arr_occupancy == 0, 0, arr_op_temp_v
+    occupied = occupied_index(
+        arr_occupancy
     )  # Want to ignore any temperatures where rooms are unoccupied
-    arr_op_temp_exceed_bool = arr_op_temp_v_occupied > 26
+    if pass_fail_only:
+        calendar_index = _default_calendar_index(calendar_index, arr_op_temp_v.shape[-1])
+        arr_bool = _occupied_exceeds_limit(
+            arr_op_temp_v,
+            occupied,
+            lambda arr: arr > 26,
+            occupied.arr_n_occupied * 0.03,
+            CHUNK_DAYS * calendar_index.steps_per_day,
+        )  # Stops for a room once it exceeds 26 degrees celsius for more than 3% of its occupied time
+        return arr_bool, _nan_like(arr_bool)
+    arr_op_temp_exceed_bool = occupied.pack_comparison(arr_op_temp_v, np.greater, 26)
+    arr_op_temp_exceed_total = occupied.count(arr_op_temp_exceed_bool)
 
-    arr_occupancy_bool = (
-        arr_occupancy > 0
-    )  # True where time-step has occupancy greater than 0
     arr_occupancy_3_percent = (
-        arr_occupancy_bool.sum(axis=1) * 0.03
-    )  # Sum along time-step axis i.e. sum time per room where occupied
+        occupied.arr_n_occupied * 0.03
+    )  # Time per room where occupied
 
-    arr_bool = arr_op_temp_exceed_bool.sum(axis=2) > arr_occupancy_3_percent
+    arr_bool = arr_op_temp_exceed_total > arr_occupancy_3_percent
     arr_percent = (
-        arr_op_temp_exceed_bool.sum(axis=2) / arr_occupancy_bool.sum(axis=1)
+        arr_op_temp_exceed_total / occupied.arr_n_occupied
     ) * 100  # Percentage of occupied time exceeded out of total occupied time
 
     return arr_bool, arr_percent
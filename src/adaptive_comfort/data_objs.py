@@ -13,6 +13,10 @@ class Tm52InputData(object):
     arr_mean_radiant_temp = None
     arr_occupancy = None
     arr_dry_bulb_temp = None
+    arr_room_name_codes = None  # Index of each sorted room's name within arr_room_name_labels
+    arr_room_name_labels = None  # Unique room names
+    arr_scenario_codes = None  # Index of each room's weather scenario, see scenarios.fold_scenarios
+    li_scenario_names = None  # Name of each weather scenario
 
 
 class Tm52InputPaths(object):
@@ -1,12 +1,15 @@
 """IES equations referenced from CIBSE guidance."""
 import functools
+import hashlib
+import threading
 import numpy as np
+from collections import OrderedDict
 
+from adaptive_comfort.calendar_index import get_calendar_index
 from adaptive_comfort.utils import (
     mean_every_n_elements,
     repeat_every_element_n_times,
-    sum_every_n_elements,
-    np_round_for_daily_weighted_exceedance,
+    weighting_factors,
 )
 
 
@@ -125,6 +128,56 @@ def calculate_running_mean_temp_hourly(arr_dry_bulb_temp_hourly):
     return ARR_RUNNING_MEAN_TEMP_hourly
 
 
+RUNNING_MEAN_CACHE_SIZE = 32  # Number of weather files kept in the running mean cache
+_running_mean_cache = OrderedDict()
+_running_mean_cache_lock = threading.Lock()
+
+
+def cached_running_mean_temp_hourly(arr_dry_bulb_temp_hourly):
+    """Calculates the running mean temperature hourly, keeping the most recently used results in a
+    least-recently-used cache keyed by the contents of the dry bulb temperature array.
+    Long running processes (e.g. adaptive_comfort.service) then only calculate the running mean once
+    per weather file.
+
+    Args:
+        arr_dry_bulb_temp_hourly (numpy.ndarray): The hourly dry bulb temperature.
+
+    Returns:
+        numpy.ndarray: Hourly running mean temperature. The array is read-only as it is shared between calls.
+    """
+    arr = np.ascontiguousarray(arr_dry_bulb_temp_hourly)
+    key = (arr.dtype.str, arr.shape, hashlib.sha1(arr.view(np.uint8)).hexdigest())
+    with _running_mean_cache_lock:
+        if key in _running_mean_cache:
+            _running_mean_cache.move_to_end(key)
+            return _running_mean_cache[key]
+
+    arr_running_mean_temp = calculate_running_mean_temp_hourly(arr)
+    arr_running_mean_temp.setflags(write=False)
+    with _running_mean_cache_lock:
+        _running_mean_cache[key] = arr_running_mean_temp
+        while len(_running_mean_cache) > RUNNING_MEAN_CACHE_SIZE:
+            _running_mean_cache.popitem(last=False)
+    return arr_running_mean_temp
+
+
+def running_mean_temp_scenarios(arr_dry_bulb_temp_hourly):
+    """Calculates the hourly running mean temperature for one or more weather scenarios, using the cache.
+
+    Args:
+        arr_dry_bulb_temp_hourly (numpy.ndarray): The hourly dry bulb temperature. Either a single series or one
+            series per scenario stacked on a leading scenario axis.
+
+    Returns:
+        numpy.ndarray: Hourly running mean temperature with the same shape as the dry bulb temperature.
+    """
+    if arr_dry_bulb_temp_hourly.ndim == 1:
+        return cached_running_mean_temp_hourly(arr_dry_bulb_temp_hourly)
+    return np.stack(
+        [cached_running_mean_temp_hourly(arr) for arr in arr_dry_bulb_temp_hourly]
+    )
+
+
 def additional_cooling(air_speed):
     """
     Returns adjustment to comfort temperature at high air speeds 
@@ -194,24 +247,24 @@ def deltaT(op_temp, max_acceptable_temp):
     return op_temp - max_acceptable_temp
 
 
-def daily_weighted_exceedance(arr_deltaT_occupied):
-    """Calculates the daily weighted exceedance.
+def daily_weighted_exceedance_occupied(arr_deltaT_occupied, occupied, calendar_index=None):
+    """Calculates the daily weighted exceedance from delta T for only the occupied readings, see
+    occupancy.OccupiedIndex.
 
     Args:
-        arr_deltaT_occupied (numpy.ndarray): Delta T for only occupied times.
+        arr_deltaT_occupied (numpy.ndarray): Delta T of the occupied readings with the shape
+            (air speeds, occupied readings).
+        occupied (OccupiedIndex): Index of the occupied readings.
+        calendar_index (CalendarIndex, optional): Time-step indices for the year. Defaults to a 365 day year.
 
     Returns:
-        numpy.ndarray: The daily weighted exceedance
-    """
-    arr_weighting_factors = np_round_for_daily_weighted_exceedance(arr_deltaT_occupied)
-    n = int(arr_weighting_factors.shape[2] / 365)
-    f = functools.partial(
-        sum_every_n_elements, n=n
-    )  # We want to sum the intervals so the array represents daily intervals
-    time_step = (
-        8760 / arr_weighting_factors.shape[2]
-    )  # If half hour steps then time_step = 1/2
-    return time_step * np.apply_along_axis(f, 2, arr_weighting_factors)
+        numpy.ndarray: The daily weighted exceedance with the shape (air speeds, rooms, days).
+    """
+    if calendar_index is None:
+        calendar_index = get_calendar_index(2010, occupied.n_timesteps)
+    arr_weighting_factors = weighting_factors(arr_deltaT_occupied)
+    time_step = calendar_index.timestep_hours  # If half hour steps then time_step = 1/2
+    return time_step * occupied.sum_by_day(arr_weighting_factors, calendar_index.steps_per_day)
 
 
 # Vectorised Functions
@@ -0,0 +1,285 @@
+"""Per-room histograms of rounded delta T for re-evaluating the criteria with other thresholds.
+
+The TM52 criteria only depend on how often each rounded delta T value (and each daily weight) occurs in a room, so
+once counted, the criteria can be re-evaluated for any threshold or allowance without the time-series. An
+ExceedanceSummary holds, for each air speed and room, a Histogram of the rounded delta T over the occupied summer
+time-steps (criterion 1), over every time-step (criterion 3), and of the daily weights (criterion 2). Each query
+is a lookup into the cumulative counts of the histograms.
+
+Example::
+
+    calc = Tm52CalcWizard.from_files(fdir, summarise=True)
+    arr_bool, arr_percent = calc.exceedance_summary.time_of_exceedance(threshold=2, allowance=5)
+"""
+import numpy as np
+
+from adaptive_comfort.calendar_index import get_calendar_index
+from adaptive_comfort.occupancy import occupied_index
+from adaptive_comfort.utils import round_half_up_int, weighting_factors
+
+CHUNK_SIZE = 2 ** 20  # Number of readings counted at a time by segment_histogram
+
+
+class Histogram(object):
+    def __init__(self, arr_counts, offset):
+        """Number of times each integer value occurs, see histogram and segment_histogram.
+
+        Args:
+            arr_counts (numpy.ndarray): Counts with the shape (..., bins). Bin i counts the value offset + i.
+            offset (int): Value counted by the first bin.
+        """
+        self.arr_counts = arr_counts
+        self.offset = offset
+        self.arr_at_least = np.zeros(arr_counts.shape[:-1] + (self.n_bins + 1,), dtype=np.intp)
+        self.arr_at_least[..., :-1] = np.cumsum(
+            arr_counts[..., ::-1], axis=-1
+        )[..., ::-1]  # Number of values greater than or equal to the value of each bin, then 0 past the last bin
+
+    @property
+    def n_bins(self):
+        """int: Number of bins."""
+        return self.arr_counts.shape[-1]
+
+    def count_at_least(self, value):
+        """Counts the values greater than or equal to a value.
+
+        Args:
+            value (float): The value.
+
+        Returns:
+            numpy.ndarray: Count with the shape of the histogram without its bins axis.
+        """
+        i = int(np.clip(np.ceil(value) - self.offset, 0, self.n_bins))
+        return self.arr_at_least[..., i]
+
+    def count_greater(self, value):
+        """Counts the values strictly greater than a value.
+
+        Args:
+            value (float): The value.
+
+        Returns:
+            numpy.ndarray: Count with the shape of the histogram without its bins axis.
+        """
+        return self.count_at_least(np.floor(value) + 1)
+
+    def max(self):
+        """The greatest value counted. Each histogram must have counted at least one value.
+
+        Returns:
+            numpy.ndarray: Greatest value with the shape of the histogram without its bins axis.
+        """
+        return self.offset + self.n_bins - 1 - np.argmax(self.arr_counts[..., ::-1] > 0, axis=-1)
+
+    def pad(self, offset, n_bins):
+        """Counts with more bins, e.g. to match the bins of another histogram.
+
+        Args:
+            offset (int): Value counted by the first bin, no greater than self.offset.
+            n_bins (int): Number of bins, covering all of the bins of the histogram.
+
+        Returns:
+            numpy.ndarray: Counts with the shape (..., n_bins).
+        """
+        arr_counts = np.zeros(self.arr_counts.shape[:-1] + (n_bins,), dtype=self.arr_counts.dtype)
+        start = self.offset - offset
+        arr_counts[..., start : start + self.n_bins] = self.arr_counts
+        return arr_counts
+
+
+def _value_range(arr):
+    """First value and number of bins needed to count the values of an integer array."""
+    if arr.size == 0:
+        return 0, 1
+    offset = int(arr.min())
+    return offset, int(arr.max()) - offset + 1
+
+
+def histogram(arr):
+    """Counts the integer values along the last axis.
+
+    Args:
+        arr (numpy.ndarray): Integer values, e.g. rounded delta T with the shape (air speeds, rooms, time-steps).
+
+    Returns:
+        Histogram: Counts with the shape (..., bins), e.g. (air speeds, rooms, bins).
+    """
+    offset, n_bins = _value_range(arr)
+    arr_flat = arr.reshape(-1, arr.shape[-1])
+    arr_counts = np.empty((len(arr_flat), n_bins), dtype=np.intp)
+    for i, arr_values in enumerate(arr_flat):
+        arr_counts[i] = np.bincount(arr_values.astype(np.intp) - offset, minlength=n_bins)
+    return Histogram(arr_counts.reshape(arr.shape[:-1] + (n_bins,)), offset)
+
+
+def segment_histogram(arr, arr_segment, n_segments, chunk_size=CHUNK_SIZE):
+    """Counts the integer values of each segment, e.g. the occupied readings of each room.
+
+    Args:
+        arr (numpy.ndarray): Integer values with the shape (..., readings).
+        arr_segment (numpy.ndarray): Segment (e.g. room) of each reading.
+        n_segments (int): Number of segments.
+        chunk_size (int, optional): Number of readings counted at a time. Defaults to CHUNK_SIZE.
+
+    Returns:
+        Histogram: Counts with the shape (..., segments, bins).
+    """
+    offset, n_bins = _value_range(arr)
+    arr_flat = arr.reshape(-1, arr.shape[-1])
+    arr_counts = np.zeros((len(arr_flat), n_segments * n_bins), dtype=np.intp)
+    for i, arr_values in enumerate(arr_flat):
+        for start in range(0, len(arr_segment), chunk_size):
+            arr_counts[i] += np.bincount(
+                arr_segment[start : start + chunk_size].astype(np.intp) * n_bins
+                + (arr_values[start : start + chunk_size].astype(np.intp) - offset),
+                minlength=n_segments * n_bins,
+            )
+    return Histogram(arr_counts.reshape(arr.shape[:-1] + (n_segments, n_bins)), offset)
+
+
+def concatenate_histograms(li_histograms, axis=-2):
+    """Joins histograms along an axis other than the bins axis, e.g. the histograms of each block of rooms.
+
+    Args:
+        li_histograms (list): Histograms to join.
+        axis (int, optional): Axis of the counts the histograms are joined along. Defaults to -2, the room axis.
+
+    Returns:
+        Histogram: The joined histogram.
+    """
+    offset = min(h.offset for h in li_histograms)
+    n_bins = max(h.offset + h.n_bins for h in li_histograms) - offset
+    return Histogram(
+        np.concatenate([h.pad(offset, n_bins) for h in li_histograms], axis=axis), offset
+    )
+
+
+class ExceedanceSummary(object):
+    def __init__(
+        self, hist_deltaT_occupied, arr_n_occupied, hist_deltaT, hist_daily_weight, timestep_hours
+    ):
+        """Histograms of the rounded delta T and daily weights of each room, see summarise_exceedance.
+
+        Args:
+            hist_deltaT_occupied (Histogram): Rounded delta T over the occupied summer time-steps with the shape
+                (air speeds, rooms, bins).
+            arr_n_occupied (numpy.ndarray): Number of occupied summer time-steps of each room.
+            hist_deltaT (Histogram): Rounded delta T over every time-step with the shape (air speeds, rooms, bins).
+            hist_daily_weight (Histogram): Daily weights of each day in time-steps, i.e. the daily weight divided by
+                the time-step in hours, with the shape (air speeds, rooms, bins).
+            timestep_hours (float): Length of a time-step in hours.
+        """
+        self.hist_deltaT_occupied = hist_deltaT_occupied
+        self.arr_n_occupied = arr_n_occupied
+        self.hist_deltaT = hist_deltaT
+        self.hist_daily_weight = hist_daily_weight
+        self.timestep_hours = timestep_hours
+
+    def time_of_exceedance(self, threshold=1, allowance=3):
+        """Re-evaluates criterion 1, see criteria_testing.criterion_time_of_exceedance.
+
+        Args:
+            threshold (float, optional): Delta T (K) the rounded delta T must equal or exceed. Defaults to 1.
+            allowance (float, optional): Percentage of the occupied time which can exceed the threshold.
+                Defaults to 3.
+
+        Returns:
+            tuple: First element contains boolean values where True means exceedance.
+                Second element contains the percentage of exceedance.
+        """
+        arr_n_exceed = self.hist_deltaT_occupied.count_at_least(threshold)
+        arr_bool = arr_n_exceed > self.arr_n_occupied * (allowance / 100)
+        arr_percent = (arr_n_exceed / self.arr_n_occupied) * 100
+        return arr_bool, arr_percent
+
+    def daily_weighted_exceedance(self, threshold=6):
+        """Re-evaluates criterion 2, see criteria_testing.criterion_daily_weighted_exceedance.
+
+        Args:
+            threshold (float, optional): Daily weight no day can exceed. Defaults to 6.
+
+        Returns:
+            tuple: First element contains boolean values where True means exceedance.
+                Second element contains the max daily weight.
+        """
+        arr_bool = self.hist_daily_weight.count_greater(threshold / self.timestep_hours) > 0
+        return arr_bool, self.hist_daily_weight.max() * self.timestep_hours
+
+    def days_exceeding(self, threshold=6):
+        """Counts the days with a daily weight greater than the threshold.
+
+        Args:
+            threshold (float, optional): Daily weight. Defaults to 6.
+
+        Returns:
+            numpy.ndarray: Number of days with the shape (air speeds, rooms).
+        """
+        return self.hist_daily_weight.count_greater(threshold / self.timestep_hours)
+
+    def upper_limit_temperature(self, threshold=4):
+        """Re-evaluates criterion 3, see criteria_testing.criterion_upper_limit_temperature.
+
+        Args:
+            threshold (float, optional): Delta T (K) the rounded delta T can't exceed. Defaults to 4.
+
+        Returns:
+            tuple: First element contains boolean values where True means exceedance.
+                Second element contains the max delta T.
+        """
+        arr_bool = self.hist_deltaT.count_greater(threshold) > 0
+        return arr_bool, self.hist_deltaT.max()
+
+
+def summarise_exceedance(arr_deltaT, arr_occupancy, calendar_index=None):
+    """Counts the rounded delta T and daily weights of each room.
+
+    Pass the rounded delta T and the occupied time-steps if already calculated for the criteria (as the wizards
+    do), so they aren't calculated again.
+
+    Args:
+        arr_deltaT (numpy.ndarray): Delta T (Operative temperature - Max acceptable temperature), or delta T
+            already rounded, see utils.round_half_up_int.
+        arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): Occupancy (Number of people), or the occupied
+            time-steps already compiled, see occupancy.occupied_index.
+        calendar_index (CalendarIndex, optional): Time-step indices for the year. Defaults to a 365 day year.
+
+    Returns:
+        ExceedanceSummary: The histograms of each air speed and room.
+    """
+    if calendar_index is None:
+        calendar_index = get_calendar_index(2010, arr_deltaT.shape[-1])
+    arr_deltaT_round = round_half_up_int(arr_deltaT)  # Returned as is if already rounded
+    occupied = occupied_index(arr_occupancy)  # Returned as is if already compiled
+    occupied_may_to_sept = occupied.time_slice(calendar_index.summer)
+    arr_daily_weights = occupied.sum_by_day(
+        weighting_factors(occupied.gather(arr_deltaT_round)), calendar_index.steps_per_day
+    )  # Daily weights in time-steps, multiplied by the time-step in hours for the daily weight
+    return ExceedanceSummary(
+        segment_histogram(
+            occupied_may_to_sept.gather(arr_deltaT_round),
+            occupied_may_to_sept.arr_room,
+            occupied.n_rooms,
+        ),
+        occupied_may_to_sept.arr_n_occupied,
+        histogram(arr_deltaT_round),
+        histogram(arr_daily_weights.astype(np.intp)),
+        calendar_index.timestep_hours,
+    )
+
+
+def concatenate_summaries(li_summaries):
+    """Joins the summaries of blocks of rooms, in room order.
+
+    Args:
+        li_summaries (list): ExceedanceSummary of each block.
+
+    Returns:
+        ExceedanceSummary: Summary of all of the rooms.
+    """
+    return ExceedanceSummary(
+        concatenate_histograms([s.hist_deltaT_occupied for s in li_summaries]),
+        np.concatenate([s.arr_n_occupied for s in li_summaries]),
+        concatenate_histograms([s.hist_deltaT for s in li_summaries]),
+        concatenate_histograms([s.hist_daily_weight for s in li_summaries]),
+        li_summaries[0].timestep_hours,
+    )
@@ -0,0 +1,125 @@
+"""Memory accounting for the calculation wizards.
+
+Peak traced allocation is measured for each stage of a wizard using :mod:`tracemalloc`. numpy reports
+its data buffers to tracemalloc, so the peaks include the full-size intermediates created within each
+stage (e.g. the rounded and masked copies made in ``criteria_testing``) as well as the arrays the
+wizard keeps hold of.
+"""
+import contextlib
+import importlib
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _reset_peak():
+    """Reset the traced peak so the next reading only covers the upcoming stage."""
+    try:
+        tracemalloc.reset_peak()
+    except AttributeError:  # Python < 3.9
+        tracemalloc.stop()
+        tracemalloc.start()
+
+
+def _arrays(obj):
+    """Returns the numpy arrays stored as attributes of an object.
+
+    Args:
+        obj (object): Any object, typically a calculation wizard.
+
+    Returns:
+        dict: Attribute names and arrays.
+    """
+    return {k: v for k, v in vars(obj).items() if isinstance(v, np.ndarray)}
+
+
+class MemoryTracker(object):
+    def __init__(self):
+        """Records the peak traced allocation per stage and the size of the arrays created by each stage.
+
+        Example::
+
+            calc = Tm52CalcWizard(inputs, track_memory=True)
+            print(calc.memory.report())
+        """
+        self.di_stage_peak = OrderedDict()  # Stage name: peak bytes allocated during the stage
+        self.di_array_nbytes = OrderedDict()  # Array name: bytes held by the array
+        self.di_array_stage = OrderedDict()  # Array name: stage that created the array
+        self._started_tracing = False
+
+    def start(self):
+        """Start tracing allocations if they aren't being traced already. The modules imported on first use by
+        the later stages (pandas and xlsxwriter) are imported first, so their import isn't counted as an
+        allocation of the stage which happens to use them first.
+        """
+        importlib.import_module("adaptive_comfort.xlsx_templater")  # Imports pandas and xlsxwriter
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """Stop tracing allocations if this tracker started the tracing."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name, obj=None):
+        """Context manager measuring the peak allocation of a stage.
+
+        Args:
+            name (str): Name of the stage.
+            obj (object, optional): Object whose new or replaced array attributes are recorded
+                against the stage. Defaults to None.
+        """
+        di_arrays_before = {k: id(v) for k, v in _arrays(obj).items()} if obj is not None else {}
+        _reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            self.di_stage_peak[name] = max(peak - current, 0)
+            if obj is not None:
+                for k, v in _arrays(obj).items():
+                    if di_arrays_before.get(k) != id(v):
+                        self.di_array_nbytes[k] = v.nbytes
+                        self.di_array_stage[k] = name
+
+    @property
+    def peak(self):
+        """int: The largest peak allocation of all the stages (bytes)."""
+        return max(self.di_stage_peak.values()) if self.di_stage_peak else 0
+
+    def peak_per_element(self, n):
+        """Peak allocation normalised by the number of elements in the problem.
+
+        Args:
+            n (int): Number of elements, e.g. the number of room time-steps.
+
+        Returns:
+            float: Peak bytes per element.
+        """
+        return self.peak / n
+
+    def report(self):
+        """Creates a plain text report of the peak allocation per stage and the size of each array.
+
+        Returns:
+            str: The report.
+        """
+        li_lines = ["Peak traced allocation per stage (MB):"]
+        for name, peak in self.di_stage_peak.items():
+            li_lines.append("    {0:<30}{1:>12.2f}".format(name, peak / 1e6))
+        li_lines.append("Arrays held (MB):")
+        for name, nbytes in sorted(
+            self.di_array_nbytes.items(), key=lambda item: item[1], reverse=True
+        ):
+            li_lines.append(
+                "    {0:<30}{1:>12.2f}    ({2})".format(
+                    name, nbytes / 1e6, self.di_array_stage[name]
+                )
+            )
+        return "\n".join(li_lines)
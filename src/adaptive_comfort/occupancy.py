@@ -0,0 +1,320 @@
+"""Compact index of the occupied time-steps of each room.
+
+Rooms are unoccupied for most of the year in residential models, so the occupancy gated criteria (see
+criteria_testing) only evaluate the occupied time-steps. The occupancy is compiled once into an OccupiedIndex,
+which holds the runs of consecutive occupied time-steps of each room (first and last + 1 time-step of each run,
+sorted by room, with a pointer to the first run of each room). Occupancy comes in runs of hours (e.g. a bedroom
+from 10pm to 7am), so the runs take far less memory than a boolean mask of every room and time-step, even for rooms
+occupied most of the time. The runs are expanded into the (room, time-step) position of each occupied reading a
+chunk at a time, to gather values from the air speed x room x time-step arrays and count or sum them per room,
+rather than masking full-size copies of the arrays.
+"""
+import numpy as np
+
+from adaptive_comfort.bitmask import PackedMask, pack_chunks
+
+CHUNK_SIZE = 2 ** 16  # Number of occupied readings expanded at a time
+
+
+def _index_dtype(n):
+    """Smallest unsigned integer type which can hold every index up to and including n."""
+    return np.uint16 if n <= np.iinfo(np.uint16).max else np.uint32
+
+
+def _expand_runs(arr_run_room, arr_start, arr_stop):
+    """Room and time-step of each reading within the runs, in run order.
+
+    Args:
+        arr_run_room (numpy.ndarray): Room of each run.
+        arr_start (numpy.ndarray): First time-step of each run.
+        arr_stop (numpy.ndarray): Last time-step + 1 of each run.
+
+    Returns:
+        tuple: Room and time-step of each reading.
+    """
+    arr_start = arr_start.astype(np.intp)
+    arr_length = arr_stop.astype(np.intp) - arr_start
+    arr_offset = np.cumsum(arr_length) - arr_length  # Position of the first reading of each run
+    arr_timestep = np.arange(arr_length.sum(), dtype=np.intp) + np.repeat(arr_start - arr_offset, arr_length)
+    return np.repeat(arr_run_room, arr_length), arr_timestep
+
+
+def _take_readings(arr, arr_room, arr_timestep, arr_out):
+    """Takes the readings of each room and time-step given from an array of values, see OccupiedIndex.gather.
+
+    Args:
+        arr (numpy.ndarray): Array with the shape (..., rooms, time-steps).
+        arr_room (numpy.ndarray): Room of each reading.
+        arr_timestep (numpy.ndarray): Time-step of each reading.
+        arr_out (numpy.ndarray): Array the readings are written to with the shape (..., readings).
+
+    Returns:
+        numpy.ndarray: arr_out.
+    """
+    if not arr.flags.c_contiguous:
+        arr_out[...] = arr[..., arr_room, arr_timestep]
+        return arr_out
+    arr_position = arr_room * arr.shape[-1]
+    arr_position += arr_timestep
+    for index in np.ndindex(arr.shape[:-2]):
+        np.take(
+            arr[index].reshape(-1), arr_position, out=arr_out[index], mode="clip"
+        )  # Written straight into the output from a view of each room x time-step array, without a copy
+    return arr_out
+
+
+class OccupiedIndex(object):
+    def __init__(
+        self, arr_run_indptr, arr_start, arr_stop, n_rooms, n_timesteps, arr_nonpositive=None
+    ):
+        """Runs of occupied time-steps, see occupied_index.
+
+        Args:
+            arr_run_indptr (numpy.ndarray): Runs of room i are arr_run_indptr[i]:arr_run_indptr[i + 1].
+            arr_start (numpy.ndarray): First time-step of each run, sorted within each room.
+            arr_stop (numpy.ndarray): Last time-step + 1 of each run.
+            n_rooms (int): Number of rooms.
+            n_timesteps (int): Number of time-steps.
+            arr_nonpositive (numpy.ndarray, optional): Room and time-step of the occupied readings whose occupancy
+                isn't greater than 0 (e.g. negative), with the shape (2, readings). Defaults to None, i.e. none.
+        """
+        self.arr_run_indptr = arr_run_indptr
+        self.arr_start = arr_start
+        self.arr_stop = arr_stop
+        self.n_rooms = n_rooms
+        self.n_timesteps = n_timesteps
+        self.arr_nonpositive = (
+            np.zeros((2, 0), dtype=np.intp) if arr_nonpositive is None else arr_nonpositive
+        )
+        arr_run_length = arr_stop.astype(np.intp) - arr_start
+        self.arr_indptr = np.append(0, np.cumsum(arr_run_length))[
+            arr_run_indptr
+        ]  # Readings of room i are arr_indptr[i]:arr_indptr[i + 1]
+        self.arr_n_occupied = np.diff(self.arr_indptr) - np.bincount(
+            self.arr_nonpositive[0], minlength=n_rooms
+        )  # Occupied time-steps of each room
+
+    def __repr__(self):
+        return "OccupiedIndex(n_rooms={0}, n_timesteps={1}, n_occupied={2})".format(
+            self.n_rooms, self.n_timesteps, self.n_readings
+        )
+
+    @property
+    def n_readings(self):
+        """int: Number of occupied readings."""
+        return int(self.arr_indptr[-1])
+
+    @property
+    def arr_room(self):
+        """numpy.ndarray: Room of each occupied reading in the smallest unsigned integer type, created on use."""
+        return np.repeat(
+            np.arange(self.n_rooms, dtype=_index_dtype(self.n_rooms)), np.diff(self.arr_indptr)
+        )
+
+    @property
+    def nbytes(self):
+        """int: Bytes held by the index."""
+        return sum(
+            arr.nbytes
+            for arr in [
+                self.arr_run_indptr,
+                self.arr_start,
+                self.arr_stop,
+                self.arr_nonpositive,
+                self.arr_indptr,
+                self.arr_n_occupied,
+            ]
+        )
+
+    def _run_rooms(self):
+        """Room of each run."""
+        return np.repeat(np.arange(self.n_rooms, dtype=np.intp), np.diff(self.arr_run_indptr))
+
+    def _iter_reading_chunks(self):
+        """Iterates over the occupied readings in room order, about CHUNK_SIZE readings (of whole runs) at a time.
+
+        Yields:
+            tuple: Position of the first and last + 1 reading of the chunk, room and time-step of each reading.
+        """
+        arr_run_room = self._run_rooms()
+        arr_run_end = np.cumsum(self.arr_stop.astype(np.intp) - self.arr_start)  # Readings up to each run
+        start_run, start_reading = 0, 0
+        while start_run < len(arr_run_end):
+            stop_run = max(
+                int(np.searchsorted(arr_run_end, start_reading + CHUNK_SIZE, side="right")), start_run + 1
+            )
+            arr_room, arr_timestep = _expand_runs(
+                arr_run_room[start_run:stop_run],
+                self.arr_start[start_run:stop_run],
+                self.arr_stop[start_run:stop_run],
+            )
+            stop_reading = int(arr_run_end[stop_run - 1])
+            yield start_reading, stop_reading, arr_room, arr_timestep
+            start_run, start_reading = stop_run, stop_reading
+
+    def time_slice(self, time_slice):
+        """Restricts the index to a period of the year.
+
+        Args:
+            time_slice (slice): Consecutive time-steps to keep, e.g. CalendarIndex.summer. The time-steps are not
+                renumbered.
+
+        Raises:
+            ValueError: If the time-steps aren't consecutive.
+
+        Returns:
+            OccupiedIndex: Index of the occupied readings within the period.
+        """
+        start, stop, step = time_slice.indices(self.n_timesteps)
+        if step != 1:
+            raise ValueError("Only a period of consecutive time-steps can be kept.")
+        stop = max(start, stop)
+        arr_start = np.clip(self.arr_start, start, stop).astype(self.arr_start.dtype)
+        arr_stop = np.clip(self.arr_stop, start, stop).astype(self.arr_stop.dtype)
+        arr_keep = arr_stop > arr_start
+        arr_run_indptr = np.append(
+            0, np.cumsum(np.bincount(self._run_rooms()[arr_keep], minlength=self.n_rooms))
+        )
+        arr_timestep = self.arr_nonpositive[1]
+        return OccupiedIndex(
+            arr_run_indptr,
+            arr_start[arr_keep],
+            arr_stop[arr_keep],
+            self.n_rooms,
+            self.n_timesteps,
+            self.arr_nonpositive[:, (arr_timestep >= start) & (arr_timestep < stop)],
+        )
+
+    def gather(self, arr):
+        """Gathers the occupied readings from an array of values for each room and time-step.
+
+        Args:
+            arr (numpy.ndarray): Array with the shape (..., rooms, time-steps), e.g. delta T for each air speed.
+
+        Returns:
+            numpy.ndarray: The occupied readings with the shape (..., occupied readings).
+        """
+        arr_out = np.empty(arr.shape[:-2] + (self.n_readings,), dtype=arr.dtype)
+        for a, b, arr_room, arr_timestep in self._iter_reading_chunks():
+            _take_readings(arr, arr_room, arr_timestep, arr_out[..., a:b])
+        return arr_out
+
+    def pack_comparison(self, arr, comparison, value):
+        """Compares the occupied readings of an array against a value and packs the result, gathering a chunk of
+        readings at a time rather than all of them, see gather and bitmask.pack_comparison.
+
+        Args:
+            arr (numpy.ndarray): Array with the shape (..., rooms, time-steps), e.g. the operative temperature for
+                each air speed.
+            comparison (numpy.ufunc): Comparison, e.g. numpy.greater.
+            value (float): Value compared against, e.g. the threshold of a criterion.
+
+        Returns:
+            PackedMask: The packed result of the comparison with the shape (..., occupied readings).
+        """
+        iter_bool = (
+            comparison(
+                _take_readings(arr, arr_room, arr_timestep, np.empty(arr.shape[:-2] + (b - a,), dtype=arr.dtype)),
+                value,
+            )
+            for a, b, arr_room, arr_timestep in self._iter_reading_chunks()
+        )
+        return pack_chunks(iter_bool, self.n_readings, arr.shape[:-2])
+
+    def count(self, arr_bool):
+        """Counts the True readings of each room.
+
+        Args:
+            arr_bool (Union[numpy.ndarray, PackedMask]): Boolean array of the occupied readings with the shape
+                (..., occupied readings), or the same packed, see bitmask.PackedMask.
+
+        Returns:
+            numpy.ndarray: Count for each room with the shape (..., rooms).
+        """
+        if isinstance(arr_bool, PackedMask):
+            return arr_bool.count_segments(self.arr_indptr)
+        arr_count = np.zeros(arr_bool.shape[:-1] + (self.n_rooms,), dtype=np.intp)
+        arr_rooms = np.flatnonzero(np.diff(self.arr_indptr))  # Rooms with occupied readings
+        if len(arr_rooms):
+            arr_count[..., arr_rooms] = np.add.reduceat(
+                arr_bool, self.arr_indptr[arr_rooms], axis=-1, dtype=np.intp
+            )
+        return arr_count
+
+    def iter_time_chunks(self, chunk_steps):
+        """Iterates over the occupied readings in time order, a chunk of time-steps at a time.
+
+        Args:
+            chunk_steps (int): Number of time-steps within each chunk.
+
+        Yields:
+            tuple: First time-step of the chunk, room and time-step of each occupied reading within the chunk.
+        """
+        arr_run_room = self._run_rooms()
+        for start in range(0, self.n_timesteps, chunk_steps):
+            stop = min(start + chunk_steps, self.n_timesteps)
+            arr_start = np.clip(self.arr_start, start, stop)
+            arr_stop = np.clip(self.arr_stop, start, stop)
+            arr_keep = arr_stop > arr_start
+            if not arr_keep.any():
+                continue
+            arr_room, arr_timestep = _expand_runs(
+                arr_run_room[arr_keep], arr_start[arr_keep], arr_stop[arr_keep]
+            )
+            arr_order = np.argsort(arr_timestep, kind="stable")  # Readings of each time-step stay in room order
+            yield start, arr_room[arr_order], arr_timestep[arr_order]
+
+    def sum_by_day(self, arr, steps_per_day):
+        """Sums the occupied readings of each room for each day.
+
+        Args:
+            arr (numpy.ndarray): Values of the occupied readings with the shape (..., occupied readings).
+            steps_per_day (int): Number of time-steps per day.
+
+        Returns:
+            numpy.ndarray: Daily sums with the shape (..., rooms, days). Days without occupied readings are 0.
+        """
+        n_days = self.n_timesteps // steps_per_day
+        arr_flat = arr.reshape(-1, arr.shape[-1])
+        arr_sum = np.zeros((len(arr_flat), self.n_rooms * n_days))
+        for a, b, arr_room, arr_timestep in self._iter_reading_chunks():
+            arr_codes = arr_room * n_days + arr_timestep // steps_per_day
+            for i, arr_values in enumerate(arr_flat):
+                arr_sum[i] += np.bincount(arr_codes, weights=arr_values[a:b], minlength=arr_sum.shape[1])
+        return arr_sum.reshape(arr.shape[:-1] + (self.n_rooms, n_days))
+
+
+def occupied_index(arr_occupancy):
+    """Compiles the occupancy of each room into an index of the occupied time-steps.
+
+    Args:
+        arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): Occupancy (Number of people) for each room and
+            time-step. If already compiled, it is returned as is.
+
+    Returns:
+        OccupiedIndex: Index of the time-steps where the occupancy isn't 0.
+    """
+    if isinstance(arr_occupancy, OccupiedIndex):
+        return arr_occupancy
+    n_rooms, n_timesteps = arr_occupancy.shape
+    dtype = _index_dtype(n_timesteps)
+    li_starts, li_stops, li_run_counts, li_nonpositive = [], [], [], []
+    for room, arr_room_occupancy in enumerate(arr_occupancy):  # A room at a time, only a row of the mask is held
+        arr_occupied = arr_room_occupancy != 0
+        arr_edges = np.diff(np.concatenate(([0], arr_occupied, [0])).astype(np.int8))
+        li_starts.append(np.flatnonzero(arr_edges == 1).astype(dtype))
+        li_stops.append(np.flatnonzero(arr_edges == -1).astype(dtype))
+        li_run_counts.append(len(li_starts[-1]))
+        arr_timestep = np.flatnonzero(
+            arr_occupied & ~(arr_room_occupancy > 0)
+        )  # e.g. negative occupancy, occupied but not counted towards the occupied time
+        if len(arr_timestep):
+            li_nonpositive.append(np.stack([np.full(len(arr_timestep), room), arr_timestep]))
+    return OccupiedIndex(
+        np.append(0, np.cumsum(li_run_counts, dtype=np.intp)),
+        np.concatenate(li_starts) if li_starts else np.zeros(0, dtype=dtype),
+        np.concatenate(li_stops) if li_stops else np.zeros(0, dtype=dtype),
+        n_rooms,
+        n_timesteps,
+        np.concatenate(li_nonpositive, axis=1) if li_nonpositive else None,
+    )
@@ -0,0 +1,153 @@
+"""Progress reporting and cooperative cancellation for long running assessments.
+
+A wizard reports a ProgressUpdate to its progress callback as it starts each stage, and, when assessed in blocks
+of rooms (see blocks.assess_in_blocks), as each block of rooms is completed. The cancellation token is checked at
+the same points, so a scheduler can stop a job cleanly between stages or blocks rather than killing the process.
+
+Example::
+
+    token = CancellationToken()
+    calc = Tm52CalcWizard.from_files(
+        fdir, block_size=50, progress=lambda update: print(update), cancel_token=token
+    )  # token.cancel() from another thread raises utils.AssessmentCancelled
+"""
+import collections
+import threading
+import time
+
+from adaptive_comfort.utils import AssessmentCancelled
+
+STAGE_COMPLETE = "complete"  # Reported once all of the stages are complete
+
+ProgressUpdate = collections.namedtuple(
+    "ProgressUpdate", ["stage", "rooms_done", "n_rooms", "elapsed", "remaining"]
+)
+ProgressUpdate.__doc__ = """Progress of an assessment.
+
+Attributes:
+    stage (str): Name of the stage being run, or STAGE_COMPLETE.
+    rooms_done (int): Number of rooms with completed results.
+    n_rooms (int): Total number of rooms.
+    elapsed (float): Seconds since the assessment started.
+    remaining (float): Estimated seconds remaining, from the time taken per room so far. None until the results
+        of some rooms are complete.
+"""
+
+
+class CancellationToken(object):
+    def __init__(self):
+        """A thread safe flag used to cancel an assessment, checked between stages and blocks of rooms."""
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Requests the assessment is stopped at the next stage or block of rooms."""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """bool: Whether cancel has been called."""
+        return self._event.is_set()
+
+    def check(self, stage=None):
+        """Raises if the assessment has been cancelled.
+
+        Args:
+            stage (str, optional): The stage about to be run, included in the error message. Defaults to None.
+
+        Raises:
+            AssessmentCancelled: If cancel has been called.
+        """
+        if self.cancelled:
+            raise AssessmentCancelled(
+                "Assessment cancelled" + (" before {0}.".format(stage) if stage else ".")
+            )
+
+
+class ProgressReporter(object):
+    def __init__(self, n_rooms, progress=None, cancel_token=None, on_stage=None):
+        """Reports the progress of an assessment and checks for cancellation. Passed to utils.run_stages as the
+        on_stage callback, so it is called before each stage.
+
+        Args:
+            n_rooms (int): Total number of rooms being assessed.
+            progress (callable, optional): Called with a ProgressUpdate as each stage starts and each block of
+                rooms is completed. Defaults to None.
+            cancel_token (CancellationToken, optional): Checked before each stage and block. Defaults to None.
+            on_stage (callable, optional): Also called with the name of each stage. Defaults to None.
+        """
+        self.n_rooms = n_rooms
+        self.progress = progress
+        self.cancel_token = cancel_token
+        self.on_stage = on_stage
+        self.rooms_done = 0
+        self.stage = None
+        self.time_start = time.perf_counter()
+        self.time_stage = self.time_start
+        self.di_stage_time = collections.OrderedDict()  # Stage name: seconds spent in the stage, summed over blocks
+
+    def __call__(self, stage):
+        """Called before each stage is run.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.check(stage)
+        self._record_time()
+        self.stage = stage
+        if self.on_stage is not None:
+            self.on_stage(stage)
+        self.report()
+
+    def add_rooms(self, n_rooms):
+        """Records a completed block of rooms, then checks for cancellation before the next block.
+
+        Args:
+            n_rooms (int): Number of rooms within the block.
+        """
+        self.rooms_done += n_rooms
+        self.report()
+        if self.cancel_token is not None and self.rooms_done < self.n_rooms:
+            self.cancel_token.check()
+
+    def add_stage_times(self, di_stage_time):
+        """Adds the time taken by the stages of a block calculated elsewhere, e.g. in a worker process.
+
+        Args:
+            di_stage_time (dict): Stage name: seconds spent in the stage.
+        """
+        for stage, seconds in di_stage_time.items():
+            self.di_stage_time[stage] = self.di_stage_time.get(stage, 0.0) + seconds
+
+    def complete(self):
+        """Records that all of the rooms and stages are complete."""
+        self.rooms_done = self.n_rooms
+        self._record_time()
+        self.stage = STAGE_COMPLETE
+        self.report()
+
+    @property
+    def elapsed(self):
+        """float: Seconds since the assessment started."""
+        return time.perf_counter() - self.time_start
+
+    def _record_time(self):
+        """Adds the time since the current stage started to the stage's total."""
+        now = time.perf_counter()
+        if self.stage is not None and self.stage != STAGE_COMPLETE:
+            self.di_stage_time[self.stage] = self.di_stage_time.get(self.stage, 0.0) + now - self.time_stage
+        self.time_stage = now
+
+    def report(self):
+        """Passes the current progress to the progress callback."""
+        if self.progress is None:
+            return
+        elapsed = self.elapsed
+        remaining = None
+        if self.stage == STAGE_COMPLETE:
+            remaining = 0.0
+        elif self.rooms_done:
+            remaining = elapsed / self.rooms_done * (self.n_rooms - self.rooms_done)
+        self.progress(
+            ProgressUpdate(self.stage, self.rooms_done, self.n_rooms, elapsed, remaining)
+        )
@@ -0,0 +1,77 @@
+"""Ranks the rooms with the worst results, without building the results data frames.
+
+The worst k values are found by partial selection (numpy.argpartition), which only sorts the k values selected
+rather than every room, so ranking stays quick for models with many thousands of rooms.
+
+Example::
+
+    di_worst = calc.worst_rooms(inputs, k=20)
+    ranking = di_worst["Criterion 1 (% Hours Delta T >= 1K)"]
+    ranking.arr_room_ids[0]  # The 20 worst rooms at the first air speed, worst first
+"""
+import collections
+
+import numpy as np
+
+RoomRanking = collections.namedtuple("RoomRanking", ["arr_room_index", "arr_room_ids", "arr_values"])
+RoomRanking.__doc__ = """The worst rooms for a criterion metric, worst first.
+
+Attributes:
+    arr_room_index (numpy.ndarray): Room axis index of each room with the shape (air speeds, k).
+    arr_room_ids (numpy.ndarray): Room ID of each room with the shape (air speeds, k).
+    arr_values (numpy.ndarray): Value of the metric with the shape (air speeds, k).
+"""
+
+
+def top_k(arr, k):
+    """Finds the k greatest values along the last axis by partial selection. NaN values (e.g. with
+    pass_fail_only) are ranked last, and equal values are ranked by their index.
+
+    Args:
+        arr (numpy.ndarray): Values, e.g. a criterion metric with the shape (air speeds, rooms).
+        k (int): Number of values to find. If greater than the length of the last axis, all are ranked.
+
+    Returns:
+        tuple: Index of the greatest values along the last axis, greatest first, with the shape (..., k).
+            The values with the same shape.
+    """
+    n = arr.shape[-1]
+    k = min(k, n)
+    arr_key = arr.astype(float)
+    arr_key[np.isnan(arr_key)] = -np.inf
+    if k < n:
+        arr_index = np.argpartition(arr_key, n - k, axis=-1)[..., n - k :]
+    else:
+        arr_index = np.broadcast_to(np.arange(n), arr.shape)
+    arr_order = np.lexsort(
+        (arr_index, -np.take_along_axis(arr_key, arr_index, axis=-1))
+    )  # Only the k values selected are sorted
+    arr_index = np.take_along_axis(arr_index, arr_order, axis=-1)
+    return arr_index, np.take_along_axis(arr, arr_index, axis=-1)
+
+
+def worst_rooms(arr_room_ids, di_criteria, k=10, di_criterion_room_index=None):
+    """Finds the k worst rooms for each criterion metric and air speed, i.e. those with the greatest values.
+
+    Args:
+        arr_room_ids (numpy.ndarray): Sorted room IDs
+        di_criteria (dict): criteria data with column names, see utils.create_df_results. Each array has the
+            shape (air speeds, rooms). The pass/fail (boolean) arrays aren't ranked.
+        k (int, optional): Number of rooms to find. Defaults to 10.
+        di_criterion_room_index (dict, optional): Room axis indices for criteria only run on a subset of the rooms
+            (e.g. bedrooms). Criteria not included are assumed to cover all rooms. Defaults to None.
+
+    Returns:
+        OrderedDict: Name of each criterion metric: RoomRanking.
+    """
+    di_criterion_room_index = di_criterion_room_index or {}
+    di_worst = collections.OrderedDict()
+    for criterion, di_criterion in di_criteria.items():
+        for name, arr in di_criterion.items():
+            if arr.dtype == bool:
+                continue
+            arr_index, arr_values = top_k(arr, k)
+            if criterion in di_criterion_room_index:
+                arr_index = di_criterion_room_index[criterion][arr_index]
+            di_worst[name] = RoomRanking(arr_index, arr_room_ids[arr_index], arr_values)
+    return di_worst
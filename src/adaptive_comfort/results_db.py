@@ -0,0 +1,266 @@
+"""Stores the results of every project in a local SQLite database for queries across projects.
+
+The results for each room and air speed are upserted as a row of the results table, keyed by project,
+assessment, room ID and air speed, with indexes on the project, room group, air speed and pass/fail columns. The
+input digest, the total time taken and the time taken by each stage are stored in the runs table. Rows of rooms which are no
+longer in a project are removed when the project is re-run. The time of each run is stored in UTC (see RUN_AT_FORMAT),
+and the since filter is converted to the same format, so the times compare correctly as text.
+
+Example::
+
+    calc = Tm59CalcWizard.from_files(fdir, results_db="results.sqlite")
+    li_rows = query_results("results.sqlite", assessment="TM59", fail=True, bedroom=True, since="2026-10-01")
+"""
+import datetime
+import json
+import sqlite3
+from collections import OrderedDict
+
+LI_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runs (
+        project TEXT NOT NULL,
+        assessment TEXT NOT NULL,
+        project_path TEXT,
+        output_path TEXT,
+        input_digest TEXT NOT NULL,
+        run_at TEXT NOT NULL,
+        elapsed REAL,
+        timings TEXT,
+        n_rooms INTEGER,
+        PRIMARY KEY (project, assessment)
+    )""",
+    """CREATE TABLE IF NOT EXISTS results (
+        project TEXT NOT NULL,
+        assessment TEXT NOT NULL,
+        room_id TEXT NOT NULL,
+        room_name TEXT,
+        room_group TEXT,
+        bedroom INTEGER,
+        air_speed REAL NOT NULL,
+        fail INTEGER NOT NULL,
+        results TEXT NOT NULL,
+        input_digest TEXT NOT NULL,
+        run_at TEXT NOT NULL,
+        PRIMARY KEY (project, assessment, room_id, air_speed)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_results_project ON results (project)",
+    "CREATE INDEX IF NOT EXISTS idx_results_room_group ON results (room_group)",
+    "CREATE INDEX IF NOT EXISTS idx_results_air_speed ON results (air_speed)",
+    "CREATE INDEX IF NOT EXISTS idx_results_fail ON results (fail)",
+    "CREATE INDEX IF NOT EXISTS idx_runs_run_at ON runs (run_at)",
+]  # Created if missing whenever the database is opened
+RUN_AT_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"  # UTC, so the times of runs sort and compare as text
+LI_SINCE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+]  # Formats of the since filter, a space may be used instead of the T
+LI_RESULTS_COLUMNS = [
+    "project",
+    "assessment",
+    "room_id",
+    "room_name",
+    "room_group",
+    "bedroom",
+    "air_speed",
+    "fail",
+    "results",
+    "input_digest",
+    "run_at",
+]
+
+
+def connect(fpth_db):
+    """Opens the results database, creating the tables and indexes if missing.
+
+    Args:
+        fpth_db (Union[pathlib.Path, str]): Path of the SQLite database.
+
+    Returns:
+        sqlite3.Connection: Connection to the database.
+    """
+    conn = sqlite3.connect(str(fpth_db))
+    with conn:
+        for statement in LI_SCHEMA:
+            conn.execute(statement)
+    return conn
+
+
+def utc_run_at(value):
+    """Converts a date and time into the format run_at is stored in, see RUN_AT_FORMAT.
+
+    Args:
+        value (Union[datetime.datetime, datetime.date, str]): Date and time, e.g. "2026-10-01T09:00". Naive dates
+            and times are local time, strings ending "Z" are UTC.
+
+    Raises:
+        ValueError: If a string isn't in one of LI_SINCE_FORMATS.
+
+    Returns:
+        str: The date and time in UTC.
+    """
+    if isinstance(value, str):
+        text = value.strip().replace(" ", "T")
+        is_utc = text.endswith("Z")
+        for fmt in LI_SINCE_FORMATS:
+            try:
+                dt = datetime.datetime.strptime(text.rstrip("Z"), fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError("Unrecognised date and time '{0}', e.g. 2026-10-01T09:00".format(value))
+        if is_utc:
+            dt = dt.replace(tzinfo=datetime.timezone.utc)
+    elif isinstance(value, datetime.datetime):
+        dt = value
+    else:  # A date
+        dt = datetime.datetime.combine(value, datetime.time())
+    return dt.astimezone(datetime.timezone.utc).strftime(RUN_AT_FORMAT)
+
+
+def _room_groups(di_room_ids_groups):
+    """Room ID: the first room group containing the room."""
+    di_room_group = {}
+    for group, li_room_ids in (di_room_ids_groups or {}).items():
+        for room_id in li_room_ids:
+            di_room_group.setdefault(str(room_id), group)
+    return di_room_group
+
+
+def _fail(assessment, di_speed):
+    """Whether a room fails the assessment at an air speed, from its results, see utils.iter_room_records."""
+    overall = "{0} (Pass/Fail)".format(assessment)
+    if overall in di_speed:
+        return di_speed[overall] == "Fail"
+    return any(v == "Fail" for k, v in di_speed.items() if k.endswith("(Pass/Fail)"))
+
+
+def write_results(fpth_db, calc, inputs):
+    """Upserts the results of a calculated wizard for each room and air speed.
+
+    Args:
+        fpth_db (Union[pathlib.Path, str]): Path of the SQLite database.
+        calc (object): A calculated wizard, e.g. Tm52CalcWizard.
+        inputs (Tm52InputData): Class instance containing the required inputs.
+
+    Returns:
+        int: Number of rows written.
+    """
+    project = inputs.di_project_info["project_name"]
+    run_at = utc_run_at(datetime.datetime.now(datetime.timezone.utc))  # Also identifies the rows of this run
+    di_room_group = _room_groups(inputs.di_room_ids_groups)
+    arr_bedroom_ids = getattr(calc, "arr_bedroom_ids", None)
+    set_bedroom_ids = None if arr_bedroom_ids is None else {str(i) for i in arr_bedroom_ids}
+    di_stage_time = getattr(calc, "di_stage_time", None) or OrderedDict()
+    elapsed = getattr(calc, "elapsed", None)
+    input_digest = calc.digest(inputs)
+
+    li_rows = []
+    for record in calc.room_records(inputs):
+        room_id = record["Room ID"]
+        for speed, di_speed in record["Results"].items():
+            li_rows.append(
+                (
+                    project,
+                    calc.ASSESSMENT,
+                    room_id,
+                    record["Room Name"],
+                    di_room_group.get(room_id),
+                    None if set_bedroom_ids is None else int(room_id in set_bedroom_ids),
+                    float(speed),
+                    int(_fail(calc.ASSESSMENT, di_speed)),
+                    json.dumps(di_speed),
+                    input_digest,
+                    run_at,
+                )
+            )
+
+    conn = connect(fpth_db)
+    try:
+        with conn:  # One transaction, so queries never see a partially written project
+            conn.executemany(
+                "INSERT OR REPLACE INTO results ({0}) VALUES ({1})".format(
+                    ", ".join(LI_RESULTS_COLUMNS), ", ".join("?" * len(LI_RESULTS_COLUMNS))
+                ),
+                li_rows,
+            )
+            conn.execute(
+                "DELETE FROM results WHERE project = ? AND assessment = ? AND run_at != ?",
+                (project, calc.ASSESSMENT, run_at),
+            )  # Rooms which are no longer in the project
+            conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    project,
+                    calc.ASSESSMENT,
+                    inputs.di_project_info.get("project_path"),
+                    getattr(calc, "output_path", None),
+                    input_digest,
+                    run_at,
+                    elapsed,
+                    json.dumps(di_stage_time),
+                    len(inputs.arr_room_ids_sorted),
+                ),
+            )
+    finally:
+        conn.close()
+    return len(li_rows)
+
+
+def query_results(
+    fpth_db, project=None, assessment=None, room_group=None, air_speed=None, fail=None, bedroom=None, since=None
+):
+    """Reads the results matching every filter given.
+
+    Args:
+        fpth_db (Union[pathlib.Path, str]): Path of the SQLite database.
+        project (str, optional): Project name. Defaults to None.
+        assessment (str, optional): Assessment, e.g. "TM59". Defaults to None.
+        room_group (str, optional): Room group. Defaults to None.
+        air_speed (float, optional): Air speed. Defaults to None.
+        fail (bool, optional): Whether the room fails the assessment. Defaults to None.
+        bedroom (bool, optional): Whether the room is a bedroom (TM59 only). Defaults to None.
+        since (Union[datetime.datetime, datetime.date, str], optional): Only results calculated at or after this
+            date and time, e.g. "2026-10-01" or "2026-10-01T09:00" in local time, see utc_run_at. Defaults to None.
+
+    Raises:
+        ValueError: If since isn't a recognised date and time.
+
+    Returns:
+        list: A dictionary of the columns for each row, with the results for the room decoded.
+    """
+    li_where = []
+    li_params = []
+    for column, value in [
+        ("project", project),
+        ("assessment", assessment),
+        ("room_group", room_group),
+        ("air_speed", None if air_speed is None else float(air_speed)),
+        ("fail", None if fail is None else int(fail)),
+        ("bedroom", None if bedroom is None else int(bedroom)),
+    ]:
+        if value is not None:
+            li_where.append("{0} = ?".format(column))
+            li_params.append(value)
+    if since is not None:
+        li_where.append("run_at >= ?")
+        li_params.append(utc_run_at(since))
+    sql = "SELECT {0} FROM results".format(", ".join(LI_RESULTS_COLUMNS))
+    if li_where:
+        sql += " WHERE " + " AND ".join(li_where)
+    sql += " ORDER BY project, assessment, room_id, air_speed"
+
+    conn = connect(fpth_db)
+    try:
+        li_rows = conn.execute(sql, li_params).fetchall()
+    finally:
+        conn.close()
+    li_results = []
+    for row in li_rows:
+        di_row = OrderedDict(zip(LI_RESULTS_COLUMNS, row))
+        di_row["results"] = json.loads(di_row["results"], object_pairs_hook=OrderedDict)
+        di_row["fail"] = bool(di_row["fail"])
+        li_results.append(di_row)
+    return li_results
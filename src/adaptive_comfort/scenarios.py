@@ -0,0 +1,138 @@
+"""Assess a building against several weather scenarios (e.g. DSY1, DSY2 and DSY3) in one batched pass.
+
+The results from IES for each scenario are stacked on a leading scenario axis with one dry bulb temperature
+series per scenario (stack_scenarios). For the calculation, the scenario axis is folded into the room axis
+(fold_scenarios) so the operative temperature, max acceptable temperature, delta T and criteria are calculated
+once for all of the scenarios. Each room is compared against the max acceptable temperature of its scenario,
+see utils.max_acceptable_temp_by_room.
+
+Example::
+
+    li_inputs = [fromfile(create_paths(fdir), allow_pickle=True) for fdir in li_fdirs]
+    di_results = assess_scenarios(Tm59CalcWizard, stack_scenarios(li_inputs, ["DSY1", "DSY2", "DSY3"]))
+"""
+import pathlib
+from collections import OrderedDict
+
+import numpy as np
+
+from adaptive_comfort.data_objs import Tm52InputData
+from adaptive_comfort.utils import LI_ROOM_INPUTS
+
+LI_SCENARIO_INPUTS = [
+    "arr_air_temp",
+    "arr_mean_radiant_temp",
+    "arr_occupancy",
+]  # Room input arrays which differ between scenarios
+
+
+def scenario_name(inputs, i):
+    """Default name of a weather scenario, the name of its weather file.
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+        i (int): Index of the scenario.
+
+    Returns:
+        str: Name of the scenario.
+    """
+    weather_file_path = (inputs.di_aps_info or {}).get("weather_file_path")
+    if weather_file_path:
+        return pathlib.PureWindowsPath(weather_file_path).stem
+    return "Scenario {0}".format(i + 1)
+
+
+def stack_scenarios(li_inputs, li_scenario_names=None):
+    """Stacks the input data for each weather scenario on a leading scenario axis.
+
+    Args:
+        li_inputs (list): Tm52InputData for each scenario, for the same rooms.
+        li_scenario_names (list, optional): Name of each scenario. Defaults to the weather file names.
+
+    Raises:
+        ValueError: If the scenarios don't have the same rooms or number of time-steps.
+
+    Returns:
+        Tm52InputData: The room arrays have the shape (scenarios, rooms, time-steps) and the dry bulb temperature
+            has the shape (scenarios, time-steps). The rest of the inputs are from the first scenario.
+    """
+    inputs_first = li_inputs[0]
+    for inputs in li_inputs[1:]:
+        if not np.array_equal(inputs.arr_room_ids_sorted, inputs_first.arr_room_ids_sorted):
+            raise ValueError("Weather scenarios must be for the same rooms.")
+        if inputs.arr_air_temp.shape != inputs_first.arr_air_temp.shape:
+            raise ValueError(
+                "Weather scenarios must have the same number of time-steps, got {0} and {1}.".format(
+                    inputs_first.arr_air_temp.shape, inputs.arr_air_temp.shape
+                )
+            )
+    if li_scenario_names is None:
+        li_scenario_names = [scenario_name(inputs, i) for i, inputs in enumerate(li_inputs)]
+    if len(li_scenario_names) != len(li_inputs):
+        raise ValueError("A name is required for each weather scenario.")
+
+    inputs_stacked = Tm52InputData()
+    inputs_stacked.__dict__.update(inputs_first.__dict__)
+    for name in LI_SCENARIO_INPUTS:
+        setattr(inputs_stacked, name, np.stack([getattr(inputs, name) for inputs in li_inputs]))
+    inputs_stacked.arr_dry_bulb_temp = np.stack([inputs.arr_dry_bulb_temp for inputs in li_inputs])
+    inputs_stacked.li_scenario_names = list(li_scenario_names)
+    return inputs_stacked
+
+
+def fold_scenarios(inputs_stacked):
+    """Folds the scenario axis of stacked input data into the room axis, so the wizards calculate the results for
+    every scenario in one pass. The room arrays are reshaped, not copied.
+
+    Args:
+        inputs_stacked (Tm52InputData): Stacked input data, see stack_scenarios.
+
+    Returns:
+        Tm52InputData: Input data with a "room" for each scenario and room, ordered by scenario then room.
+            arr_scenario_codes holds the index of each room's scenario.
+    """
+    n_scenarios, n_rooms = inputs_stacked.arr_air_temp.shape[:2]
+    inputs_folded = Tm52InputData()
+    inputs_folded.__dict__.update(inputs_stacked.__dict__)
+    for name in LI_SCENARIO_INPUTS:
+        arr = getattr(inputs_stacked, name)
+        setattr(inputs_folded, name, arr.reshape((n_scenarios * n_rooms,) + arr.shape[2:]))
+    for name in LI_ROOM_INPUTS:
+        arr = getattr(inputs_stacked, name)
+        if name not in LI_SCENARIO_INPUTS and arr is not None:
+            setattr(inputs_folded, name, np.tile(arr, n_scenarios))  # Same for every scenario
+    inputs_folded.arr_scenario_codes = np.repeat(np.arange(n_scenarios), n_rooms)
+    return inputs_folded
+
+
+def split_scenarios(li_room_records, inputs_folded):
+    """Splits the results for each room of folded input data into the results for each scenario.
+
+    Args:
+        li_room_records (list): Results for each room, see utils.iter_room_records.
+        inputs_folded (Tm52InputData): Folded input data, see fold_scenarios.
+
+    Returns:
+        OrderedDict: Scenario name: list of the results for each room.
+    """
+    di_scenarios = OrderedDict()
+    for i, name in enumerate(inputs_folded.li_scenario_names):
+        arr_room_index = np.flatnonzero(inputs_folded.arr_scenario_codes == i)
+        di_scenarios[name] = [li_room_records[idx] for idx in arr_room_index]
+    return di_scenarios
+
+
+def assess_scenarios(wizard, inputs_stacked, **kwargs):
+    """Runs an assessment for every weather scenario in one batched pass.
+
+    Args:
+        wizard (type): The calculation wizard, e.g. Tm59CalcWizard.
+        inputs_stacked (Tm52InputData): Stacked input data, see stack_scenarios.
+        **kwargs: Passed on to the wizard, e.g. room_categories.
+
+    Returns:
+        OrderedDict: Scenario name: list of the results for each room, see utils.iter_room_records.
+    """
+    inputs_folded = fold_scenarios(inputs_stacked)
+    calc = wizard(inputs_folded, write_results=False, **kwargs)
+    return split_scenarios(list(calc.room_records(inputs_folded)), inputs_folded)
@@ -0,0 +1,340 @@
+"""A long running local service for TM52, TM59 and TM59 mechanically ventilated assessments.
+
+Starting the interpreter, importing numpy/pandas and loading the project data is paid once when the service
+starts rather than for every assessment. The results of recently used projects are kept in a
+least-recently-used cache, as are the running mean temperatures of the weather files (see
+equations.cached_running_mean_temp_hourly). Repeat requests for a project whose input files haven't changed
+are returned straight from the cache.
+
+Requests are made over HTTP, either on localhost or on a Unix socket. Only projects within the root
+directory are assessed, and the input files are loaded without unpickling arbitrary objects (see
+utils.load_restricted). Listening on a host other than localhost requires a root to be given::
+
+    adaptive-comfort serve --port 8052 --root path/to/mf_results
+
+    POST /assess {"assessment": "tm59", "fdir": "path/to/mf_results/tm59/data"}
+    >>> {"assessment": "tm59", "fdir": "...", "cached": false, "elapsed_ms": 812.4, "results": [...]}
+"""
+import contextlib
+import ipaddress
+import json
+import logging
+import os
+import pathlib
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from adaptive_comfort.utils import create_paths, fromfile
+from adaptive_comfort.cli import DI_WIZARDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8052
+DEFAULT_MAX_PROJECTS = 16
+
+
+def is_loopback(host):
+    """Whether a host only accepts connections from this machine.
+
+    Args:
+        host (str): Host name or IP address.
+
+    Returns:
+        bool: True if the host is localhost or a loopback address.
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def input_signature(paths):
+    """A cheap signature of the input files used to check whether a cached project is still valid.
+
+    Args:
+        paths (Tm52InputPaths): Created from create_paths function.
+
+    Returns:
+        tuple: Name, size and modification time of each input file.
+    """
+    li_signature = []
+    for fpth in paths.__dict__.values():
+        stat = os.stat(str(fpth))
+        li_signature.append((fpth.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(li_signature)
+
+
+class ProjectCache(object):
+    def __init__(self, max_projects=DEFAULT_MAX_PROJECTS, root=None):
+        """Least-recently-used cache of project results.
+
+        Args:
+            max_projects (int, optional): Maximum number of projects kept in the cache.
+                Defaults to DEFAULT_MAX_PROJECTS.
+            root (Union[pathlib.Path, str], optional): Only projects within this directory are assessed.
+                Defaults to None, the current working directory.
+        """
+        self.max_projects = max_projects
+        self.root = pathlib.Path(os.getcwd() if root is None else root).resolve()
+        self._di_projects = OrderedDict()
+        self._di_in_flight = {}  # Lock and number of requests using it for each project being assessed
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._di_projects)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._di_projects.get(key)
+            if entry is not None:
+                self._di_projects.move_to_end(key)
+            return entry
+
+    def _set(self, key, entry):
+        with self._lock:
+            self._di_projects[key] = entry
+            self._di_projects.move_to_end(key)
+            while len(self._di_projects) > self.max_projects:
+                self._di_projects.popitem(last=False)
+
+    @contextlib.contextmanager
+    def _in_flight(self, key):
+        """Only one request at a time assesses a project, the others wait and then use the cached results."""
+        with self._lock:
+            li_lock_count = self._di_in_flight.setdefault(key, [threading.Lock(), 0])
+            li_lock_count[1] += 1
+        try:
+            with li_lock_count[0]:
+                yield
+        finally:
+            with self._lock:
+                li_lock_count[1] -= 1
+                if not li_lock_count[1]:
+                    del self._di_in_flight[key]
+
+    def resolve_fdir(self, fdir):
+        """Resolves a project directory, checking it is within the root directory.
+
+        Args:
+            fdir (Union[pathlib.Path, str]): File directory containing numpy data.
+
+        Raises:
+            PermissionError: If the directory isn't within the root directory.
+
+        Returns:
+            pathlib.Path: The resolved directory.
+        """
+        fdir = pathlib.Path(self.root, fdir).resolve()  # Relative to the root
+        if fdir != self.root and self.root not in fdir.parents:
+            raise PermissionError("'{0}' isn't within the service root directory".format(fdir))
+        return fdir
+
+    def assess(self, assessment, fdir):
+        """Returns the results of an assessment for a project, calculating them if they aren't cached or the
+        input files have changed since they were cached.
+
+        Args:
+            assessment (str): One of "tm52", "tm59" or "tm59mechvent".
+            fdir (Union[pathlib.Path, str]): File directory containing numpy data.
+
+        Raises:
+            ValueError: If the assessment isn't recognised.
+            PermissionError: If the directory isn't within the root directory.
+
+        Returns:
+            tuple: First element is the list of results for each room (see utils.iter_room_records).
+                Second element is True if the results came from the cache.
+        """
+        if assessment not in DI_WIZARDS:
+            raise ValueError(
+                "Unknown assessment '{0}'. Choose from: {1}".format(
+                    assessment, ", ".join(DI_WIZARDS)
+                )
+            )
+        fdir = self.resolve_fdir(fdir)
+        paths = create_paths(fdir)
+        key = (assessment, str(fdir))
+        with self._in_flight(key):
+            signature = input_signature(paths)
+            entry = self._get(key)
+            if entry is not None and entry["signature"] == signature:
+                return entry["results"], True
+
+            inputs = fromfile(paths)  # Without pickle, the requests can come from other users
+            calc = DI_WIZARDS[assessment](inputs, write_results=False)
+            li_results = list(calc.room_records(inputs))
+            self._set(key, {"signature": signature, "results": li_results})
+        return li_results, False
+
+
+class AssessmentRequestHandler(BaseHTTPRequestHandler):
+    """Handles requests to the assessment service.
+
+    GET /health returns the service status. POST /assess runs an assessment, the body is a JSON object with
+    the keys "assessment" and "fdir".
+    """
+
+    def _send_json(self, status, di):
+        body = json.dumps(di).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": "Not found: {0}".format(self.path)})
+            return
+        self._send_json(
+            200, {"status": "ok", "cached_projects": len(self.server.project_cache)}
+        )
+
+    def do_POST(self):
+        if self.path != "/assess":
+            self._send_json(404, {"error": "Not found: {0}".format(self.path)})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            di_request = json.loads(self.rfile.read(length).decode("utf-8"))
+            assessment, fdir = di_request["assessment"], di_request["fdir"]
+        except (ValueError, KeyError, TypeError) as err:
+            self._send_json(400, {"error": "Invalid request: {0}".format(err)})
+            return
+        try:
+            li_results, cached = self.server.project_cache.assess(assessment, fdir)
+        except PermissionError as err:
+            self._send_json(403, {"error": str(err)})
+            return
+        except Exception as err:
+            self._send_json(
+                500, {"error": "{0}: {1}".format(type(err).__name__, err)}
+            )
+            return
+        self._send_json(
+            200,
+            {
+                "assessment": assessment,
+                "fdir": fdir,
+                "cached": cached,
+                "elapsed_ms": (time.perf_counter() - start) * 1000,
+                "results": li_results,
+            },
+        )
+
+    def address_string(self):
+        # Unix socket connections don't have a (host, port) client address
+        if isinstance(self.client_address, tuple):
+            return BaseHTTPRequestHandler.address_string(self)
+        return "unix"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+class AssessmentServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        server_address=(DEFAULT_HOST, DEFAULT_PORT),
+        max_projects=DEFAULT_MAX_PROJECTS,
+        quiet=False,
+        root=None,
+    ):
+        """HTTP server on localhost holding a cache of recently used projects.
+
+        Args:
+            server_address (tuple, optional): Host and port. Defaults to (DEFAULT_HOST, DEFAULT_PORT).
+            max_projects (int, optional): Maximum number of projects kept in the cache.
+                Defaults to DEFAULT_MAX_PROJECTS.
+            quiet (bool, optional): Don't log each request to stderr. Defaults to False.
+            root (Union[pathlib.Path, str], optional): Only projects within this directory are assessed.
+                Defaults to None, the current working directory.
+        """
+        self.project_cache = ProjectCache(max_projects, root)
+        self.quiet = quiet
+        HTTPServer.__init__(self, server_address, AssessmentRequestHandler)
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class UnixAssessmentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(
+            self, fpth_socket, max_projects=DEFAULT_MAX_PROJECTS, quiet=False, root=None
+        ):
+            """HTTP server on a Unix socket holding a cache of recently used projects.
+
+            Args:
+                fpth_socket (Union[pathlib.Path, str]): Path of the Unix socket.
+                max_projects (int, optional): Maximum number of projects kept in the cache.
+                    Defaults to DEFAULT_MAX_PROJECTS.
+                quiet (bool, optional): Don't log each request to stderr. Defaults to False.
+                root (Union[pathlib.Path, str], optional): Only projects within this directory are assessed.
+                    Defaults to None, the current working directory.
+            """
+            self.project_cache = ProjectCache(max_projects, root)
+            self.quiet = quiet
+            socketserver.UnixStreamServer.__init__(
+                self, str(fpth_socket), AssessmentRequestHandler
+            )
+
+
+def serve(
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    fpth_socket=None,
+    max_projects=DEFAULT_MAX_PROJECTS,
+    quiet=False,
+    root=None,
+):
+    """Runs the assessment service until interrupted.
+
+    Args:
+        host (str, optional): Host to listen on. Defaults to DEFAULT_HOST.
+        port (int, optional): Port to listen on. Defaults to DEFAULT_PORT.
+        fpth_socket (Union[pathlib.Path, str], optional): Listen on a Unix socket instead of host and port.
+            Defaults to None.
+        max_projects (int, optional): Maximum number of projects kept in the cache.
+            Defaults to DEFAULT_MAX_PROJECTS.
+        quiet (bool, optional): Don't log each request to stderr. Defaults to False.
+        root (Union[pathlib.Path, str], optional): Only projects within this directory are assessed.
+            Defaults to None, the current working directory.
+
+    Raises:
+        ValueError: If listening on a host other than localhost without a root directory.
+    """
+    if fpth_socket is not None:
+        if os.path.exists(str(fpth_socket)):  # Left behind by a previous service
+            os.remove(str(fpth_socket))
+        server = UnixAssessmentServer(fpth_socket, max_projects, quiet, root)
+        address = str(fpth_socket)
+    else:
+        if root is None and not is_loopback(host):
+            raise ValueError(
+                "A root directory is required to listen on '{0}', which isn't localhost".format(host)
+            )
+        server = AssessmentServer((host, port), max_projects, quiet, root)
+        address = "http://{0}:{1}".format(*server.server_address[:2])
+    logger.info("Adaptive comfort service listening on %s", address)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if fpth_socket is not None and os.path.exists(str(fpth_socket)):
+            os.remove(str(fpth_socket))
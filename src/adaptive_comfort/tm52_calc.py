@@ -52,28 +52,39 @@ Process
         Outputs the dataframes to an excel spreadsheet in the project location.
 """
 
+import copy
 import functools
-import pathlib
 import numpy as np
-import pandas as pd
 import datetime
 from collections import OrderedDict
 
-from adaptive_comfort.xlsx_templater import to_excel
 from adaptive_comfort.equations import (
-    deltaT,
-    calculate_running_mean_temp_hourly,
+    daily_weighted_exceedance_occupied,
+    running_mean_temp_scenarios,
     np_calc_op_temp,
-    np_calculate_max_acceptable_temp,
 )
 from adaptive_comfort.utils import (
-    np_round_half_up,
+    round_half_up_int,
     repeat_every_element_n_times,
-    create_paths,
-    fromfile,
-    create_df_from_criterion,
+    create_df_results,
+    speed_block,
+    sorted_room_names,
+    scenario_room_columns,
+    room_category_codes,
+    deltaT_by_category,
+    max_acceptable_temp_by_room,
+    iter_room_records,
+    run_stages,
+    write_stored_results,
 )
+from adaptive_comfort.wizard import CalcWizardBase
 from adaptive_comfort.constants import arr_air_speed
+from adaptive_comfort.memory import MemoryTracker
+from adaptive_comfort.progress import ProgressReporter
+from adaptive_comfort.calendar_index import calendar_index_from_inputs
+from adaptive_comfort.occupancy import occupied_index
+from adaptive_comfort.histograms import summarise_exceedance
+from adaptive_comfort.ranking import top_k, worst_rooms
 from adaptive_comfort.criteria_testing import (
     criterion_time_of_exceedance,
     criterion_daily_weighted_exceedance,
@@ -81,8 +92,40 @@ from adaptive_comfort.criteria_testing import (
 )
 
 
-class Tm52CalcWizard:
-    def __init__(self, inputs, fdir_results=None, on_linux=True):
+class Tm52CalcWizard(CalcWizardBase):
+    ASSESSMENT = "TM52"  # Name of the assessment within the calculation settings
+    RESULTS_SUBDIR = "tm52"  # Subdirectory of the project's mf_results folder, see results_fpth
+    LI_ROOM_RESULTS = [
+        "arr_criterion_one_bool",
+        "arr_criterion_one_percent",
+        "arr_criterion_two_bool",
+        "arr_criterion_two_max",
+        "arr_criterion_three_bool",
+        "arr_criterion_three_max",
+        "arr_tm52_bool",
+        "arr_sorted_room_names",
+    ]  # Results with the room axis last, concatenated when calculated in blocks of rooms, see blocks.py
+    LI_ROOM_INDEX_RESULTS = []  # Room axis indices, offset to the block's first room when concatenated
+    DEFAULT_CATEGORY = "II"  # For TM52 calculation use category 2
+    DI_GROUP_CATEGORIES = {}  # Room group name: category
+
+    def __init__(
+        self,
+        inputs,
+        fdir_results=None,
+        on_linux=True,
+        track_memory=False,
+        write_results=True,
+        input_digest=None,
+        group_categories=None,
+        room_categories=None,
+        on_stage=None,
+        progress=None,
+        cancel_token=None,
+        pass_fail_only=False,
+        summarise=False,
+        results_db=None,
+    ):
         """Calculates the operative temperature, maximum acceptable temperature, and delta T for each air speed
         and produces the results in an excel spreadsheet. 
 
@@ -90,33 +133,79 @@ class Tm52CalcWizard:
             inputs (Tm52InputData): Class instance containing the required inputs.
             fdir_results (Union[pathlib.Path, str]): Used to override project path to save elsewhere.
             on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
+            track_memory (bool, optional): Record the peak traced allocation of each stage and the size of each
+                array in self.memory. Defaults to False.
+            write_results (bool, optional): Merge the results into data frames and output them to excel. If False
+                only the criteria arrays are calculated. Defaults to True.
+            input_digest (str, optional): Digest of the input data and calculation settings, see
+                utils.input_digest. If None, it is calculated from the input data when first needed, i.e. when
+                the results are stored, see digest. Defaults to None.
+            group_categories (dict, optional): Category (I, II or III) for the rooms within each room group, e.g.
+                {"Care Home": "I"}. Added to DI_GROUP_CATEGORIES. Defaults to None.
+            room_categories (dict, optional): Category (I, II or III) for specific room IDs, taking precedence over
+                the group categories. Defaults to None.
+            on_stage (callable, optional): Called with the name of each stage before it is run, e.g. to report
+                progress. An exception raised by it stops the calculation, see utils.run_stages. Defaults to None.
+            progress (callable, optional): Called with a progress.ProgressUpdate (stage, rooms done, estimated time
+                remaining) as each stage starts and once complete. Defaults to None.
+            cancel_token (progress.CancellationToken, optional): Checked before each stage, raising
+                utils.AssessmentCancelled once cancelled. Defaults to None.
+            pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once
+                it has failed a criterion, see criteria_testing. The percentages and maxima are NaN. Defaults to
+                False.
+            summarise (bool, optional): Also count the rounded delta T and daily weights of each room into
+                self.exceedance_summary, so the criteria can be re-evaluated with other thresholds, see
+                histograms.py. Defaults to False.
+            results_db (Union[pathlib.Path, str], optional): Also upsert the results for each room and air speed
+                into this SQLite database once complete, see results_db.py. Defaults to None.
         """
+        self.memory = MemoryTracker() if track_memory else None
+        self.skipped = False
+        self.pass_fail_only = pass_fail_only
+        self.exceedance_summary = None
+        self.input_digest = input_digest  # Calculated when first needed, see digest
+        self.di_settings = {
+            "group_categories": group_categories,
+            "room_categories": room_categories,
+            "pass_fail_only": pass_fail_only,
+        }  # Settings included in the input digest
+        self.di_group_categories = dict(self.DI_GROUP_CATEGORIES, **(group_categories or {}))
+        self.di_room_categories = room_categories or {}
         self._check_occupancy_data(inputs)
-        self.factor = int(
-            inputs.arr_air_temp.shape[1] / 8760
+        self.calendar_index = calendar_index_from_inputs(inputs)
+        self.factor = (
+            self.calendar_index.steps_per_hour
         )  # Find factor to hourly time-step array
-        self.op_temp(inputs)
-        self.max_acceptable_temp(inputs)
-        self.deltaT()
-        self.run_criteria(inputs)
-        self.merge_dfs(inputs)
-        self.to_excel(inputs, fdir_results, on_linux)
-
-    @classmethod
-    def from_files(cls, fdir, fdir_results=None, on_linux=True):
-        """Pass file directory containing numpy data.
-
-        Args:
-            fdir (Union[pathlib.Path, str]): file directory containing numpy data.
-            fdir_results (Union[pathlib.Path, str], optional): Used to override project path to save elsewhere.
-            on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.. Defaults to True.
+        progress_reporter = ProgressReporter(
+            len(inputs.arr_room_ids_sorted), progress, cancel_token, on_stage
+        )
+        run_stages(
+            [
+                ("op_temp", functools.partial(self.op_temp, inputs)),
+                ("max_acceptable_temp", functools.partial(self.max_acceptable_temp, inputs)),
+                ("deltaT", self.deltaT),
+                ("run_criteria", functools.partial(self.run_criteria, inputs)),
+            ]
+            + ([("summarise", functools.partial(self.summarise, inputs))] if summarise else [])
+            + (
+                [
+                    ("merge_dfs", functools.partial(self.merge_dfs, inputs)),
+                    ("to_excel", functools.partial(self.to_excel, inputs, fdir_results, on_linux)),
+                ]
+                if write_results
+                else []
+            ),
+            memory_tracker=self.memory,
+            obj=self,
+            on_stage=progress_reporter,
+        )
+        progress_reporter.complete()
+        self.di_stage_time = progress_reporter.di_stage_time  # Seconds taken by each stage
+        self.elapsed = progress_reporter.elapsed
+        if results_db is not None:
+            from adaptive_comfort.results_db import write_results as write_results_db
 
-        Returns:
-            _type_: _description_
-        """
-        paths = create_paths(fdir)
-        input_data = fromfile(paths, allow_pickle=True)
-        return cls(inputs=input_data, fdir_results=fdir_results, on_linux=on_linux)
+            write_results_db(results_db, self, inputs)
 
     @staticmethod
     def _check_occupancy_data(inputs):
@@ -150,12 +239,23 @@ class Tm52CalcWizard:
         Args:
             inputs (Tm52InputData): Class instance containing the required inputs.
         """
-        self.ARR_RUNNING_MEAN_TEMP = calculate_running_mean_temp_hourly(
+        self.ARR_RUNNING_MEAN_TEMP = running_mean_temp_scenarios(
             inputs.arr_dry_bulb_temp
+        )  # One series per weather scenario if the inputs are from several scenarios, see scenarios.py
+        # Max acceptable temperature for each category and weather scenario in use, the one each room is compared
+        # against is in arr_max_temp_index
+        self.li_categories, self.arr_category_codes = room_category_codes(
+            inputs.arr_room_ids_sorted,
+            inputs.di_room_ids_groups,
+            self.DEFAULT_CATEGORY,
+            self.di_group_categories,
+            self.di_room_categories,
         )
-        cat_II_temp = 3  # For TM52 calculation use category 2
-        self.arr_max_acceptable_temp = np_calculate_max_acceptable_temp(
-            self.ARR_RUNNING_MEAN_TEMP, cat_II_temp, arr_air_speed
+        self.arr_max_acceptable_temp, self.arr_max_temp_index = max_acceptable_temp_by_room(
+            self.ARR_RUNNING_MEAN_TEMP,
+            self.li_categories,
+            self.arr_category_codes,
+            inputs.arr_scenario_codes,
         )
         if (
             self.arr_max_acceptable_temp.shape[2] != self.arr_op_temp_v.shape[2]
@@ -170,33 +270,40 @@ class Tm52CalcWizard:
         """Calculates the temperature difference between the operative temperature and the maximum
         acceptable temperature for each air speed.
         """
-        self.arr_deltaT = deltaT(self.arr_op_temp_v, self.arr_max_acceptable_temp)
+        self.arr_deltaT = deltaT_by_category(
+            self.arr_op_temp_v, self.arr_max_acceptable_temp, self.arr_max_temp_index
+        )
 
     def run_criterion_one(self, arr_occupancy):
         """Convert delta T and occupancy array so the reporting interval is hourly, round the values,
         and then run criterion one.
 
         Args:
-            arr_occupancy (numpy.ndarray): The number of people for each room per reporting interval
+            arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): The number of people for each room per reporting
+                interval, or the occupied time-steps, see occupancy.occupied_index.
 
         Returns:
             tuple: First element contains boolean values where True means exceedance.
                 Second element contains the percentage of exceedance.
         """
-        arr_deltaT = np_round_half_up(self.arr_deltaT)
-        return criterion_time_of_exceedance(arr_deltaT, arr_occupancy, self.factor)
+        return criterion_time_of_exceedance(
+            self._criteria_deltaT(), arr_occupancy, self.calendar_index, self.pass_fail_only
+        )
 
     def run_criterion_two(self, arr_occupancy):
         """Runs criterion two.
 
         Args:
-            arr_occupancy (numpy.ndarray): The number of people for each room per reporting interval
+            arr_occupancy (Union[numpy.ndarray, OccupiedIndex]): The number of people for each room per reporting
+                interval, or the occupied time-steps, see occupancy.occupied_index.
 
         Returns:
             tuple: First element contains boolean values where True means exceedance.
                 Second element contains the percentage of exceedance.
         """
-        return criterion_daily_weighted_exceedance(self.arr_deltaT, arr_occupancy)
+        return criterion_daily_weighted_exceedance(
+            self._criteria_deltaT(), arr_occupancy, self.calendar_index, self.pass_fail_only
+        )
 
     def run_criterion_three(self):
         """Runs criterion three.
@@ -205,31 +312,41 @@ class Tm52CalcWizard:
             tuple: First element contains boolean values where True means exceedance.
                 Second element contains the percentage of exceedance.
         """
-        return criterion_upper_limit_temperature(self.arr_deltaT)
+        return criterion_upper_limit_temperature(
+            self._criteria_deltaT(), self.calendar_index, self.pass_fail_only
+        )
+
+    def _criteria_deltaT(self):
+        """Delta T passed to the criteria, rounded unless only the readings scanned are rounded (pass_fail_only)."""
+        return self.arr_deltaT if self.arr_deltaT_round is None else self.arr_deltaT_round
 
     def run_criteria(self, inputs):
-        """Runs all the criteria and collates them into a dictionary of data frames.
+        """Runs all the criteria and collates them into a dictionary of criteria arrays.
 
         Args:
             inputs (Tm52InputData): Class instance containing the required inputs.
         """
+        self.arr_deltaT_round = (
+            None if self.pass_fail_only else round_half_up_int(self.arr_deltaT)
+        )  # Delta T rounded once as specified by CIBSE TM52 guide, as small integers shared by all criteria
+        self.occupied = occupied_index(
+            inputs.arr_occupancy
+        )  # Occupied time-steps compiled once for criterion one, two and summarise
         (
             self.arr_criterion_one_bool,
             self.arr_criterion_one_percent,
-        ) = self.run_criterion_one(inputs.arr_occupancy)
+        ) = self.run_criterion_one(self.occupied)
         (
             self.arr_criterion_two_bool,
             self.arr_criterion_two_max,
-        ) = self.run_criterion_two(inputs.arr_occupancy)
+        ) = self.run_criterion_two(self.occupied)
         (
             self.arr_criterion_three_bool,
             self.arr_criterion_three_max,
         ) = self.run_criterion_three()
 
         self.li_air_speeds_str = [str(float(i[0][0])) for i in arr_air_speed]
-        self.arr_sorted_room_names = np.vectorize(inputs.di_room_id_name_map.get)(
-            inputs.arr_room_ids_sorted
-        )
+        self.arr_sorted_room_names = sorted_room_names(inputs)
 
         self.di_criteria = {
             "Criterion 1": {
@@ -247,18 +364,101 @@ class Tm52CalcWizard:
                 "Criterion 3 (Max Delta T)": self.arr_criterion_three_max,
             },
         }
+        # If a room fails any 2 of the 3 criteria then it is classed as a fail overall
+        self.arr_tm52_bool = (
+            self.arr_criterion_one_bool.astype(int)
+            + self.arr_criterion_two_bool
+            + self.arr_criterion_three_bool
+        ) >= 2
 
-        # Constructing dictionary of data frames for each air speed.
-        self.di_data_frame_criteria = {}
-        for criterion, di_criterion in self.di_criteria.items():
-            arr_rooms_sorted = self.arr_sorted_room_names
-            arr_room_ids_sorted = inputs.arr_room_ids_sorted
-            self.di_data_frame_criteria[criterion] = create_df_from_criterion(
-                arr_rooms_sorted,
-                arr_room_ids_sorted,
-                self.li_air_speeds_str,
-                di_criterion,
-            )
+    def summarise(self, inputs):
+        """Counts the rounded delta T and daily weights of each room for re-evaluating the criteria with other
+        thresholds, see histograms.ExceedanceSummary.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+        """
+        self.exceedance_summary = summarise_exceedance(
+            self._criteria_deltaT(), self.occupied, self.calendar_index
+        )
+
+    def category_sweep(self, inputs, li_categories=("I", "II", "III")):
+        """Re-runs the criteria with every room assigned each category in turn, reusing the operative temperature
+        and running mean temperature already calculated. Only the max acceptable temperature, delta T and
+        criteria are recalculated for each category.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+            li_categories (tuple, optional): Categories to sweep. Defaults to ("I", "II", "III").
+
+        Returns:
+            OrderedDict: Category: copy of the wizard with the results for the category, e.g. use room_records
+                or di_criteria to report them. The copies share the operative temperature array.
+        """
+        di_sweep = OrderedDict()
+        for category in li_categories:
+            calc = copy.copy(self)
+            calc.DEFAULT_CATEGORY = category
+            calc.di_group_categories = {}
+            calc.di_room_categories = {}
+            calc.max_acceptable_temp(inputs)
+            calc.deltaT()
+            calc.run_criteria(inputs)
+            if calc.exceedance_summary is not None:
+                calc.summarise(inputs)
+            di_sweep[category] = calc
+        return di_sweep
+
+    def room_records(self, inputs):
+        """Results for each room which can be serialised to JSON, see utils.iter_room_records.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+
+        Returns:
+            generator: Yields a dictionary of results for each room.
+        """
+        di_criteria = dict(self.di_criteria)
+        di_criteria["TM52"] = {"TM52 (Pass/Fail)": self.arr_tm52_bool}
+        return iter_room_records(
+            inputs.arr_room_ids_sorted,
+            self.arr_sorted_room_names,
+            self.li_air_speeds_str,
+            di_criteria,
+        )
+
+    def worst_days(self, inputs, k=5):
+        """The k days with the greatest daily weight for each air speed and room, see criterion two.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+            k (int, optional): Number of days. Defaults to 5.
+
+        Raises:
+            ValueError: If delta T wasn't kept, e.g. when assessed in blocks of rooms.
+
+        Returns:
+            tuple: Day of the year (0 is the 1st of January) of each of the worst days, worst first, with the
+                shape (air speeds, rooms, k). The daily weight of each day with the same shape.
+        """
+        if getattr(self, "arr_deltaT", None) is None:
+            raise ValueError("Delta T isn't kept when assessed in blocks of rooms, see blocks.py.")
+        arr_daily_weights = daily_weighted_exceedance_occupied(
+            self.occupied.gather(self._criteria_deltaT()), self.occupied, self.calendar_index
+        )
+        return top_k(arr_daily_weights, k)
+
+    def worst_rooms(self, inputs, k=10):
+        """The k worst rooms for each criterion metric and air speed, see ranking.worst_rooms.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+            k (int, optional): Number of rooms. Defaults to 10.
+
+        Returns:
+            OrderedDict: Name of each criterion metric: ranking.RoomRanking.
+        """
+        return worst_rooms(inputs.arr_room_ids_sorted, self.di_criteria, k)
 
     def create_df_project_info(self, inputs):
         """Creates a data frame displaying the project information.
@@ -269,6 +469,8 @@ class Tm52CalcWizard:
         Returns:
             pandas.DataFrame: Data frame of the project information from the IES API.
         """
+        import pandas as pd
+
         if (
             inputs.di_project_info["project_folder"].find("J:") != -1
         ):  # Get job number if J drive is a parent directory
@@ -283,7 +485,10 @@ class Tm52CalcWizard:
                 ("Type of Analysis", "CIBSE TM52 Assessment of overheating risk"),
                 ("Weather File", inputs.di_aps_info["weather_file_path"]),
                 ("Job Number", job_no),
-                ("Reporting Interval", "{0} minutes".format(60 / self.factor)),
+                (
+                    "Reporting Interval",
+                    "{0} minutes".format(float(self.calendar_index.timestep_minutes)),
+                ),
                 ("Analysed Spaces", str(len(inputs.arr_room_ids_sorted))),
                 ("Analysed Air Speeds", self.li_air_speeds_str),
                 ("Weather File Year", str(inputs.di_weather_file_info["year"])),
@@ -298,6 +503,7 @@ class Tm52CalcWizard:
                 ("Latitude", "{:.2f}".format(inputs.di_weather_file_info["latitude"])),
                 ("Date of Analysis", str(datetime.datetime.now())),
                 ("IES_version", inputs.di_project_info["IES_version"]),
+                ("Input Digest", self.digest(inputs)),
             ]
         )
 
@@ -311,6 +517,8 @@ class Tm52CalcWizard:
         Returns:
             pandas.DataFrame: Data frame of the criterion percentage definitions.
         """
+        import pandas as pd
+
         di_criterion_defs = {
             "Criterion 1 (% Hours Delta T >= 1K)": "The percentage of occupied hours where delta T equals or exceeds the threshold (1 kelvin) over the total occupied hours.",
             "Criterion 2 (Max Daily Weight)": "The maximum daily weight taken from the year.",
@@ -339,15 +547,8 @@ class Tm52CalcWizard:
             "df": self.create_df_criterion_definitions(),
         }
 
-        li_columns_to_map = [
-            "Criterion 1 (Pass/Fail)",
-            "Criterion 2 (Pass/Fail)",
-            "Criterion 3 (Pass/Fail)",
-            "TM52 (Pass/Fail)",
-        ]
-        di_bool_map = {True: "Fail", False: "Pass"}
-        li_columns_sorted = [
-            "Room Name",
+        di_room_columns = scenario_room_columns(inputs)
+        li_columns_sorted = ["Room Name"] + list(di_room_columns) + [
             "Criterion 1 (Pass/Fail)",
             "Criterion 1 (% Hours Delta T >= 1K)",
             "Criterion 2 (Pass/Fail)",
@@ -356,33 +557,23 @@ class Tm52CalcWizard:
             "Criterion 3 (Max Delta T)",
             "TM52 (Pass/Fail)",
         ]
+        # If a room fails any 2 of the 3 criteria then it is classed as a fail overall, see run_criteria
+        di_criteria = dict(self.di_criteria)
+        di_criteria["TM52"] = {"TM52 (Pass/Fail)": self.arr_tm52_bool}
+        self.df_results = create_df_results(
+            inputs.arr_room_ids_sorted,
+            self.arr_sorted_room_names,
+            self.li_air_speeds_str,
+            di_criteria,
+            di_room_columns=di_room_columns,
+            li_columns=li_columns_sorted,
+        )  # Row for each air speed and room
+
         self.li_all_criteria_data_frames = [di_project_info, di_criterion_defs]
-        for speed in self.li_air_speeds_str:  # Loop through number of air speeds
-            df_criteria_one_and_two = pd.merge(
-                self.di_data_frame_criteria["Criterion 1"][speed],
-                self.di_data_frame_criteria["Criterion 2"][speed],
-                on=["Room ID", "Room Name"],
-            )
-            df_all_criteria = pd.merge(
-                df_criteria_one_and_two,
-                self.di_data_frame_criteria["Criterion 3"][speed],
-                on=["Room ID", "Room Name"],
-            )
-            # If a room fails any 2 of the 3 criteria then it is classed as a fail overall
-            df_all_criteria["TM52 (Pass/Fail)"] = (
-                df_all_criteria.select_dtypes(include=["bool"]).sum(axis=1) >= 2
-            )  # Sum only boolean columns (pass/fail columns)
-
-            # Map true and false to fail and pass respectively
-            for column in li_columns_to_map:
-                df_all_criteria[column] = df_all_criteria[column].map(di_bool_map)
-
-            df_all_criteria = df_all_criteria.set_index(
-                "Room ID"
-            )  # Set index to room name
+        for i, speed in enumerate(self.li_air_speeds_str):  # Loop through number of air speeds
             di_all_criteria_data_frame = {
                 "sheet_name": "Results, Air Speed {0}".format(speed),
-                "df": df_all_criteria[li_columns_sorted],
+                "df": speed_block(self.df_results, i, len(inputs.arr_room_ids_sorted)),
             }
             self.li_all_criteria_data_frames.append(di_all_criteria_data_frame)
 
@@ -394,25 +585,19 @@ class Tm52CalcWizard:
             fdir_results (Union[pathlib.Path, str]): Override project path.
             on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
         """
-        if fdir_results is None:
-            fdir_tm52 = (
-                pathlib.PureWindowsPath(inputs.di_project_info["project_path"])
-                / "mf_results"
-                / "tm52"
-            )
-        else:
-            fdir_tm52 = fdir_results
-        file_name = "TM52__{0}.xlsx".format(inputs.di_project_info["project_name"])
-        fpth_results = fdir_tm52 / file_name
-        if on_linux:
-            self.output_path = fpth_results.as_posix().replace("C:/", "/mnt/c/")
-        else:
-            self.output_path = str(fpth_results)
+        self.output_path = self.results_fpth(
+            inputs.di_project_info, fdir_results, on_linux
+        )
+        from adaptive_comfort.xlsx_templater import to_excel  # Loads pandas and xlsxwriter
+
         to_excel(
             data_object=self.li_all_criteria_data_frames,
             fpth=self.output_path,
             open=False,
         )
+        write_stored_results(
+            self.output_path, self.digest(inputs), list(self.room_records(inputs))
+        )
         print("TM52 Calculation Complete.")
         print("Results File Path: {0}".format(self.output_path))
 
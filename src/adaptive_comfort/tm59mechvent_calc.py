@@ -40,21 +40,54 @@ Process
 """
 
 
+import functools
 import pathlib
-import numpy as np
-import pandas as pd
 import datetime
 from collections import OrderedDict
 
-from adaptive_comfort.xlsx_templater import to_excel
 from adaptive_comfort.equations import np_calc_op_temp
-from adaptive_comfort.utils import create_paths, fromfile, create_df_from_criterion
+from adaptive_comfort.utils import (
+    create_df_results,
+    speed_block,
+    sorted_room_names,
+    scenario_room_columns,
+    iter_room_records,
+    run_stages,
+    write_stored_results,
+)
+from adaptive_comfort.wizard import CalcWizardBase
 from adaptive_comfort.constants import arr_air_speed
+from adaptive_comfort.memory import MemoryTracker
+from adaptive_comfort.progress import ProgressReporter
+from adaptive_comfort.calendar_index import calendar_index_from_inputs
 from adaptive_comfort.criteria_testing import criterion_tm59_mechvent
-
-
-class Tm59MechVentCalcWizard:
-    def __init__(self, inputs, fdir_results=None, on_linux=True):
+from adaptive_comfort.ranking import worst_rooms
+
+
+class Tm59MechVentCalcWizard(CalcWizardBase):
+    ASSESSMENT = "TM59MechVent"  # Name of the assessment within the calculation settings
+    RESULTS_SUBDIR = "tm59mechvent"  # Subdirectory of the project's mf_results folder, see results_fpth
+    LI_ROOM_RESULTS = [
+        "arr_criterion_one_bool",
+        "arr_criterion_one_percent",
+        "arr_sorted_room_names",
+    ]  # Results with the room axis last, concatenated when calculated in blocks of rooms, see blocks.py
+    LI_ROOM_INDEX_RESULTS = []  # Room axis indices, offset to the block's first room when concatenated
+
+    def __init__(
+        self,
+        inputs,
+        fdir_results=None,
+        on_linux=True,
+        track_memory=False,
+        write_results=True,
+        input_digest=None,
+        on_stage=None,
+        progress=None,
+        cancel_token=None,
+        pass_fail_only=False,
+        results_db=None,
+    ):
         """Calculates the operative temperature, maximum adaptive temperature, and delta T for each air speed
         and produces the results in an excel spreadsheet. 
 
@@ -62,31 +95,62 @@ class Tm59MechVentCalcWizard:
             inputs (Tm52InputData): Class instance containing the required inputs.
             fdir_results (Union[pathlib.Path, str]): Used to override project path to save elsewhere.
             on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
+            track_memory (bool, optional): Record the peak traced allocation of each stage and the size of each
+                array in self.memory. Defaults to False.
+            write_results (bool, optional): Merge the results into data frames and output them to excel. If False
+                only the criteria arrays are calculated. Defaults to True.
+            input_digest (str, optional): Digest of the input data and calculation settings, see
+                utils.input_digest. If None, it is calculated from the input data when first needed, i.e. when
+                the results are stored, see digest. Defaults to None.
+            on_stage (callable, optional): Called with the name of each stage before it is run, e.g. to report
+                progress. An exception raised by it stops the calculation, see utils.run_stages. Defaults to None.
+            progress (callable, optional): Called with a progress.ProgressUpdate (stage, rooms done, estimated time
+                remaining) as each stage starts and once complete. Defaults to None.
+            cancel_token (progress.CancellationToken, optional): Checked before each stage, raising
+                utils.AssessmentCancelled once cancelled. Defaults to None.
+            pass_fail_only (bool, optional): Only determine whether each room passes, stopping for each room once
+                it has failed a criterion, see criteria_testing. The percentages and maxima are NaN. Defaults to
+                False.
+            results_db (Union[pathlib.Path, str], optional): Also upsert the results for each room and air speed
+                into this SQLite database once complete, see results_db.py. Defaults to None.
         """
+        self.memory = MemoryTracker() if track_memory else None
+        self.skipped = False
+        self.pass_fail_only = pass_fail_only
+        self.input_digest = input_digest  # Calculated when first needed, see digest
+        self.di_settings = {"pass_fail_only": pass_fail_only}  # Settings included in the input digest
         self._check_occupancy_data(inputs)
-        self.factor = int(
-            inputs.arr_air_temp.shape[1] / 8760
+        self.calendar_index = calendar_index_from_inputs(inputs)
+        self.factor = (
+            self.calendar_index.steps_per_hour
         )  # Find factor to hourly time-step array
-        self.op_temp(inputs)
-        self.run_criteria(inputs)
-        self.merge_dfs(inputs)
-        self.to_excel(inputs, fdir_results, on_linux)
-
-    @classmethod
-    def from_files(cls, fdir, fdir_results=None, on_linux=True):
-        """Pass file directory containing numpy data.
-
-        Args:
-            fdir (Union[pathlib.Path, str]): file directory containing numpy data.
-            fdir_results (Union[pathlib.Path, str], optional): Used to override project path to save elsewhere.
-            on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.. Defaults to True.
+        progress_reporter = ProgressReporter(
+            len(inputs.arr_room_ids_sorted), progress, cancel_token, on_stage
+        )
+        run_stages(
+            [
+                ("op_temp", functools.partial(self.op_temp, inputs)),
+                ("run_criteria", functools.partial(self.run_criteria, inputs)),
+            ]
+            + (
+                [
+                    ("merge_dfs", functools.partial(self.merge_dfs, inputs)),
+                    ("to_excel", functools.partial(self.to_excel, inputs, fdir_results, on_linux)),
+                ]
+                if write_results
+                else []
+            ),
+            memory_tracker=self.memory,
+            obj=self,
+            on_stage=progress_reporter,
+        )
+        progress_reporter.complete()
+        self.di_stage_time = progress_reporter.di_stage_time  # Seconds taken by each stage
+        self.elapsed = progress_reporter.elapsed
+        if results_db is not None:
+            from adaptive_comfort.results_db import write_results as write_results_db
 
-        Returns:
-            _type_: _description_
-        """
-        paths = create_paths(fdir)
-        input_data = fromfile(paths, allow_pickle=True)
-        return cls(inputs=input_data, fdir_results=fdir_results, on_linux=on_linux)
+            write_results_db(results_db, self, inputs)
 
     @staticmethod
     def _check_occupancy_data(inputs):
@@ -124,10 +188,12 @@ class Tm59MechVentCalcWizard:
             tuple: First element contains boolean values where True means exceedance.
                 Second element contains the percentage of exceedance.
         """
-        return criterion_tm59_mechvent(self.arr_op_temp_v, arr_occupancy)
+        return criterion_tm59_mechvent(
+            self.arr_op_temp_v, arr_occupancy, self.calendar_index, self.pass_fail_only
+        )
 
     def run_criteria(self, inputs):
-        """Runs all the criteria and collates them into a dictionary of data frames.
+        """Runs all the criteria and collates them into a dictionary of criteria arrays.
 
         Args:
             inputs (Tm52InputData): Class instance containing the required inputs.
@@ -146,22 +212,36 @@ class Tm59MechVentCalcWizard:
             },
         }
 
-        self.arr_sorted_room_names = np.vectorize(inputs.di_room_id_name_map.get)(
-            inputs.arr_room_ids_sorted
-        )
+        self.arr_sorted_room_names = sorted_room_names(inputs)
         self.li_air_speeds_str = [str(float(i[0][0])) for i in arr_air_speed]
 
-        # Constructing dictionary of data frames for each air speed.
-        self.di_data_frame_criteria = {}
-        for criterion, di_criterion in self.di_criteria.items():
-            arr_rooms_sorted = self.arr_sorted_room_names
-            arr_room_ids_sorted = inputs.arr_room_ids_sorted
-            self.di_data_frame_criteria[criterion] = create_df_from_criterion(
-                arr_rooms_sorted,
-                arr_room_ids_sorted,
-                self.li_air_speeds_str,
-                di_criterion,
-            )
+    def room_records(self, inputs):
+        """Results for each room which can be serialised to JSON, see utils.iter_room_records.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+
+        Returns:
+            generator: Yields a dictionary of results for each room.
+        """
+        return iter_room_records(
+            inputs.arr_room_ids_sorted,
+            self.arr_sorted_room_names,
+            self.li_air_speeds_str,
+            self.di_criteria,
+        )
+
+    def worst_rooms(self, inputs, k=10):
+        """The k worst rooms for each criterion metric and air speed, see ranking.worst_rooms.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+            k (int, optional): Number of rooms. Defaults to 10.
+
+        Returns:
+            OrderedDict: Name of each criterion metric: ranking.RoomRanking.
+        """
+        return worst_rooms(inputs.arr_room_ids_sorted, self.di_criteria, k)
 
     def create_df_project_info(self, inputs):
         """Creates a data frame displaying the project information.
@@ -172,6 +252,8 @@ class Tm59MechVentCalcWizard:
         Returns:
             pandas.DataFrame: Data frame of the project information from the IES API.
         """
+        import pandas as pd
+
         if (
             inputs.di_project_info["project_folder"].find("J:") != -1
         ):  # Get job number if J drive is a parent directory
@@ -189,7 +271,10 @@ class Tm59MechVentCalcWizard:
                 ),
                 ("Weather File", inputs.di_aps_info["weather_file_path"]),
                 ("Job Number", job_no),
-                ("Reporting Interval", "{0} minutes".format(60 / self.factor)),
+                (
+                    "Reporting Interval",
+                    "{0} minutes".format(float(self.calendar_index.timestep_minutes)),
+                ),
                 ("Analysed Spaces", str(len(inputs.arr_room_ids_sorted))),
                 ("Analysed Air Speeds", self.li_air_speeds_str),
                 ("Weather File Year", str(inputs.di_weather_file_info["year"])),
@@ -204,6 +289,7 @@ class Tm59MechVentCalcWizard:
                 ("Latitude", "{:.2f}".format(inputs.di_weather_file_info["latitude"])),
                 ("Date of Analysis", str(datetime.datetime.now())),
                 ("IES_version", inputs.di_project_info["IES_version"]),
+                ("Input Digest", self.digest(inputs)),
             ]
         )
 
@@ -217,6 +303,8 @@ class Tm59MechVentCalcWizard:
         Returns:
             pandas.DataFrame: Data frame of the criterion percentage definitions.
         """
+        import pandas as pd
+
         di_criterion_defs = {
             "Fixed Temp Criterion (% Hours Operative Temp > 26 Deg. Celsius)": "The percentage of hours where the operative temperature exceeds the threshold (26 degrees celsius) over the total annual hours.",
         }
@@ -243,28 +331,25 @@ class Tm59MechVentCalcWizard:
             "df": self.create_df_criterion_definitions(),
         }
 
-        self.li_all_criteria_data_frames = [di_project_info, di_criterion_defs]
-        li_columns_to_map = [
-            "Fixed Temp Criterion (Pass/Fail)",
-        ]
-        li_columns_sorted = [
-            "Room Name",
+        di_room_columns = scenario_room_columns(inputs)
+        li_columns_sorted = ["Room Name"] + list(di_room_columns) + [
             "Fixed Temp Criterion (Pass/Fail)",
             "Fixed Temp Criterion (% Hours Operative Temp > 26 Deg. Celsius)",
         ]
-        di_bool_map = {True: "Fail", False: "Pass"}
-        for speed in self.li_air_speeds_str:  # Loop through number of air speeds
-            df_all_criteria = self.di_data_frame_criteria["Fixed Temp Criterion"][speed]
-            # Map true and false to fail and pass respectively
-            for column in li_columns_to_map:
-                df_all_criteria[column] = df_all_criteria[column].map(di_bool_map)
-
-            df_all_criteria = df_all_criteria.set_index(
-                "Room ID"
-            )  # Set index to room name
+        self.df_results = create_df_results(
+            inputs.arr_room_ids_sorted,
+            self.arr_sorted_room_names,
+            self.li_air_speeds_str,
+            self.di_criteria,
+            di_room_columns=di_room_columns,
+            li_columns=li_columns_sorted,
+        )  # Row for each air speed and room
+
+        self.li_all_criteria_data_frames = [di_project_info, di_criterion_defs]
+        for i, speed in enumerate(self.li_air_speeds_str):  # Loop through number of air speeds
             di_all_criteria_data_frame = {
                 "sheet_name": "Results, Air Speed {0}".format(speed),
-                "df": df_all_criteria[li_columns_sorted],
+                "df": speed_block(self.df_results, i, len(inputs.arr_room_ids_sorted)),
             }
             self.li_all_criteria_data_frames.append(di_all_criteria_data_frame)
 
@@ -276,36 +361,24 @@ class Tm59MechVentCalcWizard:
             fdir_results (Union[pathlib.Path, str]): Override project path.
             on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
         """
-        if fdir_results is None:
-            fdir_tm59 = (
-                pathlib.PureWindowsPath(inputs.di_project_info["project_path"])
-                / "mf_results"
-                / "tm59mechvent"
-            )
-        else:
-            fdir_tm59 = fdir_results
-
-        file_name = "TM59MechVent__{0}.xlsx".format(
-            inputs.di_project_info["project_name"]
+        self.output_path = self.results_fpth(
+            inputs.di_project_info, fdir_results, on_linux
         )
-        fpth_results = fdir_tm59 / file_name
-        if on_linux:
-            output_dir = pathlib.Path(fdir_tm59.as_posix().replace("C:/", "/mnt/c/"))
-            if not output_dir.exists():
-                output_dir.mkdir(parents=True)
-            self.output_path = fpth_results.as_posix().replace("C:/", "/mnt/c/")
-        else:
-            output_dir = pathlib.Path(str(fdir_tm59))
-            if not output_dir.exists():
-                output_dir.mkdir(parents=True)
-            self.output_path = str(fpth_results)
+        output_dir = pathlib.Path(self.output_path).parent
+        if not output_dir.exists():
+            output_dir.mkdir(parents=True)
+        from adaptive_comfort.xlsx_templater import to_excel  # Loads pandas and xlsxwriter
+
         to_excel(
             data_object=self.li_all_criteria_data_frames,
             fpth=self.output_path,
             open=False,
         )
+        write_stored_results(
+            self.output_path, self.digest(inputs), list(self.room_records(inputs))
+        )
         print("TM59 Mechanically Ventilated Calculation Complete.")
-        print("Results File Path: {0}".format(str(fpth_results)))
+        print("Results File Path: {0}".format(self.output_path))
 
 
 if __name__ == "__main__":
@@ -1,10 +1,12 @@
 """Miscellaneous functions used to support the calculation of TM52 and TM59 scripts.
 """
 
+import json
+import pickle
+import hashlib
 import pathlib
 import functools
 import numpy as np
-import pandas as pd
 from collections import OrderedDict
 
 from adaptive_comfort.data_objs import Tm52InputPaths, Tm52InputData
@@ -53,6 +55,55 @@ np_round_for_daily_weighted_exceedance = np.vectorize(
 )
 
 
+LI_ROUNDED_DTYPES = [np.int8, np.int16, np.int32, np.int64]  # Smallest first
+
+
+def round_half_up_int(arr, chunk_size=2 ** 16):
+    """Rounds every value as round_half_up and stores the result in the smallest integer type which can hold the
+    rounded values (int8 for the delta T of any realistic model). The array is rounded in one pass, a chunk at a
+    time, so only the integer result is full size.
+
+    Args:
+        arr (numpy.ndarray): Values we would like to round, e.g. delta T. Already integer arrays are returned as is.
+        chunk_size (int, optional): Number of values rounded at a time. Defaults to 2 ** 16.
+
+    Returns:
+        numpy.ndarray: Rounded values with the same shape.
+    """
+    if np.issubdtype(arr.dtype, np.integer):
+        return arr
+    arr = np.ascontiguousarray(arr)
+    if arr.size:
+        low, high = np.floor(arr.min()), np.ceil(arr.max())
+        dtype = next(
+            (t for t in LI_ROUNDED_DTYPES if np.iinfo(t).min <= low and high <= np.iinfo(t).max),
+            LI_ROUNDED_DTYPES[-1],
+        )
+    else:
+        dtype = LI_ROUNDED_DTYPES[0]
+    arr_round = np.empty(arr.shape, dtype=dtype)
+    arr_flat, arr_round_flat = arr.reshape(-1), arr_round.reshape(-1)
+    for start in range(0, arr_flat.size, chunk_size):
+        arr_chunk = arr_flat[start : start + chunk_size]
+        arr_up = np.mod(arr_chunk, 1) >= 0.5  # Never true for whole numbers, so ceil is floor + 1
+        arr_floor = np.floor(arr_chunk)
+        arr_floor += arr_up
+        arr_round_flat[start : start + chunk_size] = arr_floor
+    return arr_round
+
+
+def weighting_factors(arr_deltaT):
+    """The weighting factors of the daily weighted exceedance, see round_for_daily_weighted_exceedance.
+
+    Args:
+        arr_deltaT (numpy.ndarray): Delta T, or delta T already rounded by round_half_up_int.
+
+    Returns:
+        numpy.ndarray: Rounded delta T, 0 where delta T is less than or equal to 0, as integers.
+    """
+    return np.maximum(round_half_up_int(arr_deltaT), 0)
+
+
 def mean_every_n_elements(arr, n=24, axis=1):
     """Take the mean every n elements within an array.
 
@@ -140,52 +191,6 @@ def repeat_every_element_n_times(arr, n=24, axis=0):
     return np.repeat(arr, n, axis)
 
 
-def filter_bedroom_comfort_one_day(arr, factor):
-    """Take any time-step array for a day and return the time between 10pm and 7am.
-
-    Args:
-        arr (numpy.ndarray): any time-step array for a day
-
-    Returns:
-        numpy.ndarray: time-step array between hours 10pm to 7am
-    """
-    return np.concatenate([arr[: 7 * factor], arr[-2 * factor :]])
-
-
-def filter_bedroom_comfort_many_days(arr, factor, axis=1):
-    """Takes a multiple time-step array for multiple days and returns the time between 10pm and 7am for each one of those days. 
-
-    Args:
-        arr (numpy.ndarray): time-step array for many days
-        axis (int, optional): Axis to apply function over. Defaults to 1.
-
-    Returns:
-        numpy.ndarray: time-step array of time between 10pm to 7am for multiple days
-    """
-    arr_daily_split = np.reshape(
-        arr, (-1, 24 * factor)
-    )  # Split yearly arrays into daily arrays
-    f = functools.partial(filter_bedroom_comfort_one_day, factor=factor)
-    arr_bedroom_comfort_split = np.apply_along_axis(f, axis, arr_daily_split)
-    arr_bedroom_comfort = np.concatenate(arr_bedroom_comfort_split).ravel()
-    return arr_bedroom_comfort
-
-
-def filter_bedroom_comfort_time(arr, factor, axis=2):
-    """Takes a multiple time-step array for multiple days for multiple rooms and returns the time between 10pm and 7am 
-    for each one of those days for each room. 
-
-    Args:
-        arr (numpy.ndarray): time-step array for many days for multiple rooms
-        axis (int, optional): Axis to apply function over. Defaults to 2.
-
-    Returns:
-        numpy.ndarray: time-step array of time 10pm to 7am for multiple days for each room
-    """
-    f = functools.partial(filter_bedroom_comfort_many_days, factor=factor)
-    return np.apply_along_axis(f, axis, arr)
-
-
 def create_paths(fdir):
     """Create file paths for the input data from a given file directory.
 
@@ -209,11 +214,74 @@ def create_paths(fdir):
     return paths
 
 
-def fromfile(paths, allow_pickle=False):
+LI_MMAP_INPUTS = [
+    "arr_air_temp",
+    "arr_mean_radiant_temp",
+    "arr_occupancy",
+]  # Time-series input arrays which can be memory-mapped rather than read into memory
+
+
+SET_SAFE_PICKLE_GLOBALS = {
+    ("numpy", "dtype"),
+    ("numpy", "ndarray"),
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy.core.multiarray", "scalar"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "scalar"),
+    ("_codecs", "encode"),
+}  # Needed to unpickle the dictionaries dumped by IES, which only contain numpy arrays and python types
+
+DI_READ_ARRAY_HEADER = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+class RestrictedUnpickler(pickle.Unpickler):
+    """Unpickler which can only create numpy arrays and python types, see SET_SAFE_PICKLE_GLOBALS."""
+
+    def find_class(self, module, name):
+        if (module, name) not in SET_SAFE_PICKLE_GLOBALS:
+            raise pickle.UnpicklingError(
+                "Input data contains an object which isn't allowed: {0}.{1}".format(module, name)
+            )
+        return pickle.Unpickler.find_class(self, module, name)
+
+
+def load_restricted(fpth, mmap_mode=None):
+    """Loads a numpy file without allowing arbitrary pickled objects. Object arrays (the dictionaries dumped
+    by IES) are read with RestrictedUnpickler, so only numpy arrays and python types can be created.
+
+    Args:
+        fpth (Union[pathlib.Path, str]): File path of the npy file.
+        mmap_mode (str, optional): Passed on to numpy.load for arrays which aren't object arrays.
+            Defaults to None.
+
+    Raises:
+        pickle.UnpicklingError: If the file contains any other pickled object.
+
+    Returns:
+        np.ndarray: The loaded array.
+    """
+    with open(str(fpth), "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version in DI_READ_ARRAY_HEADER:
+            _, _, dtype = DI_READ_ARRAY_HEADER[version](f)
+            if dtype.hasobject:
+                return RestrictedUnpickler(f, encoding="ASCII").load()
+    return np.load(str(fpth), allow_pickle=False, mmap_mode=mmap_mode)
+
+
+def fromfile(paths, allow_pickle=False, mmap_mode=None):
     """Obtain input data which is dumped by IES API.
 
     Args:
         paths (Tm52InputPaths): Created from create_paths function.
+        allow_pickle (bool, optional): Passed on to numpy.load. If False the dictionaries are read with
+            load_restricted instead, which only allows numpy arrays and python types. Defaults to False.
+        mmap_mode (str, optional): If given (e.g. "r"), the time-series arrays (see LI_MMAP_INPUTS) are
+            memory-mapped and only read from disk when indexed, so models larger than memory can be assessed in
+            blocks of rooms, see blocks.assess_in_blocks. Defaults to None.
 
     Returns:
         dict: Contains key value pairs of the dumped data from IES.
@@ -223,7 +291,13 @@ def fromfile(paths, allow_pickle=False):
     """
     di_input_data = {}
     for k, fpth in paths.__dict__.items():
-        di_input_data[fpth.stem] = np.load(str(fpth), allow_pickle=allow_pickle)
+        fpth_mmap_mode = mmap_mode if fpth.stem in LI_MMAP_INPUTS else None
+        if allow_pickle:
+            di_input_data[fpth.stem] = np.load(
+                str(fpth), allow_pickle=True, mmap_mode=fpth_mmap_mode
+            )
+        else:
+            di_input_data[fpth.stem] = load_restricted(fpth, mmap_mode=fpth_mmap_mode)
 
     input_data = Tm52InputData()
     input_data.di_project_info = di_input_data["arr_project_info"].item()
@@ -236,50 +310,565 @@ def fromfile(paths, allow_pickle=False):
     input_data.arr_mean_radiant_temp = di_input_data["arr_mean_radiant_temp"]
     input_data.arr_occupancy = di_input_data["arr_occupancy"]
     input_data.arr_dry_bulb_temp = di_input_data["arr_dry_bulb_temp"]
+    (
+        input_data.arr_room_name_codes,
+        input_data.arr_room_name_labels,
+    ) = factorize_room_names(input_data.arr_room_ids_sorted, input_data.di_room_id_name_map)
 
     return input_data
 
 
-def create_df_from_criterion(
-    arr_sorted_room_names, arr_sorted_room_ids, li_air_speeds_str, di_criterion
+def factorize_room_names(arr_room_ids, di_room_id_name_map):
+    """Converts the room ID to name map into a code for each room and a table of the unique names, so room names
+    can be looked up by indexing rather than by calling the map for each room.
+
+    Args:
+        arr_room_ids (numpy.ndarray): Sorted room IDs
+        di_room_id_name_map (dict): Room ID: room name.
+
+    Returns:
+        tuple: First element is an integer array with the index of each room's name within the second element,
+            an object array of the unique room names in sorted order.
+    """
+    arr_room_ids = np.asarray(arr_room_ids)
+    # Rooms missing from the map are given the code -1, i.e. the None appended to the end of the labels
+    arr_codes = np.full(len(arr_room_ids), -1, dtype=np.intp)
+    if not di_room_id_name_map:
+        return arr_codes, np.array([None], dtype=object)
+    arr_map_ids = np.array(list(di_room_id_name_map.keys()))
+    arr_map_names = np.array(list(di_room_id_name_map.values()), dtype=object)
+    arr_sorter = np.argsort(arr_map_ids)
+    arr_pos = arr_sorter[
+        np.searchsorted(arr_map_ids, arr_room_ids, sorter=arr_sorter).clip(max=len(arr_map_ids) - 1)
+    ]  # Position of each room within the map, if it's in the map
+    arr_names = arr_map_names[arr_pos]
+    arr_named = (
+        (arr_map_ids[arr_pos] == arr_room_ids) & np.not_equal(arr_names, None) & (arr_names == arr_names)
+    )  # In the map and not NaN
+    arr_unique, arr_codes[arr_named] = np.unique(arr_names[arr_named], return_inverse=True)
+    arr_labels = np.empty(len(arr_unique) + 1, dtype=object)
+    arr_labels[:-1] = arr_unique
+    return arr_codes, arr_labels
+
+
+def sorted_room_names(inputs):
+    """Returns the name of each room in the same order as arr_room_ids_sorted.
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+
+    Returns:
+        numpy.ndarray: Sorted room names
+    """
+    if inputs.arr_room_name_codes is None or len(inputs.arr_room_name_codes) != len(
+        inputs.arr_room_ids_sorted
+    ):  # Input data not created by fromfile, or rooms selected without subset_inputs
+        (
+            inputs.arr_room_name_codes,
+            inputs.arr_room_name_labels,
+        ) = factorize_room_names(inputs.arr_room_ids_sorted, inputs.di_room_id_name_map)
+    return inputs.arr_room_name_labels[inputs.arr_room_name_codes]
+
+
+LI_SETTINGS_IGNORED = [
+    "track_memory",
+    "write_results",
+    "on_stage",
+    "progress",
+    "cancel_token",
+    "summarise",
+    "results_db",
+]  # Wizard keyword arguments which don't change the results
+LI_DERIVED_INPUTS = [
+    "arr_room_name_codes",
+    "arr_room_name_labels",
+]  # Input data derived from the other inputs when loaded, so not included in the input digest
+
+
+def calculation_settings(name, di_kwargs=None):
+    """The calculation settings which, along with the input data, determine the results of a wizard.
+
+    Args:
+        name (str): Name of the assessment, e.g. "TM52".
+        di_kwargs (dict, optional): Keyword arguments passed to the wizard. Defaults to None.
+
+    Returns:
+        dict: The calculation settings.
+    """
+    from adaptive_comfort import __version__
+    from adaptive_comfort.constants import arr_air_speed
+
+    di_settings = {
+        "assessment": name,
+        "version": __version__,
+        "air_speeds": arr_air_speed.ravel().tolist(),
+    }
+    for k, v in (di_kwargs or {}).items():
+        if k not in LI_SETTINGS_IGNORED and v is not None and v is not False:  # Options left off are omitted
+            di_settings[k] = v
+    return di_settings
+
+
+def input_digest(inputs, di_settings=None):
+    """A digest of the input data and calculation settings used to check whether an assessment needs re-running.
+
+    The arrays and dictionaries within the input data are hashed rather than the files they were loaded from, so
+    the digest is the same however the input data was loaded (in memory, memory-mapped or built directly).
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+        di_settings (dict, optional): Calculation settings, see calculation_settings. Defaults to None.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    h = hashlib.sha1()
+    for k, v in sorted(inputs.__dict__.items()):
+        if k in LI_DERIVED_INPUTS:
+            continue
+        h.update(k.encode("utf-8"))
+        if isinstance(v, np.ndarray):
+            h.update(str((v.dtype.str, v.shape)).encode("utf-8"))
+            h.update(np.ascontiguousarray(v).view(np.uint8))
+        else:
+            h.update(json.dumps(v, sort_keys=True, default=str).encode("utf-8"))
+    h.update(json.dumps(di_settings, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def fpth_stored_results(fpth_results):
+    """Path of the file storing the input digest and results alongside the excel spreadsheet.
+
+    Args:
+        fpth_results (Union[pathlib.Path, str]): Path of the excel spreadsheet.
+
+    Returns:
+        pathlib.Path: e.g. TM52__TestJob1.digest.json for TM52__TestJob1.xlsx
+    """
+    return pathlib.Path(str(fpth_results)).with_suffix(".digest.json")
+
+
+def write_stored_results(fpth_results, digest, li_room_records):
+    """Stores the input digest and the results for each room alongside the excel spreadsheet.
+
+    Args:
+        fpth_results (Union[pathlib.Path, str]): Path of the excel spreadsheet.
+        digest (str): Input digest, see input_digest.
+        li_room_records (list): Results for each room, see iter_room_records.
+    """
+    di = {
+        "input_digest": digest,
+        "output_path": str(fpth_results),
+        "results": li_room_records,
+    }
+    with open(str(fpth_stored_results(fpth_results)), "w") as f:
+        json.dump(di, f)
+
+
+def read_stored_results(fpth_results, digest):
+    """Reads the stored results for an excel spreadsheet if they were calculated from the same inputs.
+
+    Args:
+        fpth_results (Union[pathlib.Path, str]): Path of the excel spreadsheet.
+        digest (str): Input digest of the current inputs, see input_digest.
+
+    Returns:
+        dict: The stored digest, output path and results. None if the spreadsheet or stored results are
+            missing or the inputs have changed.
+    """
+    fpth_stored = fpth_stored_results(fpth_results)
+    if not (fpth_stored.exists() and pathlib.Path(str(fpth_results)).exists()):
+        return None
+    try:
+        with open(str(fpth_stored)) as f:
+            di = json.load(f)
+    except ValueError:  # Corrupt or partially written
+        return None
+    if di.get("input_digest") != digest:
+        return None
+    return di
+
+
+def create_df_results(
+    arr_room_ids,
+    arr_room_names,
+    li_air_speeds_str,
+    di_criteria,
+    di_criterion_room_index=None,
+    di_room_columns=None,
+    li_columns=None,
 ):
-    """Creates pandas data frame for a criterion.
+    """Creates a long-format data frame of the results with a row for each air speed and room, built directly from
+    the criteria arrays. Rows are ordered by air speed, then room, so the results for each air speed are a
+    contiguous block of rows, see speed_block.
 
     Args:
-        arr_sorted_room_names (numpy.ndarray): Sorted room names
-        arr_sorted_room_ids (numpy.ndarray): Sorted room IDs
-        li_air_speeds_str (list): list of air speeds       
-        di_criterion (dict): criterion data with column names
+        arr_room_ids (numpy.ndarray): Sorted room IDs
+        arr_room_names (numpy.ndarray): Sorted room names
+        li_air_speeds_str (list): list of air speeds
+        di_criteria (dict): criteria data with column names. Each array has the shape (air speeds, rooms).
+            Boolean arrays are pass/fail columns where True is mapped to "Fail" and False to "Pass".
             Example:
-                di_criterion = {
+                di_criteria = {
                     "Criterion A": {
                         "Criterion A (Pass/Fail)": arr_criterion_a_bool,
                         "Criterion A (% Hours Delta T >= 1K)": arr_criterion_a_percent.round(2),
                         }
+                    }
+        di_criterion_room_index (dict, optional): Room axis indices for criteria only run on a subset of the rooms
+            (e.g. bedrooms). The other rooms are left blank (NaN). Defaults to None.
+        di_room_columns (dict, optional): Column name: array of a value for each room, repeated for every air
+            speed (e.g. "Vulnerable Occupancy"). Defaults to None.
+        li_columns (list, optional): Columns to keep, in order. Defaults to None, keeping all of the columns.
 
     Returns:
-        dict: dict of data frames for each air speed.
+        pandas.DataFrame: Results indexed by room ID with an "Air Speed" column followed by li_columns.
     """
-    li_room_criterion = []
-    for i, speed in enumerate(
-        li_air_speeds_str
-    ):  # Loop through air speeds and add specified columns with data from di_criterion
-        di = OrderedDict(
-            [("Room Name", arr_sorted_room_names), ("Room ID", arr_sorted_room_ids),]
-        )
+    n_speeds, n_rooms = len(li_air_speeds_str), len(arr_room_ids)
+    di_criterion_room_index = di_criterion_room_index or {}
+    di_columns = OrderedDict(
+        [
+            ("Room ID", np.tile(arr_room_ids, n_speeds)),
+            ("Air Speed", np.repeat(np.array(li_air_speeds_str, dtype=object), n_rooms)),
+            ("Room Name", np.tile(arr_room_names, n_speeds)),
+        ]
+    )
+    for k, v in (di_room_columns or {}).items():
+        di_columns[k] = np.tile(v, n_speeds)
+    for criterion, di_criterion in di_criteria.items():
+        arr_room_index = di_criterion_room_index.get(criterion)
         for k, v in di_criterion.items():
-            di[k] = v[i]
-
-        li_room_criterion.append(di)
-
-    columns = [
-        name for name in li_room_criterion[0].keys()
-    ]  # Obtaining columns for data frame
-    di_data_frames_criterion = {
-        speed: pd.DataFrame(data, columns=columns)
-        for speed, data in zip(li_air_speeds_str, li_room_criterion)
-    }  # Creating dictionary of data frames for each air speed
-    return di_data_frames_criterion
+            arr = np.asarray(v)
+            if arr.dtype == bool:  # Map true and false to fail and pass respectively
+                arr = np.where(arr, "Fail", "Pass").astype(object)
+            if arr_room_index is not None and len(arr_room_index) != n_rooms:
+                arr_all_rooms = np.full(
+                    (n_speeds, n_rooms),
+                    np.nan,
+                    dtype=object if arr.dtype == object else np.float64,
+                )
+                arr_all_rooms[:, arr_room_index] = arr
+                arr = arr_all_rooms
+            di_columns[k] = arr.ravel()
+
+    import pandas as pd  # Deferred, so the numeric kernels can be imported without pandas
+
+    df = pd.DataFrame(di_columns).set_index("Room ID")
+    if li_columns is not None:
+        df = df[["Air Speed"] + list(li_columns)]
+    return df
+
+
+def scenario_room_columns(inputs):
+    """Column naming the weather scenario of each room for input data from several scenarios, see
+    scenarios.fold_scenarios.
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+
+    Returns:
+        OrderedDict: "Weather Scenario": scenario name for each room. Empty if the inputs are a single scenario.
+    """
+    if inputs.arr_scenario_codes is None:
+        return OrderedDict()
+    arr_scenario_names = np.array(inputs.li_scenario_names, dtype=object)
+    return OrderedDict([("Weather Scenario", arr_scenario_names[inputs.arr_scenario_codes])])
+
+
+def speed_block(df_results, i, n_rooms):
+    """Results for a single air speed from the long-format data frame, see create_df_results.
+
+    Args:
+        df_results (pandas.DataFrame): Long-format results.
+        i (int): Index of the air speed.
+        n_rooms (int): Number of rooms.
+
+    Returns:
+        pandas.DataFrame: The block of rows for the air speed, without the "Air Speed" column.
+    """
+    return df_results.iloc[i * n_rooms : (i + 1) * n_rooms, 1:]
+
+
+def room_category_codes(
+    arr_room_ids,
+    di_room_ids_groups,
+    default_category,
+    di_group_categories=None,
+    di_room_categories=None,
+):
+    """Resolves the category (I, II or III) of each room from the room groups and any room specific categories.
+    Room specific categories take precedence over group categories, which take precedence over the default.
+
+    Args:
+        arr_room_ids (numpy.ndarray): Sorted room IDs
+        di_room_ids_groups (dict): Room IDs within each room group.
+        default_category (str): Category of rooms not assigned one by group or room ID, e.g. "II".
+        di_group_categories (dict, optional): Room group name: category. Defaults to None.
+        di_room_categories (dict, optional): Room ID: category. Defaults to None.
+
+    Raises:
+        ValueError: If a category isn't one of the keys in constants.DI_CATEGORY_TEMP.
+
+    Returns:
+        tuple: First element is the list of categories used. Second element is an integer array with the index
+            of each room's category within the list.
+    """
+    from adaptive_comfort.constants import DI_CATEGORY_TEMP
+
+    li_all_categories = list(DI_CATEGORY_TEMP)
+    li_assignments = [(default_category, slice(None))]
+    for group, category in (di_group_categories or {}).items():
+        arr_in_group = np.isin(arr_room_ids, list((di_room_ids_groups or {}).get(group, [])))
+        li_assignments.append((category, arr_in_group))
+    if di_room_categories:
+        arr_in_rooms = np.isin(arr_room_ids, list(di_room_categories))
+        for idx in np.flatnonzero(arr_in_rooms):
+            li_assignments.append((di_room_categories[arr_room_ids[idx]], idx))
+
+    arr_codes = np.zeros(len(arr_room_ids), dtype=np.intp)
+    for category, idx in li_assignments:
+        if category not in DI_CATEGORY_TEMP:
+            raise ValueError(
+                "Unknown category '{0}'. Choose from: {1}".format(
+                    category, ", ".join(li_all_categories)
+                )
+            )
+        arr_codes[idx] = li_all_categories.index(category)
+
+    # Only keep the categories in use so the max acceptable temperature is calculated once for each
+    arr_used, arr_codes = np.unique(arr_codes, return_inverse=True)
+    return [li_all_categories[i] for i in arr_used], arr_codes
+
+
+def max_acceptable_temp_by_room(
+    arr_running_mean_temp, li_categories, arr_category_codes, arr_scenario_codes=None
+):
+    """Calculates the max acceptable temperature for each air speed, category and weather scenario in one pass,
+    and the index of the one each room is compared against.
+
+    Args:
+        arr_running_mean_temp (numpy.ndarray): Hourly running mean temperature. Either a single series or one
+            series per weather scenario stacked on a leading scenario axis.
+        li_categories (list): Categories in use, see room_category_codes.
+        arr_category_codes (numpy.ndarray): Index of each room's category within li_categories.
+        arr_scenario_codes (numpy.ndarray, optional): Index of each room's weather scenario along the leading axis
+            of arr_running_mean_temp, see scenarios.fold_scenarios. Defaults to None.
+
+    Returns:
+        tuple: First element is the max acceptable temperature with the shape
+            (air speeds, scenarios * categories, time-steps). Second element is the index of each room along
+            axis 1 of the first element, see deltaT_by_category.
+    """
+    from adaptive_comfort.constants import arr_air_speed, DI_CATEGORY_TEMP
+    from adaptive_comfort.equations import np_calculate_max_acceptable_temp
+
+    arr_running_mean_temp = np.atleast_2d(arr_running_mean_temp)
+    arr_cat_temp = np.array(
+        [DI_CATEGORY_TEMP[category] for category in li_categories]
+    ).reshape(1, 1, -1, 1)
+    arr_max_temp = np_calculate_max_acceptable_temp(
+        arr_running_mean_temp[np.newaxis, :, np.newaxis, :],
+        arr_cat_temp,
+        arr_air_speed.reshape(-1, 1, 1, 1),
+    )  # Shape (air speeds, scenarios, categories, time-steps)
+    arr_max_temp = arr_max_temp.reshape(
+        arr_max_temp.shape[0], -1, arr_max_temp.shape[-1]
+    )
+    if arr_scenario_codes is None:
+        return arr_max_temp, arr_category_codes
+    return arr_max_temp, arr_scenario_codes * len(li_categories) + arr_category_codes
+
+
+def deltaT_by_category(arr_op_temp_v, arr_max_temp_categories, arr_codes):
+    """Calculates delta T where each room is compared against the max acceptable temperature of its category.
+
+    Args:
+        arr_op_temp_v (numpy.ndarray): Operative temperature for each air speed, room and time-step.
+        arr_max_temp_categories (numpy.ndarray): Max acceptable temperature for each air speed, category and
+            time-step.
+        arr_codes (numpy.ndarray): Index of each room's category along axis 1 of arr_max_temp_categories.
+
+    Returns:
+        numpy.ndarray: Delta T for each air speed, room and time-step.
+    """
+    from adaptive_comfort.equations import deltaT
+
+    if arr_max_temp_categories.shape[1] == 1:  # All rooms the same category, broadcast along the room axis
+        return deltaT(arr_op_temp_v, arr_max_temp_categories)
+    dtype = np.result_type(arr_op_temp_v, arr_max_temp_categories)
+    arr_deltaT = np.take(
+        arr_max_temp_categories.astype(dtype, copy=False), arr_codes, axis=1
+    )  # Max acceptable temperature for each room, overwritten with delta T below
+    return np.subtract(arr_op_temp_v, arr_deltaT, out=arr_deltaT)
+
+
+LI_ROOM_INPUTS = [
+    "arr_room_ids_sorted",
+    "arr_air_temp",
+    "arr_mean_radiant_temp",
+    "arr_occupancy",
+    "arr_room_name_codes",
+    "arr_scenario_codes",
+]  # Input arrays where the first axis is the room axis
+
+
+def subset_inputs(inputs, idx):
+    """Creates a copy of the input data containing only a subset of the rooms.
+    The room independent data (project information, weather data, etc.) is shared with the original.
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+        idx (Union[slice, numpy.ndarray]): Rooms to keep, indexed along the room axis.
+
+    Returns:
+        Tm52InputData: Input data for the subset of rooms.
+    """
+    inputs_subset = Tm52InputData()
+    inputs_subset.__dict__.update(inputs.__dict__)
+    for name in LI_ROOM_INPUTS:
+        arr = getattr(inputs, name)
+        if arr is not None:
+            setattr(inputs_subset, name, arr[idx])
+    return inputs_subset
+
+
+def iter_input_blocks(inputs, block_size):
+    """Splits the input data into blocks of rooms.
+
+    Args:
+        inputs (Tm52InputData): Class instance containing the required inputs.
+        block_size (int): Maximum number of rooms within each block.
+
+    Yields:
+        Tm52InputData: Input data for each block of rooms.
+    """
+    n_rooms = len(inputs.arr_room_ids_sorted)
+    for start in range(0, n_rooms, block_size):
+        yield subset_inputs(inputs, slice(start, start + block_size))
+
+
+def _to_json_value(value, di_bool_map):
+    """Converts a numpy scalar into a value which can be serialised to JSON."""
+    if isinstance(value, (bool, np.bool_)):
+        return di_bool_map[bool(value)]
+    value = value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def _to_json_list(arr, di_bool_map):
+    """Converts an array into a list of values which can be serialised to JSON, see _to_json_value."""
+    arr = np.asarray(arr)
+    if arr.dtype == bool:
+        return np.where(arr, di_bool_map[True], di_bool_map[False]).tolist()
+    if arr.dtype.kind not in "iuf":
+        return [_to_json_value(value, di_bool_map) for value in arr]
+    li_values = arr.tolist()
+    if arr.dtype.kind == "f":
+        for i in np.flatnonzero(~np.isfinite(arr)):
+            li_values[i] = None
+    return li_values
+
+
+def iter_room_records(
+    arr_room_ids, arr_room_names, li_air_speeds_str, di_criteria, di_criterion_room_index=None
+):
+    """Yields the results for each room as a dictionary which can be serialised to JSON.
+
+    Args:
+        arr_room_ids (numpy.ndarray): Sorted room IDs
+        arr_room_names (numpy.ndarray): Sorted room names
+        li_air_speeds_str (list): list of air speeds
+        di_criteria (dict): criteria data with column names, see create_df_results.
+            Each array has the shape (air speeds, rooms).
+        di_criterion_room_index (dict, optional): Room axis indices for criteria only run on a subset of the rooms
+            (e.g. bedrooms). Criteria not included are assumed to cover all rooms. Defaults to None.
+
+    Yields:
+        dict: Room ID, Room Name and the criteria results for each air speed.
+            Example:
+                {
+                    "Room ID": "1S000001",
+                    "Room Name": "A_01_XX_XX_ApartmentSW",
+                    "Results": {
+                        "0.1": {"Criterion 1 (Pass/Fail)": "Fail", "Criterion 1 (% Hours Delta T >= 1K)": 3.2, ...},
+                        ...
+                    },
+                }
+    """
+    di_bool_map = {True: "Fail", False: "Pass"}
+    di_criterion_room_pos = {}  # Criterion: position of each room within the criterion arrays, -1 if not run
+    for criterion, arr_room_index in (di_criterion_room_index or {}).items():
+        arr_pos = np.full(len(arr_room_ids), -1, dtype=np.intp)
+        arr_pos[arr_room_index] = np.arange(len(arr_room_index))
+        di_criterion_room_pos[criterion] = arr_pos.tolist()
+    # Each column is converted for every room at once, so each room only looks up its values
+    li_criteria = [
+        (
+            di_criterion_room_pos.get(criterion),
+            [(k, [_to_json_list(arr, di_bool_map) for arr in v]) for k, v in di_criterion.items()],
+        )
+        for criterion, di_criterion in di_criteria.items()
+    ]
+    for i, (room_id, room_name) in enumerate(zip(arr_room_ids, arr_room_names)):
+        di_results = OrderedDict()
+        for j, speed in enumerate(li_air_speeds_str):
+            di_speed = OrderedDict()
+            for li_room_pos, li_columns in li_criteria:
+                idx = i if li_room_pos is None else li_room_pos[i]
+                if idx < 0:  # Criterion not run for this room
+                    continue
+                for k, li_speed_values in li_columns:
+                    di_speed[k] = li_speed_values[j][idx]
+            di_results[speed] = di_speed
+        yield OrderedDict(
+            [
+                ("Room ID", str(room_id)),
+                ("Room Name", str(room_name)),
+                ("Results", di_results),
+            ]
+        )
+
+
+class AssessmentCancelled(Exception):
+    """Raised between the stages of a wizard when the calculation has been cancelled."""
+
+
+def run_stages(li_stages, memory_tracker=None, obj=None, on_stage=None):
+    """Runs the calculation stages of a wizard in order.
+
+    Args:
+        li_stages (list): List of (stage name, callable) tuples.
+        memory_tracker (MemoryTracker, optional): If given, the peak allocation of each stage is recorded.
+            Defaults to None.
+        obj (object, optional): Object whose arrays are recorded by the memory tracker. Defaults to None.
+        on_stage (callable, optional): Called with the name of each stage before it is run. The calculation can
+            be stopped between stages by raising an exception from it, e.g. AssessmentCancelled.
+            Defaults to None.
+    """
+    if on_stage is not None:
+        li_stages = [
+            (name, functools.partial(_run_stage, on_stage, name, f)) for name, f in li_stages
+        ]
+    if memory_tracker is None:
+        for name, f in li_stages:
+            f()
+        return
+
+    memory_tracker.start()
+    try:
+        for name, f in li_stages:
+            with memory_tracker.stage(name, obj):
+                f()
+    finally:
+        memory_tracker.stop()
+
+
+def _run_stage(on_stage, name, f):
+    """Notifies on_stage and then runs the stage, see run_stages."""
+    on_stage(name)
+    f()
 
 
 def jobno_fromdir(dir):
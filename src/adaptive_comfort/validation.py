@@ -0,0 +1,239 @@
+"""Validation of the results against reference results exported from IES Vista.
+
+Whole result sets (every room, air speed and criterion) are compared in one pass. The long-format results of a
+wizard (see utils.create_df_results) are joined to the Vista exports on the air speed and room ID, and each
+metric is checked against a tolerance with vectorised operations. The rooms and metrics outside of the tolerance
+make up a compact discrepancy report.
+
+Example::
+
+    calc = Tm52CalcWizard.from_files(fdir_data)
+    df_discrepancies = validate_against_vista(calc.df_results, vista_exports(fdir_vista))
+    print(summarise_discrepancies(df_discrepancies))
+"""
+import pathlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from adaptive_comfort.vista import read_vista_results
+
+DI_VISTA_COLUMNS = {
+    "TM52": OrderedDict(
+        [
+            ("Criterion 1 (% Hours Delta T >= 1K)", "Criteria 1 (%Hrs Top-Tmax>=1K)"),
+            ("Criterion 2 (Max Daily Weight)", "Criteria 2 (Max. Daily Deg.Hrs)"),
+            ("Criterion 3 (Max Delta T)", "Criteria 3 (Max. DeltaT)"),
+        ]
+    ),
+}  # Assessment: result column: Vista column, only the TM52 reports exported from Vista are supported
+DI_VISTA_FAILING_LABELS = {
+    "TM52": OrderedDict(
+        [
+            ("Criterion 1 (Pass/Fail)", "1"),
+            ("Criterion 2 (Pass/Fail)", "2"),
+            ("Criterion 3 (Pass/Fail)", "3"),
+        ]
+    ),
+}  # Assessment: pass/fail column: label used in the Vista "Criteria failing" column
+VISTA_FAILING_COLUMN = "Criteria failing"
+LI_DISCREPANCY_COLUMNS = [
+    "Air Speed",
+    "Room ID",
+    "Room Name",
+    "Metric",
+    "Result",
+    "Reference",
+    "Abs Difference",
+]
+
+
+def vista_exports(fdir):
+    """Finds the Vista exports for each air speed within a directory, e.g. TestJob1_TM52_0.1.csv.
+
+    Args:
+        fdir (Union[pathlib.Path, str]): Directory containing the Vista csv exports.
+
+    Returns:
+        OrderedDict: Air speed (as formatted in the results, e.g. "0.1"): path of the export.
+    """
+    di_fpths = {}
+    for fpth in pathlib.Path(fdir).glob("*.csv"):
+        try:
+            speed = str(float(fpth.stem.rsplit("_", 1)[-1]))
+        except ValueError:  # Not named by air speed
+            continue
+        di_fpths[speed] = fpth
+    return OrderedDict(sorted(di_fpths.items(), key=lambda item: float(item[0])))
+
+
+def read_vista_reference(di_fpths):
+    """Reads the Vista exports for each air speed into a single long-format data frame of the occupied rooms.
+
+    Args:
+        di_fpths (dict): Air speed: path of the Vista export, see vista_exports.
+
+    Returns:
+        pandas.DataFrame: The Vista results with an "Air Speed" column.
+    """
+    li_dfs = []
+    for speed, fpth in di_fpths.items():
+        df = read_vista_results(fpth)
+        df.insert(0, "Air Speed", speed)
+        li_dfs.append(df[df["Status"] != "Unoccupied"])
+    return pd.concat(li_dfs, ignore_index=True)
+
+
+def criteria_failing(df_results, di_failing_labels):
+    """Labels the criteria each room fails in the same format as Vista, e.g. "1 & 2".
+
+    Args:
+        df_results (pandas.DataFrame): Long-format results, see utils.create_df_results.
+        di_failing_labels (dict): Pass/fail column: label, see DI_VISTA_FAILING_LABELS.
+
+    Returns:
+        numpy.ndarray: Criteria failing for each row, empty if no criteria are failed.
+    """
+    li_labels = list(di_failing_labels.values())
+    # Every combination of failed criteria is given a code so the labels are looked up rather than joined per row
+    arr_code = np.zeros(len(df_results), dtype=np.intp)
+    for i, column in enumerate(di_failing_labels):
+        arr_code |= (df_results[column].values == "Fail").astype(np.intp) << i
+    arr_combination_labels = np.array(
+        [
+            " & ".join(label for i, label in enumerate(li_labels) if code >> i & 1)
+            for code in range(2 ** len(li_labels))
+        ],
+        dtype=object,
+    )
+    return arr_combination_labels[arr_code]
+
+
+def validate_against_vista(
+    df_results, di_fpths, assessment="TM52", atol=0.1, rtol=0.0
+):
+    """Compares the results for every room, air speed and criterion against the Vista exports.
+
+    A metric is a discrepancy if ``abs(result - reference) > atol + rtol * abs(reference)``, or for the criteria
+    failing if the labels differ. Rooms only found in one of the result sets are also reported.
+
+    Args:
+        df_results (pandas.DataFrame): Long-format results, see utils.create_df_results.
+        di_fpths (dict): Air speed: path of the Vista export, see vista_exports.
+        assessment (str, optional): Assessment the results are for. Defaults to "TM52".
+        atol (float, optional): Absolute tolerance. Defaults to 0.1, Vista reports to 1 decimal place.
+        rtol (float, optional): Relative tolerance. Defaults to 0.0.
+
+    Raises:
+        ValueError: If the assessment isn't one of DI_VISTA_COLUMNS.
+
+    Returns:
+        pandas.DataFrame: A row for each discrepancy, see LI_DISCREPANCY_COLUMNS. Empty if the results match.
+    """
+    if assessment not in DI_VISTA_COLUMNS:
+        raise ValueError(
+            "Validating {0} results against Vista isn't supported. Choose from: {1}".format(
+                assessment, ", ".join(DI_VISTA_COLUMNS)
+            )
+        )
+    di_columns = DI_VISTA_COLUMNS[assessment]
+    di_failing_labels = DI_VISTA_FAILING_LABELS.get(assessment)
+    df_reference = read_vista_reference(di_fpths)
+    df_results = df_results[df_results["Air Speed"].isin(list(di_fpths))].reset_index()
+    if di_failing_labels:
+        df_results[VISTA_FAILING_COLUMN] = criteria_failing(df_results, di_failing_labels)
+        di_columns = OrderedDict(di_columns, **{VISTA_FAILING_COLUMN: VISTA_FAILING_COLUMN})
+
+    df_merged = pd.merge(
+        df_results[["Air Speed", "Room ID", "Room Name"] + list(di_columns)],
+        df_reference[["Air Speed", "Room ID", "Room Name"] + list(di_columns.values())],
+        on=["Air Speed", "Room ID"],
+        how="outer",
+        suffixes=("", " (Reference)"),
+        indicator=True,
+    )
+    df_merged["Room Name"] = df_merged["Room Name"].fillna(
+        df_merged["Room Name (Reference)"]
+    )
+    li_dfs = []
+    arr_missing = (df_merged["_merge"] != "both").values
+    if arr_missing.any():
+        df_missing = df_merged.loc[arr_missing, ["Air Speed", "Room ID", "Room Name"]].copy()
+        df_missing["Metric"] = "Room"
+        df_missing["Result"] = np.where(
+            df_merged.loc[arr_missing, "_merge"] == "left_only", "Found", "Missing"
+        )
+        df_missing["Reference"] = np.where(
+            df_merged.loc[arr_missing, "_merge"] == "right_only", "Found", "Missing"
+        )
+        li_dfs.append(df_missing)
+
+    df_both = df_merged[~arr_missing]
+    for column, column_reference in di_columns.items():
+        if column == column_reference:
+            column_reference = "{0} (Reference)".format(column)
+        arr_result = df_both[column].values
+        arr_reference = df_both[column_reference].values
+        if column == VISTA_FAILING_COLUMN:
+            arr_discrepancy = arr_result != arr_reference
+            arr_abs_difference = np.full(len(df_both), np.nan)
+        else:
+            arr_result = arr_result.astype(float)
+            arr_reference = arr_reference.astype(float)
+            arr_abs_difference = np.abs(arr_result - arr_reference)
+            arr_discrepancy = ~np.isclose(
+                arr_result, arr_reference, rtol=rtol, atol=atol, equal_nan=True
+            )
+        if arr_discrepancy.any():
+            df = df_both.loc[arr_discrepancy, ["Air Speed", "Room ID", "Room Name"]].copy()
+            df["Metric"] = column
+            df["Result"] = arr_result[arr_discrepancy]
+            df["Reference"] = arr_reference[arr_discrepancy]
+            df["Abs Difference"] = arr_abs_difference[arr_discrepancy]
+            li_dfs.append(df)
+
+    if not li_dfs:
+        return pd.DataFrame(columns=LI_DISCREPANCY_COLUMNS)
+    return pd.concat(li_dfs, ignore_index=True).reindex(columns=LI_DISCREPANCY_COLUMNS)
+
+
+def validate_projects(li_projects, assessment="TM52", atol=0.1, rtol=0.0):
+    """Validates the results of many reference models against their Vista exports.
+
+    Args:
+        li_projects (list): (project name, long-format results, directory of the Vista exports) for each model.
+        assessment (str, optional): Assessment the results are for. Defaults to "TM52".
+        atol (float, optional): Absolute tolerance. Defaults to 0.1.
+        rtol (float, optional): Relative tolerance. Defaults to 0.0.
+
+    Raises:
+        ValueError: If the assessment isn't one of DI_VISTA_COLUMNS.
+
+    Returns:
+        pandas.DataFrame: The discrepancies of every model with a "Project" column.
+    """
+    li_dfs = []
+    for project, df_results, fdir_vista in li_projects:
+        df = validate_against_vista(
+            df_results, vista_exports(fdir_vista), assessment, atol, rtol
+        )
+        df.insert(0, "Project", project)
+        li_dfs.append(df)
+    return pd.concat(li_dfs, ignore_index=True)
+
+
+def summarise_discrepancies(df_discrepancies):
+    """Counts the discrepancies for each metric and air speed.
+
+    Args:
+        df_discrepancies (pandas.DataFrame): See validate_against_vista.
+
+    Returns:
+        pandas.DataFrame: Number of discrepancies, indexed by metric with a column for each air speed.
+    """
+    return (
+        df_discrepancies.groupby(["Metric", "Air Speed"])
+        .size()
+        .unstack("Air Speed", fill_value=0)
+    )
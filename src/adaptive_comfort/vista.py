@@ -0,0 +1,123 @@
+"""Reading the results exported from IES Vista.
+
+The TM52 (and TM59) reports exported from Vista as csv are made up of sections of rooms ("Passed:", "Failed:",
+"Unoccupied:"), each with a header row starting "Room Name" followed by a row for each room, among notes and
+summary rows. The file is parsed a chunk of lines at a time by pandas' C parser and the room rows of each chunk
+are selected with vectorised operations, so large multi-room exports don't need any line-by-line Python work
+and only the room rows are kept in memory.
+
+Example::
+
+    df_vista = read_vista_results("TestJob1_TM52_0.1.csv")
+"""
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+
+VISTA_ENCODING = "latin-1"  # Vista writes cp1252 quotes into the notes, latin-1 reads any byte
+VISTA_MAX_COLUMNS = 16  # Maximum number of comma separated fields read from each line
+VISTA_HEADER = "Room Name"  # First field of the header row of each section of rooms
+LI_VISTA_STATUS = ["Passed:", "Failed:", "Unoccupied:"]  # First field of the row starting each section
+LI_VISTA_TEXT_COLUMNS = ["Room Name", "Room ID", "Criteria failing"]
+VISTA_CHUNK_SIZE = 10000  # Rows parsed at a time
+VISTA_WIDTH_ROW = ",".join(map(str, range(VISTA_MAX_COLUMNS))) + "\n"  # Sets the number of fields of each chunk
+
+
+def iter_vista_chunks(fpth, chunksize=VISTA_CHUNK_SIZE):
+    """Parses a Vista csv export a chunk of rows at a time.
+
+    The lines of each chunk are parsed together rather than with pandas' chunksize, which fails on chunks with a
+    single row of fewer fields than VISTA_MAX_COLUMNS. Each chunk starts with VISTA_WIDTH_ROW for the same reason.
+
+    Args:
+        fpth (Union[pathlib.Path, str]): Path of the csv exported from Vista.
+        chunksize (int, optional): Number of lines parsed at a time. Defaults to VISTA_CHUNK_SIZE.
+
+    Yields:
+        pandas.DataFrame: VISTA_MAX_COLUMNS string columns for each non-blank line of the chunk.
+    """
+    with open(str(fpth), encoding=VISTA_ENCODING, newline="") as f:
+        while True:
+            text = "".join(itertools.islice(f, chunksize))
+            if not text:
+                return
+            if text.strip():  # Chunks of blank lines don't contain any rows
+                yield pd.read_csv(
+                    io.StringIO(VISTA_WIDTH_ROW + text),
+                    header=0,
+                    names=range(VISTA_MAX_COLUMNS),
+                    dtype=str,
+                    skipinitialspace=True,
+                    skip_blank_lines=True,
+                    engine="c",
+                )
+
+
+def read_vista_results(fpth, sort=True, chunksize=VISTA_CHUNK_SIZE):
+    """Reads the room results from a Vista TM52/TM59 csv export.
+
+    Args:
+        fpth (Union[pathlib.Path, str]): Path of the csv exported from Vista.
+        sort (bool, optional): Sort the rooms by room ID, matching arr_room_ids_sorted. Defaults to True.
+        chunksize (int, optional): Number of rows parsed at a time. Defaults to VISTA_CHUNK_SIZE.
+
+    Raises:
+        ValueError: If the file doesn't contain a header row for the rooms.
+
+    Returns:
+        pandas.DataFrame: A row for each room with the columns of the Vista report, converted to numbers where
+            possible, and a "Status" column with the section the room was reported in (e.g. "Failed").
+            Rooms not failing any criteria have an empty "Criteria failing" value.
+    """
+    li_dfs = []
+    li_columns = None  # Taken from the first header row
+    in_rooms = False  # Whether the previous chunk ended with a header or room row
+    status = None  # Section the last row of the previous chunk was in
+    for df_raw in iter_vista_chunks(fpth, chunksize):
+        arr_numeric = pd.to_numeric(df_raw[2], errors="coerce").notnull().values
+        # Header and section rows don't have a number in the third column, so only their first field is needed
+        ser_first = df_raw.loc[~arr_numeric, 0].str.strip()
+        arr_header = np.zeros(len(df_raw), dtype=bool)
+        arr_header[~arr_numeric] = (ser_first == VISTA_HEADER).values
+
+        # Room rows are the rows directly after a header row with a number in the third column. The rows before
+        # the first non-numeric row of the chunk (run 0) continue the run at the end of the previous chunk
+        arr_run = np.cumsum(~arr_numeric)  # Consecutive numeric rows share the run of the row before them
+        arr_room = arr_numeric & (
+            np.isin(arr_run, arr_run[arr_header]) | (in_rooms & (arr_run == 0))
+        )
+        in_rooms = bool(arr_header[-1] or arr_room[-1])
+        ser_status = (
+            ser_first[ser_first.isin(LI_VISTA_STATUS)].str.rstrip(":").reindex(df_raw.index)
+        )
+        if status is not None and pd.isnull(ser_status.iloc[0]):
+            ser_status.iloc[0] = status
+        ser_status = ser_status.ffill()
+        if pd.notnull(ser_status.iloc[-1]):
+            status = ser_status.iloc[-1]
+
+        if li_columns is None:
+            if not arr_header.any():
+                continue
+            li_columns = [
+                name.strip() for name in df_raw.loc[arr_header].iloc[0].dropna().tolist()
+            ]
+        df = df_raw.loc[arr_room, range(len(li_columns))].copy()
+        df.columns = li_columns
+        for column in li_columns:
+            if column in LI_VISTA_TEXT_COLUMNS:
+                ser = df[column].str.strip()
+                df[column] = ser.where(ser != "-", "").fillna("")
+            else:  # Surrounding whitespace is ignored
+                df[column] = pd.to_numeric(df[column], errors="coerce")
+        df["Status"] = ser_status[arr_room].values
+        li_dfs.append(df)
+    if li_columns is None:
+        raise ValueError("No room results found in {0}".format(fpth))
+
+    df = pd.concat(li_dfs, ignore_index=True)
+    if sort:
+        df = df.sort_values(by=["Room ID"])
+    return df.reset_index(drop=True)
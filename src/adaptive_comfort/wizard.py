@@ -0,0 +1,211 @@
+"""Methods shared by the TM52, TM59 and TM59 mechanical ventilation wizards for loading the inputs from files,
+serving stored results and naming the results spreadsheet.
+
+Each wizard subclasses CalcWizardBase, giving only the name of its assessment (also the prefix of the results
+spreadsheet) and the subdirectory of the project's results folder the spreadsheet is output to.
+
+Example::
+
+    class Tm52CalcWizard(CalcWizardBase):
+        ASSESSMENT = "TM52"
+        RESULTS_SUBDIR = "tm52"
+"""
+import logging
+import pathlib
+
+from adaptive_comfort.blocks import assess_in_blocks
+from adaptive_comfort.utils import (
+    create_paths,
+    fromfile,
+    calculation_settings,
+    input_digest as create_input_digest,
+    read_stored_results,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CalcWizardBase:
+    ASSESSMENT = None  # Name of the assessment within the calculation settings and of the results spreadsheet
+    RESULTS_SUBDIR = None  # Subdirectory of the project's mf_results folder the results spreadsheet is output to
+
+    @classmethod
+    def from_files(
+        cls,
+        fdir,
+        fdir_results=None,
+        on_linux=True,
+        skip_unchanged=False,
+        block_size=None,
+        n_workers=None,
+        **kwargs
+    ):
+        """Pass file directory containing numpy data.
+
+        Args:
+            fdir (Union[pathlib.Path, str]): file directory containing numpy data.
+            fdir_results (Union[pathlib.Path, str], optional): Used to override project path to save elsewhere.
+            on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.. Defaults to True.
+            skip_unchanged (bool, optional): If the results were previously calculated from the same input data
+                and calculation settings, skip the calculation and serve the stored results. Defaults to False.
+                The input data is hashed, so results stored by a wizard created directly are also found.
+            block_size (int, optional): If given, the time-series are memory-mapped and the rooms are assessed in
+                blocks of this many rooms, bounding the peak memory for models larger than memory, see
+                blocks.assess_in_blocks. Defaults to None.
+            n_workers (int, optional): Number of worker processes the blocks of rooms are spread across, only used
+                with block_size. Defaults to None.
+            **kwargs: Passed on to the class constructor, e.g. track_memory.
+
+        Returns:
+            Union[CalcWizardBase, StoredResults]: Calculated results, an instance of the wizard. If skipped, only the
+                stored results for each room, see from_stored_results.
+        """
+        input_data = fromfile(
+            create_paths(fdir), allow_pickle=True, mmap_mode=None if block_size is None else "r"
+        )
+        digest = None  # Otherwise calculated from the input data when the results are stored, see digest
+        if skip_unchanged:
+            digest = cls.create_digest(input_data, kwargs)
+            di_stored = read_stored_results(
+                cls.results_fpth(input_data.di_project_info, fdir_results, on_linux), digest
+            )
+            if di_stored is not None:
+                return cls.from_stored_results(di_stored)
+        if block_size is not None:
+            return assess_in_blocks(
+                cls,
+                input_data,
+                block_size,
+                fdir_results=fdir_results,
+                on_linux=on_linux,
+                input_digest=digest,
+                n_workers=n_workers,
+                **kwargs
+            )
+        return cls(
+            inputs=input_data,
+            fdir_results=fdir_results,
+            on_linux=on_linux,
+            input_digest=digest,
+            **kwargs
+        )
+
+    @classmethod
+    def from_stored_results(cls, di_stored):
+        """Creates an instance from stored results without running the calculation.
+
+        Args:
+            di_stored (dict): Stored results, see utils.read_stored_results.
+
+        Returns:
+            StoredResults: The stored results for each room, with skipped set to True.
+        """
+        calc = StoredResults(cls, di_stored)
+        logger.info(
+            "%s inputs unchanged, calculation skipped. Results File Path: %s", cls.ASSESSMENT, calc.output_path
+        )
+        return calc
+
+    @classmethod
+    def create_digest(cls, inputs, di_kwargs):
+        """Digest of the input data and the calculation settings, the same whether the wizard is created directly
+        or from files, so stored results are found by either.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+            di_kwargs (dict): Keyword arguments of the wizard, see utils.calculation_settings.
+
+        Returns:
+            str: Hexadecimal digest, see utils.input_digest.
+        """
+        return create_input_digest(inputs, calculation_settings(cls.ASSESSMENT, di_kwargs))
+
+    def digest(self, inputs):
+        """Returns the input digest, calculating it from the input data if it wasn't given. Hashing every input
+        array is only worth doing when the results are stored.
+
+        Args:
+            inputs (Tm52InputData): Class instance containing the required inputs.
+
+        Returns:
+            str: Hexadecimal digest, see create_digest.
+        """
+        if self.input_digest is None:
+            self.input_digest = self.create_digest(inputs, self.di_settings)
+        return self.input_digest
+
+    @classmethod
+    def results_fpth(cls, di_project_info, fdir_results=None, on_linux=True):
+        """Path of the excel spreadsheet the results are output to.
+
+        Args:
+            di_project_info (dict): Project information from the IES API.
+            fdir_results (Union[pathlib.Path, str], optional): Override project path. Defaults to None.
+            on_linux (bool, optional): Whether running script in linux or windows. Defaults to True.
+
+        Returns:
+            str: Path of the excel spreadsheet.
+        """
+        if fdir_results is None:
+            fdir_assessment = (
+                pathlib.PureWindowsPath(di_project_info["project_path"])
+                / "mf_results"
+                / cls.RESULTS_SUBDIR
+            )
+        else:
+            fdir_assessment = fdir_results
+        file_name = "{0}__{1}.xlsx".format(cls.ASSESSMENT, di_project_info["project_name"])
+        fpth_results = fdir_assessment / file_name
+        if on_linux:
+            return fpth_results.as_posix().replace("C:/", "/mnt/c/")
+        else:
+            return str(fpth_results)
+
+
+class StoredResults:
+    def __init__(self, wizard, di_stored):
+        """Results served from storage when the calculation was skipped, see CalcWizardBase.from_stored_results.
+        Only the results for each room are stored, so the other attributes and methods of the wizard, which need
+        the calculated arrays (e.g. di_criteria, worst_rooms, category_sweep), raise an AttributeError saying so.
+
+        Args:
+            wizard (type): The calculation wizard, e.g. Tm52CalcWizard.
+            di_stored (dict): Stored results, see utils.read_stored_results.
+        """
+        self.wizard = wizard
+        self.ASSESSMENT = wizard.ASSESSMENT
+        self.memory = None
+        self.skipped = True
+        self.input_digest = di_stored["input_digest"]
+        self.output_path = di_stored["output_path"]
+        self.li_room_records = di_stored["results"]
+
+    def __getattr__(self, name):
+        if name.startswith("__") or "ASSESSMENT" not in vars(self):  # e.g. looked up by copy and pickle
+            raise AttributeError(name)
+        raise AttributeError(
+            "{0} isn't available as the {1} calculation was skipped and only the results for each room were "
+            "stored, see room_records. Run without skip_unchanged to recalculate.".format(name, self.ASSESSMENT)
+        )
+
+    def digest(self, inputs=None):
+        """Returns the input digest of the stored results.
+
+        Args:
+            inputs (Tm52InputData, optional): Not used, for the same signature as the wizard. Defaults to None.
+
+        Returns:
+            str: Hexadecimal digest, see CalcWizardBase.create_digest.
+        """
+        return self.input_digest
+
+    def room_records(self, inputs=None):
+        """The stored results for each room, the same as the wizard's room_records.
+
+        Args:
+            inputs (Tm52InputData, optional): Not used, for the same signature as the wizard. Defaults to None.
+
+        Returns:
+            generator: Yields a dictionary of results for each room.
+        """
+        return iter(self.li_room_records)
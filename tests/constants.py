@@ -16,3 +16,4 @@ FPTH_IES_TESTJOB1_V_0_1 = DIR_TESTJOB1 / "vista" / "TestJob1_TM52_0.1.csv"
 
 ARR_MAX_ADAPTIVE_TEMP = np.load(str(DIR_TESTJOB1_TM52_DATA / "arr_max_adaptive_temp.npy"))
 ARR_RUNNING_MEAN_TEMP = np.load(str(DIR_TESTJOB1_TM52_DATA / "arr_running_mean_temp.npy"))
+FPTH_MEMORY_BASELINE = DIR_TESTS / "testdata" / "memory_baseline.json"
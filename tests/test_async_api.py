@@ -0,0 +1,57 @@
+"""Tests for the asyncio entry points."""
+import asyncio
+
+import pytest
+
+from adaptive_comfort.async_api import STAGE_COMPLETE, STAGE_LOAD, assess
+from adaptive_comfort.tm59mechvent_calc import Tm59MechVentCalcWizard
+from .constants import DIR_TESTJOB1_TM59MECHVENT_DATA
+
+
+def test_assess(tmp_path):
+    """Test the stages are reported to the event loop as they start and the calculated wizard is returned
+    """
+    li_stages = []
+    calc = asyncio.run(
+        assess(
+            Tm59MechVentCalcWizard,
+            DIR_TESTJOB1_TM59MECHVENT_DATA,
+            tmp_path,
+            on_stage=li_stages.append,
+        )
+    )
+    assert li_stages == [
+        STAGE_LOAD,
+        "op_temp",
+        "run_criteria",
+        "merge_dfs",
+        "to_excel",
+        STAGE_COMPLETE,
+    ]
+    assert isinstance(calc, Tm59MechVentCalcWizard)
+    assert list(tmp_path.glob("*.xlsx"))
+
+
+def test_assess_cancelled(tmp_path):
+    """Test cancelling the awaiting task stops the calculation before the results are written
+    """
+    li_stages = []
+
+    async def cancel_after_op_temp():
+        task = asyncio.ensure_future(
+            assess(
+                Tm59MechVentCalcWizard,
+                DIR_TESTJOB1_TM59MECHVENT_DATA,
+                tmp_path,
+                on_stage=li_stages.append,
+            )
+        )
+        while "op_temp" not in li_stages:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_after_op_temp())  # Waits for the executor to finish
+    assert "to_excel" not in li_stages
+    assert not list(tmp_path.glob("*.xlsx"))
@@ -0,0 +1,41 @@
+"""Tests for the bit-packed boolean masks."""
+import numpy as np
+
+from adaptive_comfort.bitmask import pack_chunks, pack_comparison, pack_mask
+
+
+def test_pack_comparison():
+    """Test packing a comparison in chunks matches the boolean mask, including a partial last byte
+    """
+    arr = np.random.RandomState(0).rand(3, 4, 1003)
+    mask = pack_comparison(arr, np.greater, 0.5, chunk_size=64)
+    np.testing.assert_array_equal(mask.unpack(), arr > 0.5)
+    assert mask.arr_bits.shape == (3, 4, 126)
+    np.testing.assert_array_equal(mask.count(), (arr > 0.5).sum(axis=2))
+
+    arr_index = np.flatnonzero(np.arange(1003) % 24 < 9)  # e.g. the night time-steps
+    mask = pack_comparison(arr, np.greater, 0.5, chunk_size=64, arr_index=arr_index)
+    np.testing.assert_array_equal(mask.unpack(), arr[..., arr_index] > 0.5)
+
+
+def test_pack_chunks():
+    """Test packing chunks which don't fill a byte, including an empty chunk, matches packing the whole mask
+    """
+    arr_bool = np.random.RandomState(2).rand(2, 3, 100) > 0.5
+    arr_bounds = [0, 3, 11, 11, 16, 61, 100]
+    mask = pack_chunks((arr_bool[..., a:b] for a, b in zip(arr_bounds[:-1], arr_bounds[1:])), 100, (2, 3))
+    np.testing.assert_array_equal(mask.arr_bits, pack_mask(arr_bool).arr_bits)
+
+
+def test_count_segments():
+    """Test counting within segments which don't start or end on a byte, are within one byte, or are empty
+    """
+    arr_bool = np.random.RandomState(1).rand(2, 101) > 0.3
+    arr_indptr = np.array([0, 3, 5, 5, 21, 22, 64, 101])
+    np.testing.assert_array_equal(
+        pack_mask(arr_bool).count_segments(arr_indptr),
+        [
+            [arr[a:b].sum() for a, b in zip(arr_indptr[:-1], arr_indptr[1:])]
+            for arr in arr_bool
+        ],
+    )
@@ -0,0 +1,70 @@
+"""Tests for assessing models in blocks of rooms from memory-mapped inputs."""
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from adaptive_comfort.utils import create_paths, fromfile
+from adaptive_comfort.tm59_calc import Tm59CalcWizard
+from adaptive_comfort.tm59mechvent_calc import Tm59MechVentCalcWizard
+from adaptive_comfort.blocks import assess_in_blocks, attach_array, share_array
+from .constants import DIR_TESTJOB1_TM59_DATA, DIR_TESTJOB1_TM59MECHVENT_DATA
+
+
+def test_assess_in_blocks(tmp_path):
+    """Test the results of an assessment in blocks of rooms match assessing all the rooms together
+    """
+    paths = create_paths(DIR_TESTJOB1_TM59_DATA)
+    inputs = fromfile(paths, allow_pickle=True)
+    inputs_mmap = fromfile(paths, allow_pickle=True, mmap_mode="r")
+    assert isinstance(inputs_mmap.arr_air_temp, np.memmap)
+
+    calc = Tm59CalcWizard(inputs, fdir_results=tmp_path / "full")
+    calc_blocks = assess_in_blocks(
+        Tm59CalcWizard, inputs_mmap, block_size=7, fdir_results=tmp_path / "blocks"
+    )
+
+    assert calc_blocks.arr_op_temp_v is None  # Large arrays aren't kept
+    assert calc_blocks.input_digest == calc.input_digest
+    np.testing.assert_array_equal(calc_blocks.arr_bedroom_index, calc.arr_bedroom_index)
+    assert list(calc_blocks.room_records(inputs)) == list(calc.room_records(inputs))
+    pd.testing.assert_frame_equal(calc_blocks.df_results, calc.df_results)
+
+
+def test_assess_in_blocks_peak_memory():
+    """Test the peak traced allocation is bounded by the block size rather than the number of rooms
+    """
+    inputs = fromfile(
+        create_paths(DIR_TESTJOB1_TM59MECHVENT_DATA), allow_pickle=True, mmap_mode="r"
+    )
+    li_peaks = []
+    for block_size in [len(inputs.arr_room_ids_sorted), 3]:
+        tracemalloc.start()
+        assess_in_blocks(Tm59MechVentCalcWizard, inputs, block_size, write_results=False)
+        li_peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    assert li_peaks[1] < li_peaks[0] / 3
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_assess_in_blocks_workers(mmap_mode):
+    """Test spreading the blocks across worker processes, attached to memory-mapped or shared memory inputs
+    """
+    inputs = fromfile(
+        create_paths(DIR_TESTJOB1_TM59MECHVENT_DATA), allow_pickle=True, mmap_mode=mmap_mode
+    )
+    li_shared_memory = []
+    spec = share_array(inputs.arr_air_temp, li_shared_memory)
+    assert spec[0] == ("memmap" if mmap_mode else "shm")
+    np.testing.assert_array_equal(attach_array(spec), inputs.arr_air_temp)
+    for shm in li_shared_memory:
+        shm.close()
+        shm.unlink()
+
+    calc = assess_in_blocks(Tm59MechVentCalcWizard, inputs, 10, write_results=False)
+    calc_workers = assess_in_blocks(
+        Tm59MechVentCalcWizard, inputs, 10, write_results=False, n_workers=2
+    )
+    assert list(calc_workers.room_records(inputs)) == list(calc.room_records(inputs))
+    assert list(calc_workers.di_stage_time) == list(calc.di_stage_time) == ["op_temp", "run_criteria"]
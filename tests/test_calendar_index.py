@@ -0,0 +1,43 @@
+"""Tests for the calendar aware time-step indexing."""
+import numpy as np
+import pytest
+
+from adaptive_comfort.calendar_index import CalendarIndex
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from .constants import DIR_TESTJOB1_TM52_DATA
+
+
+def test_leap_year():
+    calendar_index = CalendarIndex(2012, 8784)
+    assert calendar_index.n_days == 366
+    assert calendar_index.summer == slice(121 * 24, 274 * 24)  # 1st May to 30th September inclusive
+    assert calendar_index.n_night_steps == 9 * 366
+
+
+def test_ten_minute_intervals():
+    calendar_index = CalendarIndex(2010, 52560)
+    assert calendar_index.steps_per_day == 144
+    assert calendar_index.timestep_minutes == 10
+    assert calendar_index.summer == slice(120 * 144, 273 * 144)
+    assert calendar_index.n_night_steps == 9 * 6 * 365
+
+
+def test_invalid_number_of_timesteps():
+    with pytest.raises(ValueError):
+        CalendarIndex(2010, 8761)
+
+
+def test_quarter_hourly_results_match_hourly():
+    """Repeating each hourly reading 4 times gives the same TM52 results at a 15 minute reporting interval."""
+    inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True), slice(0, 3))
+    inputs_15_min = subset_inputs(inputs, slice(None))
+    for name in ["arr_air_temp", "arr_mean_radiant_temp", "arr_occupancy"]:
+        setattr(inputs_15_min, name, np.repeat(getattr(inputs, name), 4, axis=1))
+
+    calc = Tm52CalcWizard(inputs, write_results=False)
+    calc_15_min = Tm52CalcWizard(inputs_15_min, write_results=False)
+    assert calc_15_min.calendar_index.timestep_minutes == 15
+    for criterion, di_criterion in calc.di_criteria.items():
+        for k, v in di_criterion.items():
+            np.testing.assert_allclose(calc_15_min.di_criteria[criterion][k], v)
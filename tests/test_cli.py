@@ -0,0 +1,32 @@
+"""Tests for the `adaptive-comfort` command line interface."""
+import json
+
+import adaptive_comfort.wizard
+from adaptive_comfort.cli import main
+from .constants import DIR_TESTJOB1_TM59MECHVENT_DATA
+
+
+def test_cli_streams_json_lines(capsys):
+    """Each room is written to stdout as one JSON line."""
+    exit_code = main(["tm59mechvent", str(DIR_TESTJOB1_TM59MECHVENT_DATA), "--block-size", "10"])
+    li_records = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+    assert exit_code == 0
+    assert len(li_records) == 27
+    assert li_records[0]["Results"]["0.1"]["Fixed Temp Criterion (Pass/Fail)"] in ("Pass", "Fail")
+
+
+def test_cli_doesnt_hash_inputs(monkeypatch, capsys):
+    """The inputs aren't hashed as the results aren't stored, so the first room is written straight away."""
+
+    def input_digest(*args, **kwargs):
+        raise AssertionError("The input digest was calculated")
+
+    monkeypatch.setattr(adaptive_comfort.wizard, "create_input_digest", input_digest)
+    assert main(["tm59mechvent", str(DIR_TESTJOB1_TM59MECHVENT_DATA), "--block-size", "10"]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 27
+
+
+def test_cli_exit_code_on_failure(tmp_path, capsys):
+    """A non-zero exit code is returned when the assessment can't be completed."""
+    assert main(["tm52", str(tmp_path)]) == 1
+    assert "error" in capsys.readouterr().err
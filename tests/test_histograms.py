@@ -0,0 +1,82 @@
+"""Tests for the histograms used to re-evaluate the criteria with other thresholds."""
+import numpy as np
+
+from adaptive_comfort.blocks import assess_in_blocks
+from adaptive_comfort.criteria_testing import criterion_time_of_exceedance, criterion_upper_limit_temperature
+from adaptive_comfort.equations import daily_weighted_exceedance_occupied
+from adaptive_comfort.occupancy import occupied_index
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
+from .constants import DIR_TESTJOB1_TM52_DATA
+
+
+def test_exceedance_summary():
+    """Test the summary reproduces the criteria, re-evaluates them with other thresholds, and is the same when
+    assessed in blocks of rooms
+    """
+    inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True), slice(0, 12))
+    inputs.arr_air_temp = inputs.arr_air_temp + 2  # So some rooms pass and others fail
+    inputs.arr_mean_radiant_temp = inputs.arr_mean_radiant_temp + 2
+    calc = Tm52CalcWizard(inputs, write_results=False, summarise=True)
+    summary = calc.exceedance_summary
+    for arr_result, arr_expected in zip(
+        summary.time_of_exceedance()
+        + summary.daily_weighted_exceedance()
+        + summary.upper_limit_temperature(),
+        [
+            calc.arr_criterion_one_bool,
+            calc.arr_criterion_one_percent,
+            calc.arr_criterion_two_bool,
+            calc.arr_criterion_two_max,
+            calc.arr_criterion_three_bool,
+            calc.arr_criterion_three_max,
+        ],
+    ):
+        np.testing.assert_array_equal(arr_result, arr_expected)
+
+    occupied = occupied_index(inputs.arr_occupancy)
+    occupied_may_to_sept = occupied.time_slice(calc.calendar_index.summer)
+    arr_n_exceed = occupied_may_to_sept.count(occupied_may_to_sept.gather(calc.arr_deltaT_round) >= 2)
+    np.testing.assert_array_equal(
+        summary.time_of_exceedance(threshold=2, allowance=5)[0],
+        arr_n_exceed > occupied_may_to_sept.arr_n_occupied * 0.05,
+    )
+    arr_daily_weights = daily_weighted_exceedance_occupied(
+        occupied.gather(calc.arr_deltaT_round), occupied, calc.calendar_index
+    )
+    np.testing.assert_array_equal(summary.days_exceeding(3), (arr_daily_weights > 3).sum(axis=2))
+    np.testing.assert_array_equal(
+        summary.upper_limit_temperature(threshold=2)[0], calc.arr_deltaT_round.max(axis=2) > 2
+    )
+
+    calc_blocks = assess_in_blocks(Tm52CalcWizard, inputs, 5, write_results=False, summarise=True)
+    for threshold in [-1, 0, 1, 2, 3.5, 100]:
+        for f in ["time_of_exceedance", "daily_weighted_exceedance", "upper_limit_temperature"]:
+            for arr_blocks, arr in zip(
+                getattr(calc_blocks.exceedance_summary, f)(threshold), getattr(summary, f)(threshold)
+            ):
+                np.testing.assert_array_equal(arr_blocks, arr)
+
+
+def test_exceedance_summary_thresholds():
+    """Test other thresholds and allowances match re-running the criteria with the rounded delta T shifted by the
+    difference in threshold
+    """
+    inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True), slice(0, 12))
+    inputs.arr_air_temp = inputs.arr_air_temp + 2  # So some rooms pass and others fail
+    inputs.arr_mean_radiant_temp = inputs.arr_mean_radiant_temp + 2
+    calc = Tm52CalcWizard(inputs, write_results=False, summarise=True)
+    summary = calc.exceedance_summary
+    for shift in [-1, 1, 2]:
+        arr_deltaT_shifted = calc.arr_deltaT_round - shift  # Threshold of 1 + shift for criterion one
+        arr_bool, arr_percent = criterion_time_of_exceedance(
+            arr_deltaT_shifted, calc.occupied, calc.calendar_index
+        )
+        np.testing.assert_array_equal(summary.time_of_exceedance(threshold=1 + shift), (arr_bool, arr_percent))
+        for allowance in [1.5, 10]:
+            np.testing.assert_array_equal(
+                summary.time_of_exceedance(threshold=1 + shift, allowance=allowance)[0], arr_percent > allowance
+            )
+        arr_bool, arr_max = criterion_upper_limit_temperature(arr_deltaT_shifted, calc.calendar_index)
+        np.testing.assert_array_equal(summary.upper_limit_temperature(threshold=4 + shift)[0], arr_bool)
+        np.testing.assert_array_equal(summary.upper_limit_temperature()[1], arr_max + shift)
@@ -0,0 +1,66 @@
+"""Tests the package imports quickly, without the modules only needed for data frames and excel."""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from . import DIR_MODULE
+
+IMPORT_TIME_RATIO = 1.0  # Budget to import the package after numpy, as a multiple of the time to import numpy (~0.5)
+MAX_NEW_MODULES = 100  # Modules the package loads after numpy (~60, pandas alone loads ~360)
+LI_DEFERRED_MODULES = ["pandas", "xlsxwriter", "getpass", "sqlite3", "adaptive_comfort._version"]
+SCRIPT_IMPORT = """
+import json, sys, time
+sys.path.insert(0, {0!r})
+start = time.perf_counter()
+import numpy
+numpy_elapsed = time.perf_counter() - start
+set_numpy_modules = set(sys.modules)
+start = time.perf_counter()
+import {1}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "numpy_elapsed": numpy_elapsed,
+    "elapsed": elapsed,
+    "new_modules": sorted(set(sys.modules) - set_numpy_modules),
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+
+def import_in_subprocess(module):
+    """Imports numpy then a module in a new interpreter, returning the import times and the modules loaded."""
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT_IMPORT.format(str(DIR_MODULE), module)],
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    return json.loads(out.decode())
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "adaptive_comfort.tm52_calc",
+        "adaptive_comfort.tm59_calc",
+        "adaptive_comfort.tm59mechvent_calc",
+        "adaptive_comfort.cli",
+    ],
+)
+def test_deferred_imports(module):
+    """Test the wizards and cli import without pandas, xlsxwriter etc., which load when first used
+    """
+    set_modules = set(import_in_subprocess(module)["modules"])
+    assert module in set_modules
+    assert set_modules.isdisjoint(LI_DEFERRED_MODULES)
+
+
+def test_import_time_budget():
+    """Test the cli and every wizard import within the budget, relative to importing numpy in the same interpreter
+    so the test holds on slow machines, taking the quickest of a few runs
+    """
+    li_di_import = [import_in_subprocess("adaptive_comfort.cli") for _ in range(3)]
+    ratio = min(di_import["elapsed"] / di_import["numpy_elapsed"] for di_import in li_di_import)
+    assert ratio < IMPORT_TIME_RATIO
+    assert len(li_di_import[0]["new_modules"]) < MAX_NEW_MODULES
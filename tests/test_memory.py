@@ -0,0 +1,45 @@
+"""Memory regression tests for the calculation wizards."""
+import json
+
+import pytest
+
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.tm59_calc import Tm59CalcWizard
+from adaptive_comfort.tm59mechvent_calc import Tm59MechVentCalcWizard
+from .constants import (
+    DIR_TESTJOB1_TM52_DATA,
+    DIR_TESTJOB1_TM59_DATA,
+    DIR_TESTJOB1_TM59MECHVENT_DATA,
+    FPTH_MEMORY_BASELINE,
+)
+
+with open(str(FPTH_MEMORY_BASELINE)) as f:
+    DI_MEMORY_BASELINE = json.load(f)
+
+
+def load_inputs(fdir, n_rooms):
+    """Loads the test job inputs keeping only the first n rooms so the traced runs stay quick."""
+    inputs = fromfile(create_paths(fdir), allow_pickle=True)
+    return subset_inputs(inputs, slice(0, n_rooms))
+
+
+@pytest.mark.parametrize(
+    "name, cls, fdir",
+    [
+        ("tm52", Tm52CalcWizard, DIR_TESTJOB1_TM52_DATA),
+        ("tm59", Tm59CalcWizard, DIR_TESTJOB1_TM59_DATA),
+        ("tm59mechvent", Tm59MechVentCalcWizard, DIR_TESTJOB1_TM59MECHVENT_DATA),
+    ],
+)
+def test_peak_memory_per_room_timestep(name, cls, fdir, tmp_path):
+    """Fails if the peak traced allocation per room time-step of any stage working on the time-series regresses
+    beyond the stored baseline. Re-record the baseline when a change reduces the memory used.
+    """
+    inputs = load_inputs(fdir, DI_MEMORY_BASELINE["n_rooms"])
+    calc = cls(inputs, fdir_results=tmp_path, track_memory=True)
+    n = inputs.arr_air_temp.size
+    assert list(calc.memory.di_stage_peak.keys())[0] in calc.memory.report()
+    for stage, baseline in DI_MEMORY_BASELINE["peak_bytes_per_room_timestep"][name].items():
+        peak = calc.memory.di_stage_peak[stage] / n
+        assert peak <= baseline * (1 + DI_MEMORY_BASELINE["tolerance"]), calc.memory.report()
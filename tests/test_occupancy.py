@@ -0,0 +1,82 @@
+"""Tests for the index of occupied time-steps."""
+import numpy as np
+import pytest
+
+from adaptive_comfort import occupancy
+from adaptive_comfort.calendar_index import CalendarIndex
+from adaptive_comfort.occupancy import occupied_index
+from adaptive_comfort.utils import sum_every_n_elements
+
+
+def test_occupied_index():
+    """Test counting and summing the occupied readings matches masking the full arrays, including an unoccupied
+    room
+    """
+    rng = np.random.RandomState(0)
+    calendar_index = CalendarIndex(2010, 8760)
+    arr_occupancy = rng.randint(0, 3, size=(4, 8760)) * (rng.rand(4, 8760) > 0.7)
+    arr_occupancy[2] = 0
+    arr_values = rng.rand(3, 4, 8760)
+    arr_mask = arr_occupancy != 0
+
+    occupied = occupied_index(arr_occupancy)
+    assert occupied_index(occupied) is occupied
+    np.testing.assert_array_equal(occupied.arr_n_occupied, (arr_occupancy > 0).sum(axis=1))
+    np.testing.assert_array_equal(
+        occupied.count(occupied.gather(arr_values) > 0.5),
+        ((arr_values > 0.5) & arr_mask).sum(axis=2),
+    )
+    np.testing.assert_allclose(
+        occupied.sum_by_day(occupied.gather(arr_values), calendar_index.steps_per_day),
+        np.apply_along_axis(sum_every_n_elements, 2, np.where(arr_mask, arr_values, 0), n=24),
+    )
+
+    occupied_summer = occupied.time_slice(calendar_index.summer)
+    np.testing.assert_array_equal(
+        occupied_summer.arr_n_occupied,
+        (arr_occupancy[:, calendar_index.summer] > 0).sum(axis=1),
+    )
+
+
+@pytest.mark.parametrize("timesteps_per_hour", [1, 6])
+def test_occupied_index_dense(monkeypatch, timesteps_per_hour):
+    """Test the index of dense occupancy (bedrooms occupied every night, a living room occupied all day) is no
+    larger than a boolean mask of every room and time-step, and gathers the same readings a few runs at a time,
+    including a negative occupancy which isn't counted towards the occupied time
+    """
+    monkeypatch.setattr(occupancy, "CHUNK_SIZE", 50)
+    calendar_index = CalendarIndex(2010, 8760 * timesteps_per_hour)
+    arr_hour = (np.arange(calendar_index.n_timesteps) * calendar_index.timestep_hours) % 24
+    arr_occupancy = np.stack(
+        [
+            (arr_hour >= 22) | (arr_hour < 7),  # Bedroom
+            (arr_hour >= 7) & (arr_hour < 23),  # Living room
+            np.ones(calendar_index.n_timesteps, dtype=bool),  # Always occupied
+        ]
+    ).astype(float)
+    arr_occupancy[0, 5] = -1
+    arr_mask = arr_occupancy != 0
+    arr_values = np.random.RandomState(0).rand(2, 3, calendar_index.n_timesteps)
+
+    occupied = occupied_index(arr_occupancy)
+    assert occupied.nbytes <= arr_mask.nbytes
+    np.testing.assert_array_equal(occupied.gather(arr_values), arr_values[:, arr_mask])
+    np.testing.assert_array_equal(
+        occupied.pack_comparison(arr_values, np.greater, 0.5).unpack(), arr_values[:, arr_mask] > 0.5
+    )
+    np.testing.assert_array_equal(occupied.arr_room, np.nonzero(arr_mask)[0])
+    np.testing.assert_array_equal(occupied.arr_n_occupied, (arr_occupancy > 0).sum(axis=1))
+    li_chunks = list(occupied.iter_time_chunks(7 * calendar_index.steps_per_day))
+    arr_room, arr_timestep = np.nonzero(arr_mask.T)[::-1]  # In time order
+    np.testing.assert_array_equal(np.concatenate([c[1] for c in li_chunks]), arr_room)
+    np.testing.assert_array_equal(np.concatenate([c[2] for c in li_chunks]), arr_timestep)
+
+    occupied_summer = occupied.time_slice(calendar_index.summer)
+    arr_mask_summer = np.zeros_like(arr_mask)
+    arr_mask_summer[:, calendar_index.summer] = arr_mask[:, calendar_index.summer]
+    np.testing.assert_array_equal(occupied_summer.gather(arr_values), arr_values[:, arr_mask_summer])
+    np.testing.assert_array_equal(
+        occupied_summer.arr_n_occupied, (arr_occupancy[:, calendar_index.summer] > 0).sum(axis=1)
+    )
+    with pytest.raises(ValueError):
+        occupied.time_slice(slice(0, None, 2))
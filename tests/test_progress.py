@@ -0,0 +1,68 @@
+"""Tests for progress reporting and cancellation."""
+import pytest
+
+from adaptive_comfort.utils import AssessmentCancelled, create_paths, fromfile
+from adaptive_comfort.tm59mechvent_calc import Tm59MechVentCalcWizard
+from adaptive_comfort.blocks import assess_in_blocks
+from adaptive_comfort.progress import STAGE_COMPLETE, CancellationToken
+from .constants import DIR_TESTJOB1_TM59MECHVENT_DATA
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    return fromfile(create_paths(DIR_TESTJOB1_TM59MECHVENT_DATA), allow_pickle=True)
+
+
+def test_progress_blocks(inputs):
+    """Test progress is reported for the stages of each block and each completed block of rooms
+    """
+    li_updates = []
+    assess_in_blocks(
+        Tm59MechVentCalcWizard, inputs, 10, write_results=False, progress=li_updates.append
+    )
+    assert [u.rooms_done for u in li_updates if u.stage == "op_temp"] == [0, 10, 20]
+    assert sorted(set(u.rooms_done for u in li_updates)) == [0, 10, 20, 27]
+    assert li_updates[-1].stage == STAGE_COMPLETE
+    assert li_updates[-1].rooms_done == li_updates[-1].n_rooms == 27
+    assert li_updates[-1].remaining == 0.0
+    assert all(u.remaining is not None for u in li_updates if u.rooms_done)
+
+
+def test_cancel_between_blocks(inputs):
+    """Test cancelling stops the assessment before the next block of rooms
+    """
+    token = CancellationToken()
+    li_rooms_done = []
+
+    def progress(update):
+        li_rooms_done.append(update.rooms_done)
+        if update.rooms_done >= 10:
+            token.cancel()
+
+    with pytest.raises(AssessmentCancelled):
+        assess_in_blocks(
+            Tm59MechVentCalcWizard,
+            inputs,
+            10,
+            write_results=False,
+            progress=progress,
+            cancel_token=token,
+        )
+    assert max(li_rooms_done) == 10
+
+
+def test_cancel_between_stages(inputs):
+    """Test cancelling stops a wizard before its next stage
+    """
+    token = CancellationToken()
+    li_stages = []
+
+    def on_stage(stage):
+        li_stages.append(stage)
+        token.cancel()
+
+    with pytest.raises(AssessmentCancelled, match="run_criteria"):
+        Tm59MechVentCalcWizard(
+            inputs, write_results=False, on_stage=on_stage, cancel_token=token
+        )
+    assert li_stages == ["op_temp"]
@@ -0,0 +1,57 @@
+"""Tests for ranking the worst rooms and days."""
+import numpy as np
+
+from adaptive_comfort.equations import daily_weighted_exceedance_occupied
+from adaptive_comfort.occupancy import occupied_index
+from adaptive_comfort.ranking import top_k
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.tm59_calc import Tm59CalcWizard
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
+from .constants import DIR_TESTJOB1_TM52_DATA, DIR_TESTJOB1_TM59_DATA
+
+
+def test_top_k():
+    """Test partial selection matches sorting every value, with NaN ranked last and ties ranked by index"""
+    rng = np.random.RandomState(0)
+    arr = rng.permutation(300).reshape(3, 100) / 10
+    arr[0, 5] = np.nan
+    arr_index, arr_values = top_k(arr, 10)
+    arr_expected = np.argsort(-np.nan_to_num(arr, nan=-np.inf), axis=-1)[:, :10]
+    np.testing.assert_array_equal(arr_index, arr_expected)
+    np.testing.assert_array_equal(arr_values, np.take_along_axis(arr, arr_expected, axis=-1))
+
+    arr_index, arr_values = top_k(np.array([[1, 3, 3, np.nan, 2]]), 10)
+    np.testing.assert_array_equal(arr_index, [[1, 2, 4, 0, 3]])
+
+
+def test_worst_rooms():
+    """Test the worst rooms for each metric, including criteria only run for the bedrooms"""
+    inputs = fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True)
+    calc = Tm59CalcWizard(inputs, write_results=False)
+    di_worst = calc.worst_rooms(inputs, k=3)
+    assert list(di_worst) == [
+        "Criterion A (% Hours Delta T >= 1K)",
+        "Criterion B (Hours Operative T > 26 Deg. C)",
+        "Criterion B (% Hours Operative T > 26 Deg. C)",
+    ]
+    ranking = di_worst["Criterion B (% Hours Operative T > 26 Deg. C)"]
+    arr_percent = calc.di_criteria["Criterion B"]["Criterion B (% Hours Operative T > 26 Deg. C)"]
+    for i in range(len(calc.li_air_speeds_str)):
+        arr_order = np.argsort(-arr_percent[i], kind="stable")[:3]
+        np.testing.assert_array_equal(ranking.arr_values[i], arr_percent[i][arr_order])
+        np.testing.assert_array_equal(ranking.arr_room_ids[i], calc.arr_bedroom_ids[arr_order])
+
+
+def test_worst_days():
+    """Test the worst days of each room match the greatest daily weights"""
+    inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True), slice(0, 6))
+    calc = Tm52CalcWizard(inputs, write_results=False)
+    arr_day, arr_daily_weight = calc.worst_days(inputs, k=4)
+    occupied = occupied_index(inputs.arr_occupancy)
+    arr_daily_weights = daily_weighted_exceedance_occupied(
+        occupied.gather(calc.arr_deltaT), occupied, calc.calendar_index
+    )
+    assert arr_day.shape == (len(calc.li_air_speeds_str), 6, 4)
+    np.testing.assert_array_equal(arr_daily_weight[..., 0], calc.arr_criterion_two_max)
+    np.testing.assert_array_equal(arr_daily_weight, -np.sort(-arr_daily_weights, axis=-1)[..., :4])
+    np.testing.assert_array_equal(np.take_along_axis(arr_daily_weights, arr_day, axis=-1), arr_daily_weight)
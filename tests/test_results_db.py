@@ -0,0 +1,86 @@
+"""Tests for the SQLite results database."""
+import datetime
+import json
+
+import pytest
+
+from adaptive_comfort.results_db import RUN_AT_FORMAT, connect, query_results, utc_run_at
+from adaptive_comfort.tm59_calc import Tm59CalcWizard
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
+from .constants import DIR_TESTJOB1_TM59_DATA
+
+
+def test_results_db(tmp_path):
+    """Test the results are upserted for each room and air speed, filtered by the indexed columns, and that rooms
+    no longer in the project are removed when re-run
+    """
+    fpth_db = tmp_path / "results.sqlite"
+    inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True), slice(0, 8))
+    calc = Tm59CalcWizard(inputs, write_results=False, results_db=fpth_db)
+    n_speeds = len(calc.li_air_speeds_str)
+    li_rows = query_results(fpth_db)
+    assert len(li_rows) == 8 * n_speeds
+    assert li_rows[0]["results"] == next(calc.room_records(inputs))["Results"][calc.li_air_speeds_str[0]]
+
+    li_failing_bedrooms = query_results(fpth_db, assessment="TM59", fail=True, bedroom=True, since="2020-01-01")
+    assert li_failing_bedrooms
+    assert {row["room_id"] for row in li_failing_bedrooms} == {
+        room_id
+        for room_id, arr_fail in zip(inputs.arr_room_ids_sorted, calc.arr_tm59_bool.T)
+        if arr_fail.any() and room_id in calc.arr_bedroom_ids
+    }
+    assert {row["room_group"] for row in query_results(fpth_db, air_speed=0.1)} == {
+        "TM59_VulnerableRooms",
+        "TM59_AnalysedRooms",
+    }
+    assert query_results(fpth_db, project="Another Project") == []
+
+    calc = Tm59CalcWizard.from_files(
+        DIR_TESTJOB1_TM59_DATA, write_results=False, block_size=10, results_db=fpth_db
+    )
+    assert len(query_results(fpth_db)) == len(calc.arr_sorted_room_names) * n_speeds
+    Tm59CalcWizard(subset_inputs(inputs, slice(0, 3)), write_results=False, results_db=fpth_db)
+    assert len(query_results(fpth_db)) == 3 * n_speeds
+
+    conn = connect(fpth_db)
+    try:
+        (input_digest, elapsed, timings, n_rooms), = conn.execute(
+            "SELECT input_digest, elapsed, timings, n_rooms FROM runs"
+        ).fetchall()
+        li_plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM results WHERE room_group = 'x'").fetchall()
+    finally:
+        conn.close()
+    assert n_rooms == 3
+    assert input_digest == query_results(fpth_db)[0]["input_digest"]
+    assert elapsed > 0
+    assert list(json.loads(timings)) == ["bedroom_ids", "op_temp", "max_adaptive_temp", "deltaT", "run_criteria"]
+    assert "idx_results_room_group" in li_plan[0][-1]
+
+
+def test_results_db_since(tmp_path):
+    """Test run_at is stored in UTC and the since filter is compared in UTC, whether given as a local or UTC date
+    and time, with a T or a space
+    """
+    fpth_db = tmp_path / "results.sqlite"
+    inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True), slice(0, 2))
+    Tm59CalcWizard(inputs, write_results=False, results_db=fpth_db)
+    li_rows = query_results(fpth_db)
+    dt_run_at = datetime.datetime.strptime(li_rows[0]["run_at"], RUN_AT_FORMAT).replace(
+        tzinfo=datetime.timezone.utc
+    )
+    assert abs(datetime.datetime.now(datetime.timezone.utc) - dt_run_at) < datetime.timedelta(minutes=5)
+
+    for minutes, n_rows in [(-1, len(li_rows)), (1, 0)]:  # A minute either side, as the strings drop the seconds
+        dt = dt_run_at + datetime.timedelta(minutes=minutes)
+        dt_local = dt.astimezone().replace(tzinfo=None)
+        for since in [
+            dt,
+            dt_local,
+            dt.strftime("%Y-%m-%dT%H:%MZ"),
+            dt_local.strftime("%Y-%m-%dT%H:%M"),
+            dt_local.strftime("%Y-%m-%d %H:%M"),
+        ]:
+            assert len(query_results(fpth_db, since=since)) == n_rows
+    assert utc_run_at(datetime.date(2026, 10, 1)) == utc_run_at("2026-10-01")
+    with pytest.raises(ValueError):
+        query_results(fpth_db, since="01/10/2026")
@@ -0,0 +1,39 @@
+"""Tests for assessing several weather scenarios in one batched pass."""
+import copy
+
+import pytest
+
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.tm59_calc import Tm59CalcWizard
+from adaptive_comfort.scenarios import assess_scenarios, stack_scenarios
+from .constants import DIR_TESTJOB1_TM52_DATA, DIR_TESTJOB1_TM59_DATA
+
+
+@pytest.mark.parametrize(
+    "cls, fdir",
+    [(Tm52CalcWizard, DIR_TESTJOB1_TM52_DATA), (Tm59CalcWizard, DIR_TESTJOB1_TM59_DATA)],
+)
+def test_assess_scenarios(cls, fdir):
+    """Test the batched results for each scenario match running each scenario on its own
+    """
+    inputs = subset_inputs(fromfile(create_paths(fdir), allow_pickle=True), slice(0, 6))
+    inputs_warm = copy.copy(inputs)
+    inputs_warm.arr_dry_bulb_temp = inputs.arr_dry_bulb_temp - 2  # Lower max acceptable temperature
+    inputs_warm.arr_air_temp = inputs.arr_air_temp + 1
+
+    di_results = assess_scenarios(cls, stack_scenarios([inputs, inputs_warm], ["DSY1", "DSY2"]))
+
+    assert list(di_results) == ["DSY1", "DSY2"]
+    for name, inputs_scenario in zip(di_results, [inputs, inputs_warm]):
+        calc = cls(inputs_scenario, write_results=False)
+        assert di_results[name] == list(calc.room_records(inputs_scenario))
+    assert di_results["DSY1"] != di_results["DSY2"]
+
+
+def test_stack_scenarios_different_rooms():
+    """Test scenarios for different rooms can't be stacked
+    """
+    inputs = fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True)
+    with pytest.raises(ValueError):
+        stack_scenarios([subset_inputs(inputs, slice(0, 4)), subset_inputs(inputs, slice(4, 8))])
@@ -0,0 +1,99 @@
+"""Tests for the local assessment service."""
+import json
+import logging
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from adaptive_comfort import service
+from adaptive_comfort.service import AssessmentServer, ProjectCache
+from .constants import DIR_TESTJOB1, DIR_TESTJOB1_TM59MECHVENT_DATA
+
+
+def post(url, di):
+    request = urllib.request.Request(
+        url, data=json.dumps(di).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def test_repeat_requests_are_served_from_cache():
+    server = AssessmentServer(("127.0.0.1", 0), max_projects=2, quiet=True, root=DIR_TESTJOB1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = "http://127.0.0.1:{0}/assess".format(server.server_address[1])
+        di_request = {"assessment": "tm59mechvent", "fdir": str(DIR_TESTJOB1_TM59MECHVENT_DATA)}
+        di_first = post(url, di_request)
+        di_second = post(url, di_request)
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            post(url, {"assessment": "tm59mechvent", "fdir": str(DIR_TESTJOB1.parent)})
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert not di_first["cached"]
+    assert di_second["cached"]
+    assert di_second["results"] == di_first["results"]
+    assert len(di_second["results"]) == 27
+    assert excinfo.value.code == 403
+
+
+def test_project_outside_root_is_refused():
+    project_cache = ProjectCache(root=DIR_TESTJOB1_TM59MECHVENT_DATA)
+    assert project_cache.resolve_fdir(".") == DIR_TESTJOB1_TM59MECHVENT_DATA.resolve()
+    for fdir in [DIR_TESTJOB1, "..", DIR_TESTJOB1_TM59MECHVENT_DATA / ".."]:
+        with pytest.raises(PermissionError):
+            project_cache.assess("tm59mechvent", fdir)
+
+
+def test_concurrent_requests_calculate_once(monkeypatch):
+    li_calculated = []
+    wizard = service.DI_WIZARDS["tm59mechvent"]
+
+    def counting_wizard(*args, **kwargs):
+        li_calculated.append(threading.get_ident())
+        return wizard(*args, **kwargs)
+
+    monkeypatch.setitem(service.DI_WIZARDS, "tm59mechvent", counting_wizard)
+    project_cache = ProjectCache(root=DIR_TESTJOB1)
+    li_cached = []
+    li_threads = [
+        threading.Thread(
+            target=lambda: li_cached.append(
+                project_cache.assess("tm59mechvent", DIR_TESTJOB1_TM59MECHVENT_DATA)[1]
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in li_threads:
+        thread.start()
+    for thread in li_threads:
+        thread.join()
+    assert len(li_calculated) == 1
+    assert sorted(li_cached) == [False, True, True, True]
+    assert not project_cache._di_in_flight
+
+
+def test_serve_refuses_other_hosts_without_root():
+    with pytest.raises(ValueError):
+        service.serve(host="0.0.0.0", port=0)
+    assert service.is_loopback("localhost")
+    assert service.is_loopback("127.0.0.1")
+    assert service.is_loopback("::1")
+    assert not service.is_loopback("0.0.0.0")
+    assert not service.is_loopback("example.com")
+
+
+def test_serve_logs_address(monkeypatch, caplog, capsys):
+    def interrupt(self):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(AssessmentServer, "serve_forever", interrupt)
+    monkeypatch.setattr(service.signal, "signal", lambda signalnum, handler: None)
+    with caplog.at_level(logging.INFO, logger="adaptive_comfort"):
+        service.serve(port=0, quiet=True)
+    assert "listening on http://127.0.0.1:" in caplog.text
+    assert capsys.readouterr().out == ""
@@ -6,6 +6,7 @@ from collections import OrderedDict
 from adaptive_comfort.xlsx_templater import to_excel
 from adaptive_comfort.utils import create_paths, fromfile
 from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.vista import read_vista_results
 from .constants import (
     DIR_TESTOUTPUTS,
     DIR_TESTJOB1_TM52,
@@ -18,25 +19,9 @@ from .constants import (
 
 
 def read_ies_txt(fpth):
-    with open(str(fpth), errors="ignore") as f:
-        lines = f.read()
-    li_txt = lines.split("\n")
-    header = [l.split(", ") for l in li_txt if l[0:4] == "Room"][0]
-    data = [l.split(", ") for l in li_txt if l[0:2] == "A_"]
-    for d in data:
-        d[6] = d[6].replace("-,", "")  # Remove dashes
-    data = [d for d in data if "Corridor" not in d[0] and "Lobby" not in d[0]]
-    df = pd.DataFrame(columns=header, data=data)
-    number_cols = [
-        "Occupied days (%)",
-        "Criteria 1 (%Hrs Top-Tmax>=1K)",
-        "Criteria 2 (Max. Daily Deg.Hrs)",
-        "Criteria 3 (Max. DeltaT)",
-    ]
-    df[number_cols] = df[number_cols].apply(pd.to_numeric)
-    df = df.sort_values(by=["Room ID"])
-    df = df.reset_index(drop=True)
-    return df
+    """Reads the results of the occupied rooms from a Vista export, sorted by room ID."""
+    df = read_vista_results(fpth)
+    return df[df["Status"] != "Unoccupied"].reset_index(drop=True)
 
 
 class TestCheckResults:
@@ -189,6 +174,25 @@ class TestCheckResults:
             dtype=bool
         ) == True  # Does the relative difference for all criteria have a margin of error less than 5%?
 
+    def test_pass_fail_only(self):
+        """Test stopping for each room once it has failed gives the same pass/fail results as the full calculation,
+        with the temperatures raised so some rooms pass and others fail each criterion
+        """
+        inputs = fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True)
+        inputs.arr_air_temp = inputs.arr_air_temp + 3
+        inputs.arr_mean_radiant_temp = inputs.arr_mean_radiant_temp + 3
+        calc = Tm52CalcWizard(inputs, write_results=False)
+        calc_pass_fail = Tm52CalcWizard(inputs, write_results=False, pass_fail_only=True)
+        assert calc_pass_fail.digest(inputs) != calc.digest(inputs)
+        np.testing.assert_array_equal(calc_pass_fail.arr_tm52_bool, calc.arr_tm52_bool)
+        for criterion, di_criterion in calc.di_criteria.items():
+            for k, arr in di_criterion.items():
+                if k.endswith("(Pass/Fail)"):
+                    assert 0 < arr.mean() < 1
+                    np.testing.assert_array_equal(calc_pass_fail.di_criteria[criterion][k], arr)
+                else:
+                    assert np.isnan(calc_pass_fail.di_criteria[criterion][k]).all()
+
     def test_daily_running_mean_temp(self):
         """Compares the daily running mean temperature from IES with the one calculated within the MF script.
         """
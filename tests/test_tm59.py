@@ -1,5 +1,8 @@
 """Tests for `adaptive_comfort` package."""
 
+import logging
+import pickle
+
 import pytest
 import numpy as np
 import numpy.ma as ma
@@ -14,7 +17,8 @@ sys.path.append(str(DIR_MODULE))
 # for dev only
 
 from adaptive_comfort.xlsx_templater import to_excel
-from adaptive_comfort.utils import create_paths, fromfile
+from adaptive_comfort.criteria_testing import criterion_bedroom_comfort
+from adaptive_comfort.utils import create_paths, fromfile, subset_inputs
 from adaptive_comfort.tm59_calc import Tm59CalcWizard
 from adaptive_comfort.tm59mechvent_calc import Tm59MechVentCalcWizard
 from .constants import DIR_TESTJOB1_TM59, DIR_TESTJOB1_TM59MECHVENT, DIR_TESTJOB1_TM59_DATA, DIR_TESTJOB1_TM59MECHVENT_DATA
@@ -30,3 +34,148 @@ class TestTm59:
         """Test to make sure TM59 mech vent script runs
         """
         self.tm59mechvent_calc = Tm59MechVentCalcWizard.from_files(DIR_TESTJOB1_TM59MECHVENT_DATA, fdir_results=DIR_TESTJOB1_TM59MECHVENT)
+
+    def test_skip_unchanged(self, tmp_path, caplog, capsys):
+        """Test the calculation is skipped and the stored results are served when the inputs haven't changed
+        """
+        calc = Tm59MechVentCalcWizard.from_files(DIR_TESTJOB1_TM59MECHVENT_DATA, fdir_results=tmp_path, skip_unchanged=True)
+        capsys.readouterr()
+        with caplog.at_level(logging.INFO, logger="adaptive_comfort"):
+            calc_skipped = Tm59MechVentCalcWizard.from_files(DIR_TESTJOB1_TM59MECHVENT_DATA, fdir_results=tmp_path, skip_unchanged=True)
+        assert "calculation skipped" in caplog.text
+        assert capsys.readouterr().out == ""
+        df_project_info = calc.li_all_criteria_data_frames[0]["df"]
+        assert not calc.skipped
+        assert calc_skipped.skipped
+        assert calc_skipped.input_digest == calc.input_digest
+        assert df_project_info.loc["Input Digest", "Information"] == calc.input_digest
+        inputs = fromfile(create_paths(DIR_TESTJOB1_TM59MECHVENT_DATA), allow_pickle=True)
+        assert calc_skipped.li_room_records == list(calc.room_records(inputs))
+        assert list(calc_skipped.room_records(inputs)) == calc_skipped.li_room_records
+        assert pickle.loads(pickle.dumps(calc_skipped)).li_room_records == calc_skipped.li_room_records
+        for f in [lambda inputs: calc_skipped.worst_rooms(inputs), lambda inputs: calc_skipped.di_criteria]:
+            with pytest.raises(AttributeError, match="calculation was skipped"):
+                f(inputs)
+
+    def test_skip_unchanged_after_direct_run(self, tmp_path):
+        """Test the results stored by a wizard created directly from the input data are found by from_files, and
+        the other way around
+        """
+        inputs = fromfile(create_paths(DIR_TESTJOB1_TM59MECHVENT_DATA), allow_pickle=True)
+        calc = Tm59MechVentCalcWizard(inputs, fdir_results=tmp_path)
+        calc_skipped = Tm59MechVentCalcWizard.from_files(DIR_TESTJOB1_TM59MECHVENT_DATA, fdir_results=tmp_path, skip_unchanged=True)
+        assert calc_skipped.skipped
+        assert calc_skipped.input_digest == calc.input_digest
+        calc_files = Tm59MechVentCalcWizard.from_files(
+            DIR_TESTJOB1_TM59MECHVENT_DATA, fdir_results=tmp_path, skip_unchanged=True, pass_fail_only=True
+        )
+        assert not calc_files.skipped
+        assert Tm59MechVentCalcWizard(inputs, fdir_results=tmp_path / "direct", pass_fail_only=True).digest(inputs) == calc_files.input_digest
+
+    @pytest.mark.parametrize("steps_per_hour", [6, 2])
+    def test_bedroom_comfort_sub_hourly(self, steps_per_hour):
+        """Test the bedrooms and criterion B at 10 and 30 minute time-steps match checking each room on its own,
+        including a room occupied for all but one time-step of one night, which isn't a bedroom
+        """
+        inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True), slice(0, 5))
+        for name in ["arr_air_temp", "arr_mean_radiant_temp"]:
+            setattr(inputs, name, np.repeat(getattr(inputs, name), steps_per_hour, axis=1))
+            getattr(inputs, name)[4] -= 10  # Passes criterion B
+        n_timesteps = inputs.arr_air_temp.shape[1]
+        arr_hour = np.arange(n_timesteps) // steps_per_hour % 24
+        arr_night = (arr_hour >= 22) | (arr_hour < 7)
+        arr_occupancy = np.zeros((5, n_timesteps), dtype=np.float32)
+        arr_occupancy[0, arr_night] = 2  # Bedroom
+        arr_occupancy[1, arr_night] = 2
+        arr_occupancy[1, np.flatnonzero(arr_night)[200 * 9 * steps_per_hour + 1]] = 0  # Partly occupied night
+        arr_occupancy[2, ~arr_night] = 1  # Living room
+        arr_occupancy[3] = 1  # Bedroom, occupied all day
+        arr_occupancy[4, arr_night] = 0.5  # Bedroom
+        inputs.arr_occupancy = arr_occupancy
+
+        calc = Tm59CalcWizard(inputs, write_results=False)
+        calc_pass_fail = Tm59CalcWizard(inputs, write_results=False, pass_fail_only=True)
+        assert calc.calendar_index.timestep_minutes == 60 // steps_per_hour
+        li_bedrooms = [
+            i for i in range(5) if np.all(arr_occupancy[i, calc.calendar_index.arr_night_index] != 0)
+        ]
+        assert li_bedrooms == [0, 3, 4]
+        np.testing.assert_array_equal(calc.arr_bedroom_index, li_bedrooms)
+        np.testing.assert_array_equal(calc.arr_bedroom_ids, inputs.arr_room_ids_sorted[li_bedrooms])
+        for k, i in enumerate(li_bedrooms):
+            arr_bool, arr_percent, arr_hours = criterion_bedroom_comfort(
+                calc.arr_op_temp_v[:, i : i + 1], calc.calendar_index
+            )
+            np.testing.assert_array_equal(calc.arr_criterion_b_bool[:, k], arr_bool[:, 0])
+            np.testing.assert_allclose(calc.arr_criterion_b_percent[:, k], arr_percent[:, 0])
+            np.testing.assert_allclose(calc.arr_criterion_b_value[:, k], arr_hours[:, 0])
+            np.testing.assert_array_equal(calc_pass_fail.arr_criterion_b_bool[:, k], arr_bool[:, 0])
+        assert calc.arr_criterion_b_bool[:, :2].all() and not calc.arr_criterion_b_bool[:, 2].any()
+        np.testing.assert_array_equal(calc.arr_tm59_bool[:, [1, 2]], calc.arr_criterion_a_bool[:, [1, 2]])
+
+    def test_room_categories(self):
+        """Test rooms assigned category I by group or room ID are compared against a max adaptive temperature 1K lower
+        """
+        inputs = fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True)
+        room_id = inputs.arr_room_ids_sorted[-1]
+        calc = Tm59CalcWizard(inputs, write_results=False, group_categories={"TM59_VulnerableRooms": "II"})
+        calc_cat_I = Tm59CalcWizard(inputs, write_results=False, room_categories={room_id: "I"})
+        assert calc.li_categories == ["II"]
+        assert calc_cat_I.li_categories == ["I", "II"]
+        assert calc.input_digest is None  # Only calculated when the results are stored
+        assert calc_cat_I.digest(inputs) != calc.digest(inputs)
+        arr_vulnerable = np.isin(inputs.arr_room_ids_sorted, inputs.di_room_ids_groups["TM59_VulnerableRooms"])
+        arr_vulnerable[-1] = True
+        assert (calc_cat_I.arr_category_codes == np.where(arr_vulnerable, 0, 1)).all()
+        arr_diff = calc_cat_I.arr_deltaT - calc.arr_deltaT
+        assert np.allclose(arr_diff[:, arr_vulnerable], 1)
+        assert np.allclose(arr_diff[:, ~arr_vulnerable], 0)
+
+    def test_results_table(self):
+        """Test the long-format results table has a row per air speed and room, and the sheets are blocks of it
+        """
+        inputs = fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True)
+        calc = Tm59CalcWizard(inputs, write_results=False)
+        calc.merge_dfs(inputs)
+        n_rooms = len(inputs.arr_room_ids_sorted)
+        assert len(calc.df_results) == len(calc.li_air_speeds_str) * n_rooms
+        df_speed = calc.df_results[calc.df_results["Air Speed"] == calc.li_air_speeds_str[1]].drop(columns="Air Speed")
+        pd.testing.assert_frame_equal(calc.li_all_criteria_data_frames[3]["df"], df_speed)
+        arr_not_bedroom = ~np.isin(df_speed.index, calc.arr_bedroom_ids)
+        assert df_speed.loc[arr_not_bedroom, "Criterion B (Pass/Fail)"].isna().all()
+        assert (df_speed.loc[arr_not_bedroom, "TM59 (Pass/Fail)"] == df_speed.loc[arr_not_bedroom, "Criterion A (Pass/Fail)"]).all()
+
+    def test_category_sweep(self):
+        """Test the category sweep matches running with every room assigned the category, without recalculating
+        the operative temperature
+        """
+        inputs = subset_inputs(fromfile(create_paths(DIR_TESTJOB1_TM59_DATA), allow_pickle=True), slice(0, 6))
+        calc = Tm59CalcWizard(inputs, write_results=False)
+        di_sweep = calc.category_sweep(inputs)
+        assert list(di_sweep) == ["I", "II", "III"]
+        for category, calc_category in di_sweep.items():
+            assert calc_category.arr_op_temp_v is calc.arr_op_temp_v
+            calc_expected = Tm59CalcWizard(
+                inputs, write_results=False, room_categories={room_id: category for room_id in inputs.arr_room_ids_sorted}
+            )
+            assert list(calc_category.room_records(inputs)) == list(calc_expected.room_records(inputs))
+
+    @pytest.mark.parametrize(
+        "wizard, fdir, shift",
+        [(Tm59CalcWizard, DIR_TESTJOB1_TM59_DATA, 3), (Tm59MechVentCalcWizard, DIR_TESTJOB1_TM59MECHVENT_DATA, -3)],
+    )
+    def test_pass_fail_only(self, wizard, fdir, shift):
+        """Test stopping for each room once it has failed gives the same pass/fail results as the full calculation
+        """
+        inputs = fromfile(create_paths(fdir), allow_pickle=True)
+        inputs.arr_air_temp = inputs.arr_air_temp + shift  # So some rooms pass and others fail
+        inputs.arr_mean_radiant_temp = inputs.arr_mean_radiant_temp + shift
+        calc = wizard(inputs, write_results=False)
+        calc_pass_fail = wizard(inputs, write_results=False, pass_fail_only=True)
+        for criterion, di_criterion in calc.di_criteria.items():
+            for k, arr in di_criterion.items():
+                if k.endswith("(Pass/Fail)"):
+                    np.testing.assert_array_equal(calc_pass_fail.di_criteria[criterion][k], arr)
+                else:
+                    assert np.isnan(calc_pass_fail.di_criteria[criterion][k]).all()
+        assert list(calc_pass_fail.room_records(inputs))[0]["Room ID"] == str(inputs.arr_room_ids_sorted[0])
@@ -0,0 +1,77 @@
+"""Tests for the supporting functions."""
+import pickle
+
+import numpy as np
+import pytest
+
+from adaptive_comfort.utils import (
+    factorize_room_names,
+    load_restricted,
+    np_round_half_up,
+    np_round_for_daily_weighted_exceedance,
+    round_half_up_int,
+    weighting_factors,
+)
+
+
+def test_round_half_up_int():
+    """Test rounding into small integers matches round_half_up, including halves, negative values and values
+    just below a half
+    """
+    arr = np.concatenate(
+        [
+            np.random.RandomState(0).uniform(-20, 20, size=10000),
+            [-2.5, -0.5, -0.3, 0.0, 0.5, 2.5, 2.4999999999999996, np.nextafter(0.5, 0)],
+        ]
+    ).reshape(2, -1)
+    arr_round = round_half_up_int(arr, chunk_size=1000)
+    assert arr_round.dtype == np.int8
+    np.testing.assert_array_equal(arr_round, np_round_half_up(arr))
+    np.testing.assert_array_equal(weighting_factors(arr), np_round_for_daily_weighted_exceedance(arr))
+    assert round_half_up_int(arr * 10).dtype == np.int16
+    assert round_half_up_int(arr_round) is arr_round
+
+
+def test_factorize_room_names():
+    """Test rooms sharing a name are given the same code and rooms missing from the map, or with a NaN name,
+    are given the code of the None label
+    """
+    arr_room_ids = np.array(["1S000001", "1S000002", "1S000003", "1S000004", "1S000005", "1S000006"])
+    di_room_id_name_map = {
+        "1S000003": "Bedroom",
+        "1S000001": "Living",
+        "1S000002": "Bedroom",
+        "1S000005": float("nan"),
+        "1S000006": "Kitchen",
+        "1S000007": "Unused",
+    }  # 1S000004 isn't in the map
+    arr_codes, arr_labels = factorize_room_names(arr_room_ids, di_room_id_name_map)
+    assert arr_codes.tolist() == [2, 0, 0, -1, -1, 1]
+    assert arr_labels.tolist() == ["Bedroom", "Kitchen", "Living", None]
+    assert arr_labels[arr_codes].tolist() == ["Living", "Bedroom", "Bedroom", None, None, "Kitchen"]
+
+    arr_codes, arr_labels = factorize_room_names(arr_room_ids[:2], {})
+    assert arr_codes.tolist() == [-1, -1]
+    assert arr_labels.tolist() == [None]
+
+
+class NotAllowed(object):
+    pass
+
+
+def test_load_restricted(tmp_path):
+    """Test dictionaries of numpy arrays and python types load without pickle, but other objects are refused
+    """
+    di = {"name": "Room 1", "arr": np.arange(3.0), "li": [1, 2.5, None], "scalar": np.float64(1.5)}
+    np.save(str(tmp_path / "arr_dict.npy"), di, allow_pickle=True)
+    di_loaded = load_restricted(tmp_path / "arr_dict.npy").item()
+    np.testing.assert_array_equal(di_loaded.pop("arr"), di.pop("arr"))
+    assert di_loaded == di
+
+    np.save(str(tmp_path / "arr_floats.npy"), np.arange(3.0))
+    arr = load_restricted(tmp_path / "arr_floats.npy", mmap_mode="r")
+    assert isinstance(arr, np.memmap)
+
+    np.save(str(tmp_path / "arr_object.npy"), {"obj": NotAllowed()}, allow_pickle=True)
+    with pytest.raises(pickle.UnpicklingError):
+        load_restricted(tmp_path / "arr_object.npy")
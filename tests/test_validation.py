@@ -0,0 +1,70 @@
+"""Tests for validating the results against reference results from IES Vista."""
+import shutil
+
+import pandas as pd
+import pytest
+
+from adaptive_comfort.utils import create_paths, fromfile
+from adaptive_comfort.tm52_calc import Tm52CalcWizard
+from adaptive_comfort.validation import (
+    vista_exports,
+    validate_against_vista,
+    summarise_discrepancies,
+)
+from .constants import DIR_TESTJOB1_TM52_DATA, FPTH_IES_TESTJOB1_V_0_1
+
+
+@pytest.fixture(scope="module")
+def df_results():
+    inputs = fromfile(create_paths(DIR_TESTJOB1_TM52_DATA), allow_pickle=True)
+    calc = Tm52CalcWizard(inputs, write_results=False)
+    calc.merge_dfs(inputs)
+    return calc.df_results
+
+
+def test_validate_against_vista(df_results):
+    """Test every room and criterion matches Vista at 0.1 m/s
+    """
+    di_fpths = vista_exports(FPTH_IES_TESTJOB1_V_0_1.parent)
+    assert list(di_fpths) == ["0.1", "0.5"]
+    df_discrepancies = validate_against_vista(df_results, {"0.1": di_fpths["0.1"]})
+    assert df_discrepancies.empty
+
+
+def test_validate_missing_room(df_results):
+    """Test rooms missing from the results are reported
+    """
+    df_discrepancies = validate_against_vista(df_results.iloc[1:], {"0.1": FPTH_IES_TESTJOB1_V_0_1})
+    assert df_discrepancies[["Room ID", "Metric", "Result"]].values.tolist() == [["1S000001", "Room", "Missing"]]
+    assert summarise_discrepancies(df_discrepancies).loc["Room", "0.1"] == 1
+
+
+def test_validate_two_air_speeds(df_results, tmp_path):
+    """Test each air speed is compared against its own export and only the results outside of the tolerance
+    are reported. The 0.1 m/s export is reused for a second air speed of 1.0 m/s, which isn't in the results
+    """
+    shutil.copy(str(FPTH_IES_TESTJOB1_V_0_1), str(tmp_path / "TestJob1_TM52_0.1.csv"))
+    shutil.copy(str(FPTH_IES_TESTJOB1_V_0_1), str(tmp_path / "TestJob1_TM52_1.0.csv"))
+    df_1_0 = df_results[df_results["Air Speed"] == "0.1"].copy()
+    df_1_0["Air Speed"] = "1.0"
+    df_1_0.loc["1S000002", "Criterion 1 (% Hours Delta T >= 1K)"] += 0.05  # Within the tolerance
+    df_1_0.loc["1S000004", "Criterion 1 (% Hours Delta T >= 1K)"] += 0.5
+    df_1_0.loc["1S000004", "Criterion 2 (Pass/Fail)"] = "Fail"
+    di_fpths = vista_exports(tmp_path)
+    assert list(di_fpths) == ["0.1", "1.0"]
+
+    df_discrepancies = validate_against_vista(pd.concat([df_results, df_1_0]), di_fpths)
+    assert df_discrepancies[["Air Speed", "Room ID", "Metric"]].values.tolist() == [
+        ["1.0", "1S000004", "Criterion 1 (% Hours Delta T >= 1K)"],
+        ["1.0", "1S000004", "Criteria failing"],
+    ]
+    assert df_discrepancies["Abs Difference"].iloc[0] == pytest.approx(0.5)
+    assert df_discrepancies["Result"].iloc[1] != df_discrepancies["Reference"].iloc[1]
+    assert summarise_discrepancies(df_discrepancies).values.sum() == 2
+
+
+def test_validate_unsupported_assessment(df_results):
+    """Test a clear error is raised for assessments without Vista columns
+    """
+    with pytest.raises(ValueError, match="TM59"):
+        validate_against_vista(df_results, {"0.1": FPTH_IES_TESTJOB1_V_0_1}, assessment="TM59")
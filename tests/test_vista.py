@@ -0,0 +1,37 @@
+"""Tests for reading the results exported from IES Vista."""
+import pandas as pd
+import pytest
+
+from adaptive_comfort.vista import read_vista_results
+from .constants import FPTH_IES_TESTJOB1_V_0_1
+
+
+def test_read_vista_results():
+    """Test every room is read from the Vista export with the section it was reported in
+    """
+    df = read_vista_results(FPTH_IES_TESTJOB1_V_0_1)
+    assert df["Status"].value_counts().to_dict() == {"Passed": 17, "Failed": 14, "Unoccupied": 5}
+    assert df["Room ID"].is_monotonic_increasing
+    assert df["Criteria 1 (%Hrs Top-Tmax>=1K)"].dtype.kind == "f"
+    df_room = df.set_index("Room ID")
+    assert df_room.loc["1S000002", "Criteria failing"] == "1 & 2"
+    assert df_room.loc["1S000004", "Criteria failing"] == ""
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 7, 20])
+def test_read_vista_results_in_chunks(chunksize):
+    """Test the rooms are the same when the chunks split the header, room and section rows
+    """
+    pd.testing.assert_frame_equal(
+        read_vista_results(FPTH_IES_TESTJOB1_V_0_1, chunksize=chunksize),
+        read_vista_results(FPTH_IES_TESTJOB1_V_0_1),
+    )
+
+
+def test_read_vista_results_without_rooms(tmp_path):
+    """Test a file without any room results raises an error
+    """
+    fpth = tmp_path / "empty.csv"
+    fpth.write_text("Overall\nPassed:, 0 rooms:\n")
+    with pytest.raises(ValueError):
+        read_vista_results(fpth)